@@ -0,0 +1,158 @@
+"""Пакетный движок: тысячи полей в массивах NumPy, по выстрелу на каждое за шаг.
+
+NumPy - необязательная зависимость (pip install numpy): остальная игра без неё
+работает, а этот модуль и всё, что его импортирует, требуют её явно.
+"""
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gameseabattle import Board
+
+# Коды клеток в массиве cells
+EMPTY = 0
+SHIP = 1
+MISS = 2
+HIT = 3
+
+
+class BatchBoards:
+    """N полей в одном массиве (N, size, size) uint8, по выстрелу на поле за шаг.
+
+    Правила повторяют Board.receive_attack: выстрел за пределы поля или в уже
+    обстрелянную клетку ничего не меняет и считается промахом без корабля.
+    """
+
+    def __init__(self, n_boards: int, size: int = 10, max_ships: int = 10):
+        self.n_boards = n_boards
+        self.size = size
+        self.cells = np.zeros((n_boards, size, size), dtype=np.uint8)
+        self.ship_ids = np.full((n_boards, size, size), -1, dtype=np.int16)
+        self.ship_sizes = np.zeros((n_boards, max_ships), dtype=np.int16)
+        self.ship_left = np.zeros((n_boards, max_ships), dtype=np.int16)
+        self.cells_left = np.zeros(n_boards, dtype=np.int32)
+        self.ship_counts = np.zeros(n_boards, dtype=np.int16)
+        self._rows = np.arange(n_boards)
+
+    @classmethod
+    def from_fleets(cls, fleets: Sequence[Sequence[Sequence[Tuple[int, int]]]],
+                    size: int = 10) -> 'BatchBoards':
+        """Строит пакет из списков положений кораблей (по списку на поле)"""
+        max_ships = max((len(fleet) for fleet in fleets), default=0) or 1
+        batch = cls(len(fleets), size, max_ships)
+        if not fleets:
+            return batch
+        # Все клетки всех кораблей пишутся одним присваиванием: add_ship на каждый
+        # корабль обходится дороже, чем сама партия на пакетном движке
+        lengths = [[len(positions) for positions in fleet] + [0] * (max_ships - len(fleet))
+                   for fleet in fleets]
+        batch.ship_sizes[:] = lengths
+        batch.ship_left[:] = lengths
+        batch.cells_left[:] = batch.ship_sizes.sum(axis=1)
+        batch.ship_counts[:] = [len(fleet) for fleet in fleets]
+        rows, ship_ids, xs, ys = [], [], [], []
+        for index, fleet in enumerate(fleets):
+            for ship_id, positions in enumerate(fleet):
+                for x, y in positions:
+                    rows.append(index)
+                    ship_ids.append(ship_id)
+                    xs.append(x)
+                    ys.append(y)
+        batch.cells[rows, xs, ys] = SHIP
+        batch.ship_ids[rows, xs, ys] = ship_ids
+        return batch
+
+    @classmethod
+    def from_boards(cls, boards: Iterable[Board]) -> 'BatchBoards':
+        """Копирует корабли и уже сделанные выстрелы из обычных полей"""
+        boards = list(boards)
+        size = boards[0].size if boards else 10
+        batch = cls.from_fleets([[ship.positions for ship in board.ships] for board in boards], size)
+        for index, board in enumerate(boards):
+            for x, y in board.miss_cells:
+                batch.cells[index, x, y] = MISS
+            for x, y in board.hit_cells:
+                batch.cells[index, x, y] = HIT
+                ship_id = batch.ship_ids[index, x, y]
+                batch.ship_left[index, ship_id] -= 1
+                batch.cells_left[index] -= 1
+        return batch
+
+    def add_ship(self, index: int, positions: Sequence[Tuple[int, int]]) -> int:
+        ship_id = int(self.ship_counts[index])
+        if ship_id >= self.ship_sizes.shape[1]:
+            raise ValueError("Превышено число кораблей на поле")
+        xs, ys = zip(*positions)
+        self.cells[index, xs, ys] = SHIP
+        self.ship_ids[index, xs, ys] = ship_id
+        self.ship_sizes[index, ship_id] = len(positions)
+        self.ship_left[index, ship_id] = len(positions)
+        self.cells_left[index] += len(positions)
+        self.ship_counts[index] += 1
+        return ship_id
+
+    def fire(self, xs: np.ndarray, ys: np.ndarray, active: Optional[np.ndarray] = None
+             ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Один выстрел по каждому полю (active=False пропускает поле).
+
+        Возвращает (hit, ship_id, sunk, won): попадание, номер корабля (-1 если нет),
+        потоплен ли корабль этим выстрелом и потоплены ли все корабли поля.
+        """
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        valid = (xs >= 0) & (xs < self.size) & (ys >= 0) & (ys < self.size)
+        if active is not None:
+            valid &= active
+        xs = np.where(valid, xs, 0)
+        ys = np.where(valid, ys, 0)
+
+        state = self.cells[self._rows, xs, ys]
+        hit = valid & (state == SHIP)
+        miss = valid & (state == EMPTY)
+
+        rows = self._rows[hit]
+        hx, hy = xs[hit], ys[hit]
+        self.cells[rows, hx, hy] = HIT
+        self.cells[self._rows[miss], xs[miss], ys[miss]] = MISS
+
+        ship_id = np.full(self.n_boards, -1, dtype=np.int16)
+        hit_ids = self.ship_ids[rows, hx, hy]
+        ship_id[hit] = hit_ids
+        # На каждом поле один выстрел, поэтому пары (поле, корабль) не повторяются
+        self.ship_left[rows, hit_ids] -= 1
+        self.cells_left[rows] -= 1
+
+        sunk = np.zeros(self.n_boards, dtype=bool)
+        sunk[hit] = self.ship_left[rows, hit_ids] == 0
+        return hit, ship_id, sunk, self.all_ships_sunk()
+
+    def all_ships_sunk(self) -> np.ndarray:
+        return self.cells_left == 0
+
+    def shot_mask(self) -> np.ndarray:
+        return self.cells >= MISS
+
+
+def play_random(batch: BatchBoards, rng: Optional[np.random.Generator] = None,
+                max_steps: Optional[int] = None) -> np.ndarray:
+    """Стреляет по всем полям в случайном порядке без повторов до потопления флота.
+
+    Возвращает число выстрелов до победы для каждого поля (-1, если не уложились).
+    """
+    rng = rng or np.random.default_rng()
+    area = batch.size * batch.size
+    max_steps = area if max_steps is None else min(max_steps, area)
+    # Для каждого поля своя перестановка клеток: выстрелы не повторяются
+    order = rng.permuted(np.tile(np.arange(area), (batch.n_boards, 1)), axis=1)
+    shots_to_win = np.full(batch.n_boards, -1, dtype=np.int32)
+    active = ~batch.all_ships_sunk()
+    for step in range(max_steps):
+        if not active.any():
+            break
+        xs, ys = np.divmod(order[:, step], batch.size)
+        _, _, _, won = batch.fire(xs, ys, active)
+        finished = active & won
+        shots_to_win[finished] = step + 1
+        active &= ~won
+    return shots_to_win
+
@@ -0,0 +1,285 @@
+"""Замеры горячих путей Board, Ship и AIPlayer со сравнением с базовой линии.
+
+    python benchmarks.py --output bench.json
+    python benchmarks.py --baseline bench.json --tolerance 0.15
+    python benchmarks.py --startup --sizes
+
+Результаты пишутся в JSON: для каждого замера число вызовов, вызовов в секунду
+и перцентили задержки одного вызова. При --baseline замеры, чья пропускная
+способность упала больше чем на tolerance, считаются регрессией, и скрипт
+завершается с кодом 1.
+
+--startup добавляет замер запуска "launcher.py play" в отдельном процессе до
+главного меню и выхода из него. Если медиана дольше медианы запуска пустого
+интерпретатора больше чем на STARTUP_BUDGET_MS, это тоже регрессия, даже без
+базовой линии: бюджет относится к самой игре, а не к скорости машины.
+
+--batch добавляет сравнение пакетного движка batch_engine с обычным Board на
+одних и тех же расстановках: тысяча партий стрелка наугад за замер (нужен NumPy).
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from bitboard import BitBoard
+from gameseabattle import AIPlayer, Board, GameConfig, Ship
+from placement import make_fleet_sampler
+from simulation import play_headless_game
+
+ENGINES = {"board": Board, "bitboard": BitBoard}
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "launcher.py")
+STARTUP_BUDGET_MS = 30.0
+
+# Замер: имя, подготовка состояния (не измеряется), измеряемая функция, число повторов
+Case = Tuple[str, Callable[[], object], Callable[[object], object], int]
+
+
+def measure(setup: Callable[[], object], fn: Callable[[object], object], samples: int) -> Dict:
+    timings = []
+    for _ in range(samples):
+        state = setup()
+        start = time.perf_counter()
+        fn(state)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    total = sum(timings)
+    return {
+        "samples": samples,
+        "ops_per_sec": samples / total if total else float("inf"),
+        "mean_us": total / samples * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6,
+    }
+
+
+def _fleet_board(engine: Callable[[int], Board], config: GameConfig, rng: random.Random) -> Board:
+    board = engine(config.board_size)
+    sampler = make_fleet_sampler(config.board_size, config.ship_sizes, rng)
+    for size, positions in zip(config.ship_sizes, sampler.sample()):
+        board.place_ship(Ship(size, positions))
+    return board
+
+
+def board_cases(size: int, engine_name: str, rng: random.Random, scale: int) -> Iterator[Case]:
+    engine = ENGINES[engine_name]
+    config = GameConfig(size)
+    sampler = make_fleet_sampler(size, config.ship_sizes, rng)
+    prefix = f"{engine_name}/{size}"
+
+    def place_setup():
+        return engine(size), [Ship(s, p) for s, p in zip(config.ship_sizes, sampler.sample())]
+
+    def place_fleet(state):
+        board, ships = state
+        for ship in ships:
+            board.place_ship(ship)
+
+    yield f"{prefix}/place_ship_fleet", place_setup, place_fleet, 200 * scale
+
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    shots = min(len(cells), 400)
+
+    def attack_setup():
+        board = _fleet_board(engine, config, rng)
+        return board, rng.sample(cells, shots)
+
+    def attack_all(state):
+        board, targets = state
+        for x, y in targets:
+            board.receive_attack(x, y)
+
+    yield f"{prefix}/receive_attack_x{shots}", attack_setup, attack_all, 50 * scale
+
+    def sunk_setup():
+        return _fleet_board(engine, config, rng)
+
+    def sunk_check(board):
+        for _ in range(100):
+            board.all_ships_sunk()
+
+    yield f"{prefix}/all_ships_sunk_x100", sunk_setup, sunk_check, 100 * scale
+
+
+def ai_cases(size: int, difficulty: str, rng: random.Random, scale: int) -> Iterator[Case]:
+    config = GameConfig(size)
+    prefix = f"ai/{size}/{difficulty}"
+
+    def new_ai():
+        return AIPlayer(difficulty, rng=rng, verbose=False, config=config)
+
+    def place(ai):
+        ai.place_ships()
+
+    yield f"{prefix}/place_ships", new_ai, place, 100 * scale
+
+    # Одна партия на замер: ход измеряется посреди игры, а не на пустом поле
+    def move_setup():
+        ai, target = new_ai(), new_ai()
+        target.place_ships()
+        for _ in range(rng.randrange(size * size // 2 + 1)):
+            if target.board.all_ships_sunk():
+                break
+            ai.make_move(target)
+        return ai, target
+
+    def move(state):
+        ai, target = state
+        ai.make_move(target)
+
+    yield f"{prefix}/make_move", move_setup, move, 200 * scale
+
+    def game(_):
+        play_headless_game(new_ai(), new_ai())
+
+    yield f"{prefix}/headless_game", lambda: None, game, max(5, 200 * scale // size)
+
+
+def batch_cases(size: int, rng: random.Random, scale: int) -> Iterator[Case]:
+    """Стрелок наугад: пакет полей на batch_engine против тех же партий по одной на Board"""
+    import numpy as np
+
+    from batch_engine import BatchBoards, play_random
+
+    config = GameConfig(size)
+    sampler = make_fleet_sampler(size, config.ship_sizes, rng)
+    games = 1000
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    prefix = f"batch/{size}"
+
+    def fleets_setup():
+        return [sampler.sample() for _ in range(games)]
+
+    def numpy_games(fleets):
+        play_random(BatchBoards.from_fleets(fleets, size), np.random.default_rng(rng.getrandbits(64)))
+
+    yield f"{prefix}/numpy_random_games_x{games}", fleets_setup, numpy_games, 5 * scale
+
+    def python_games(fleets):
+        for fleet in fleets:
+            board = Board(size)
+            for positions in fleet:
+                board.place_ship(Ship(len(positions), positions))
+            for x, y in rng.sample(cells, len(cells)):
+                board.receive_attack(x, y)
+                if board.all_ships_sunk():
+                    break
+
+    yield f"{prefix}/python_random_games_x{games}", fleets_setup, python_games, 5 * scale
+
+
+def startup_cases(scale: int, workdir: str) -> Iterator[Case]:
+    # workdir - пустой каталог: игра не должна найти чужие сохранение, книгу или статистику
+    def launch(command: List[str], stdin: str = ""):
+        return lambda _: subprocess.run(command, input=stdin, text=True, cwd=workdir,
+                                        stdout=subprocess.DEVNULL, check=True)
+
+    # Сам интерпретатор - чтобы было видно, сколько из времени запуска приходится на игру
+    yield "startup/python", lambda: None, launch([sys.executable, "-c", "pass"]), 10 * scale
+    # "6" - пункт "Выход" главного меню
+    yield "startup/play", lambda: None, launch([sys.executable, LAUNCHER, "play"], "6\n"), 10 * scale
+
+
+def run(sizes: Sequence[int], difficulties: Sequence[str], engines: Sequence[str],
+        seed: int, scale: int, startup: bool = False, batch: bool = False) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    results = {}
+
+    def measure_all(cases: Iterable[Case]) -> None:
+        for name, setup, fn, samples in cases:
+            results[name] = measure(setup, fn, samples)
+            print(f"{name:<45} {results[name]['ops_per_sec']:>12.1f} оп/с "
+                  f"p50 {results[name]['p50_us']:>10.1f} мкс  p99 {results[name]['p99_us']:>10.1f} мкс",
+                  file=sys.stderr)
+
+    for size in sizes:
+        cases: List[Case] = []
+        for engine_name in engines:
+            cases.extend(board_cases(size, engine_name, rng, scale))
+        for difficulty in difficulties:
+            cases.extend(ai_cases(size, difficulty, rng, scale))
+        if batch:
+            cases.extend(batch_cases(size, rng, scale))
+        measure_all(cases)
+    if startup:
+        with tempfile.TemporaryDirectory(prefix="seabattle-startup-") as workdir:
+            measure_all(startup_cases(scale, workdir))
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Имена замеров, где пропускная способность упала больше чем на tolerance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = current["ops_per_sec"] / previous["ops_per_sec"]
+        current["baseline_ratio"] = ratio
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Замеры производительности движка")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 20, 50])
+    parser.add_argument("--difficulties", nargs="+", default=list(AIPlayer.DIFFICULTY_LEVELS),
+                        choices=list(AIPlayer.DIFFICULTY_LEVELS))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=1, help="множитель числа повторов")
+    parser.add_argument("--output", default=None, help="куда записать результаты в JSON")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--startup", action="store_true", help="замерить запуск launcher.py play")
+    parser.add_argument("--batch", action="store_true",
+                        help="стрелок наугад на пакетном движке против Board (нужен NumPy)")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS,
+                        help="мс сверх запуска пустого интерпретатора")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.difficulties, args.engines, args.seed, args.scale, args.startup,
+                  args.batch)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+    if args.startup:
+        startup_ms = (results["startup/play"]["p50_us"] - results["startup/python"]["p50_us"]) / 1000
+    slow_start = args.startup and startup_ms > args.startup_budget
+
+    report = {
+        "meta": {
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "scale": args.scale,
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for name in regressions:
+        print(f"РЕГРЕССИЯ: {name} ({results[name]['baseline_ratio']:.2f} от базовой линии)",
+              file=sys.stderr)
+    if slow_start:
+        print(f"РЕГРЕССИЯ: запуск play на {startup_ms:.1f} мс дольше пустого интерпретатора, "
+              f"бюджет {args.startup_budget:.0f} мс", file=sys.stderr)
+    return 1 if regressions or slow_start else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from gameseabattle import CHANGED_ROWS_PER_ROW, Board, Ship
+from placement import halo_mask
+
+
+def positions_mask(positions: List[Tuple[int, int]], size: int) -> Optional[int]:
+    """Маска клеток корабля или None, если корабль выходит за границы поля"""
+    mask = 0
+    for x, y in positions:
+        if not (0 <= x < size and 0 <= y < size):
+            return None
+        mask |= 1 << (x * size + y)
+    return mask
+
+
+class BitBoard(Board):
+    """Поле на битовых масках с тем же API, что и Board.
+
+    Корабли, попадания, промахи и запретные зоны хранятся в целых числах по биту
+    на клетку (индекс x * size + y), а владелец каждой клетки - в плоском массиве,
+    поэтому выстрел, проверка размещения и all_ships_sunk не перебирают корабли.
+    """
+
+    __slots__ = ("ship_masks", "ship_mask", "hit_mask", "miss_mask", "owner")
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self.ships = []
+        self.ship_masks = []
+        self.ship_mask = 0
+        self.hit_mask = 0
+        self.miss_mask = 0
+        self.owner = array('h', [-1]) * (size * size)
+        self.hit_cells = set()
+        self.miss_cells = set()
+        self.changed_rows = []
+        self.generation = 0
+
+    def reset(self) -> None:
+        # Массив владельцев не пересоздаётся: стираются только клетки кораблей
+        size, owner = self.size, self.owner
+        for ship in self.ships:
+            for x, y in ship.positions:
+                owner[x * size + y] = -1
+        self.ships.clear()
+        self.ship_masks.clear()
+        self.ship_mask = 0
+        self.hit_mask = 0
+        self.miss_mask = 0
+        self.hit_cells.clear()
+        self.miss_cells.clear()
+        self.changed_rows.clear()
+        self.generation += 1
+
+    def cell(self, x: int, y: int) -> str:
+        bit = 1 << (x * self.size + y)
+        if self.hit_mask & bit:
+            return 'X'
+        if self.miss_mask & bit:
+            return '○'
+        if self.ship_mask & bit:
+            return '■'
+        return '~'
+
+    def row_marks(self, x: int) -> Dict[int, str]:
+        size = self.size
+        shift, row_bits = x * size, (1 << size) - 1
+        marks = {}
+        for mark, mask in (('■', self.ship_mask & ~self.hit_mask), ('X', self.hit_mask),
+                           ('○', self.miss_mask)):
+            bits = (mask >> shift) & row_bits
+            while bits:
+                low = bits & -bits
+                marks[low.bit_length() - 1] = mark
+                bits ^= low
+        return marks
+
+    def place_ship(self, ship: Ship) -> bool:
+        mask = positions_mask(ship.positions, self.size)
+        if mask is None:
+            return False
+        # Как и в Board, мешает любая непустая клетка в окрестности, включая выстрелы
+        if halo_mask(mask, self.size) & (self.ship_mask | self.hit_mask | self.miss_mask):
+            return False
+
+        index = len(self.ships)
+        for x, y in ship.positions:
+            self.owner[x * self.size + y] = index
+            self.changed_rows.append(x)
+        if len(self.changed_rows) > CHANGED_ROWS_PER_ROW * self.size:
+            self.forget_changes()
+        self.ship_mask |= mask
+        self.ship_masks.append(mask)
+        self.ships.append(ship)
+        return True
+
+    def receive_attack(self, x: int, y: int) -> Tuple[bool, Optional[Ship]]:
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return False, None
+
+        index = x * self.size + y
+        bit = 1 << index
+        if (self.hit_mask | self.miss_mask) & bit:
+            return False, None
+
+        self.changed_rows.append(x)
+        if len(self.changed_rows) > CHANGED_ROWS_PER_ROW * self.size:
+            self.forget_changes()
+        owner = self.owner[index]
+        if owner >= 0:
+            ship = self.ships[owner]
+            ship.hits.add((x, y))
+            self.hit_mask |= bit
+            self.hit_cells.add((x, y))
+            return True, ship
+
+        self.miss_mask |= bit
+        self.miss_cells.add((x, y))
+        return False, None
+
+    def all_ships_sunk(self) -> bool:
+        return self.ship_mask & ~self.hit_mask == 0
+
+    def is_ship_sunk(self, index: int) -> bool:
+        return self.ship_masks[index] & ~self.hit_mask == 0
+
+    def get_ship_at_position(self, x: int, y: int) -> Optional[Ship]:
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return None
+        owner = self.owner[x * self.size + y]
+        return self.ships[owner] if owner >= 0 else None
@@ -0,0 +1,217 @@
+"""Эндшпиль: перебор оставшихся расстановок и выбор выстрела с минимумом ожидаемых ходов.
+
+Когда на поле соперника остаётся не больше ENDGAME_SHIPS кораблей, все их
+расстановки, согласные с промахами, ранениями и потопленными кораблями,
+перечисляются явно. Если расстановок немного, ожидаемое число выстрелов до
+конца партии считается точно (минимум по выстрелам, среднее по исходам:
+промах, ранение, потопление). Состояния повторяются и внутри перебора, и между
+ходами и партиями, поэтому результаты хранятся в таблице транспозиций с
+ключом (оставшиеся корабли, закрытые клетки, раненые клетки) и вытеснением
+давно не использованных записей. Если перебор не укладывается в бюджет узлов,
+выбирается клетка, накрытая наибольшим числом расстановок.
+
+Бюджет считается в узлах, а не во времени, и запись таблицы хранит, сколько
+узлов стоил её подсчёт: попадание в таблицу списывает ту же стоимость. Поэтому
+исход перебора зависит только от состояния, а не от загрузки машины и не от
+того, какие партии этот процесс играл раньше, и сиды симуляций воспроизводимы.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from placement import placement_table
+
+# Сколько кораблей должно остаться, чтобы включился эндшпиль
+ENDGAME_SHIPS = 2
+# Точный перебор - только если расстановок не больше этого
+EXACT_LIMIT = 12
+# Больше расстановок не перечисляем - эндшпиль ещё не наступил
+ENUM_LIMIT = 2000
+TABLE_SIZE = 50000
+# Бюджет точного перебора на один ход, в узлах. Больший бюджет почти не
+# меняет выбор выстрела, но заметно замедляет партию
+MOVE_NODES = 200
+
+# Состояние: размеры оставшихся кораблей по убыванию, закрытые клетки
+# (промахи и потопленные корабли с окрестностью), раненые клетки
+State = Tuple[Tuple[int, ...], int, int]
+
+
+class _Timeout(Exception):
+    pass
+
+
+class EndgameSolver:
+    """Таблица транспозиций и перебор эндшпиля для одного размера поля"""
+
+    def __init__(self, board_size: int, table_size: int = TABLE_SIZE,
+                 node_limit: int = MOVE_NODES):
+        self.size = board_size
+        self.table_size = table_size
+        self.node_limit = node_limit
+        # Ключ -> (ожидаемое число выстрелов, лучшая клетка, стоимость в узлах)
+        self.table: 'OrderedDict[State, Tuple[float, int, int]]' = OrderedDict()
+        # Маска положения корабля -> маска с окрестностью
+        self.halos: Dict[int, int] = {}
+        self.loaded_sizes = set()
+        self.nodes = 0
+
+    def _tables(self, ship_size: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        _, masks, halos = placement_table(self.size, ship_size)
+        if ship_size not in self.loaded_sizes:
+            self.halos.update(zip(masks, halos))
+            self.loaded_sizes.add(ship_size)
+        return masks, halos
+
+    def configurations(self, sizes: Tuple[int, ...], blocked: int,
+                       open_hits: int) -> Optional[List[Tuple[int, ...]]]:
+        """Все расстановки оставшихся кораблей (кортежи масок) или None, если их слишком много"""
+        tables = [self._tables(ship_size) for ship_size in sizes]
+        # Грубая верхняя оценка без учёта касаний: если она велика, не перечисляем
+        estimate = 1
+        for masks, _ in tables:
+            estimate *= sum(1 for mask in masks if not mask & blocked)
+        if estimate > ENUM_LIMIT * 4:
+            return None
+        result: List[Tuple[int, ...]] = []
+        chosen: List[int] = []
+
+        def place(depth: int, forbidden: int, covered: int, first: int) -> bool:
+            if depth == len(sizes):
+                if covered & open_hits == open_hits:
+                    result.append(tuple(chosen))
+                return len(result) <= ENUM_LIMIT
+            masks, halos = tables[depth]
+            # Одинаковые корабли ставим по возрастанию номера положения, без перестановок
+            start = first if depth and sizes[depth] == sizes[depth - 1] else 0
+            for index in range(start, len(masks)):
+                mask = masks[index]
+                # Корабль целиком из раненых клеток уже был бы потоплен, а раненая
+                # клетка рядом с кораблём, но не в нём, принадлежала бы касающемуся кораблю
+                if mask & forbidden or mask & ~open_hits == 0 \
+                        or open_hits & halos[index] & ~mask:
+                    continue
+                chosen.append(mask)
+                ok = place(depth + 1, forbidden | halos[index], covered | mask, index + 1)
+                chosen.pop()
+                if not ok:
+                    return False
+            return True
+
+        if not place(0, blocked, 0, 0):
+            return None
+        return result
+
+    def _remember(self, key: State, value: float, cell: int, cost: int) -> None:
+        self.table[key] = (value, cell, cost)
+        if len(self.table) > self.table_size:
+            self.table.popitem(last=False)
+
+    @staticmethod
+    def _cell_counts(configs: Sequence[Tuple[int, ...]], open_hits: int) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for config in configs:
+            for mask in config:
+                mask &= ~open_hits
+                while mask:
+                    low = mask & -mask
+                    cell = low.bit_length() - 1
+                    counts[cell] = counts.get(cell, 0) + 1
+                    mask ^= low
+        return counts
+
+    def _value(self, key: State, configs: List[Tuple[int, ...]]) -> float:
+        sizes, blocked, open_hits = key
+        if not sizes:
+            return 0.0
+        cached = self.table.get(key)
+        if cached is not None:
+            self.table.move_to_end(key)
+            # Стоимость как при подсчёте с нуля - иначе исход зависел бы от содержимого таблицы
+            self.nodes += cached[2]
+            if self.nodes > self.node_limit:
+                raise _Timeout()
+            return cached[0]
+        start = self.nodes
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise _Timeout()
+
+        total = len(configs)
+        counts = self._cell_counts(configs, open_hits)
+        # Нижняя оценка: каждая ещё не раненая клетка кораблей стоит выстрела
+        bound = sum(sizes) - bin(open_hits).count("1")
+        if total == 1:
+            self._remember(key, float(bound), next(iter(counts)), 1)
+            return float(bound)
+
+        best, best_cell = float("inf"), -1
+        # Клетки по убыванию вероятности попадания. Выстрел стоит не меньше
+        # bound + вероятность промаха, поэтому, как только эта оценка не лучше
+        # найденного, остальные клетки можно не смотреть
+        for cell in sorted(counts, key=counts.get, reverse=True):
+            if bound + (total - counts[cell]) / total >= best:
+                break
+            bit = 1 << cell
+            missed: List[Tuple[int, ...]] = []
+            wounded: List[Tuple[int, ...]] = []
+            sunk: Dict[int, List[Tuple[int, ...]]] = {}
+            for config in configs:
+                for mask in config:
+                    if mask & bit:
+                        if mask & ~(open_hits | bit):
+                            wounded.append(config)
+                        else:
+                            rest = list(config)
+                            rest.remove(mask)
+                            sunk.setdefault(mask, []).append(tuple(rest))
+                        break
+                else:
+                    missed.append(config)
+
+            # Оценка уточняется по мере подсчёта исходов и только растёт
+            expected = bound + len(missed) / total
+            if missed:
+                child = self._value((sizes, blocked | bit, open_hits), missed)
+                expected += len(missed) / total * (child - bound)
+            if wounded and expected < best:
+                child = self._value((sizes, blocked, open_hits | bit), wounded)
+                expected += len(wounded) / total * (child - bound + 1)
+            for mask, rest in sunk.items():
+                if expected >= best:
+                    break
+                remaining = list(sizes)
+                remaining.remove(bin(mask).count("1"))
+                child_key = (tuple(remaining), blocked | self.halos[mask], open_hits & ~mask)
+                expected += len(rest) / total * (self._value(child_key, rest) - bound + 1)
+            if expected < best:
+                best, best_cell = expected, cell
+        self._remember(key, best, best_cell, self.nodes - start)
+        return best
+
+    def best_shot(self, sizes: Sequence[int], blocked: int, open_hits: int) -> Optional[Tuple[int, int]]:
+        """Клетка для выстрела или None, если эндшпиль не наступил или состояние противоречиво"""
+        key = (tuple(sorted(sizes, reverse=True)), blocked, open_hits)
+        cached = self.table.get(key)
+        if cached is not None:
+            self.table.move_to_end(key)
+            return divmod(cached[1], self.size)
+
+        configs = self.configurations(key[0], blocked, open_hits)
+        if not configs:
+            return None
+        if len(configs) <= EXACT_LIMIT:
+            self.nodes = 0
+            try:
+                self._value(key, configs)
+                return divmod(self.table[key][1], self.size)
+            except _Timeout:
+                pass
+        counts = self._cell_counts(configs, open_hits)
+        return divmod(max(counts, key=counts.get), self.size)
+
+
+@lru_cache(maxsize=None)
+def solver_for(board_size: int) -> EndgameSolver:
+    """Общий решатель на размер поля: таблица транспозиций переживает партии"""
+    return EndgameSolver(board_size)
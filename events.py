@@ -0,0 +1,202 @@
+import json
+import sys
+from typing import IO, List, Optional, Tuple
+
+
+class EventSink:
+    """Приёмник игровых событий. Базовый класс ничего не делает и служит пустым приёмником.
+
+    Игровая логика вызывает методы приёмника вместо print, поэтому в безголовых
+    партиях с пустым приёмником не тратится время на форматирование текста.
+    """
+
+    def game_start(self, first, second) -> None:
+        pass
+
+    def turn(self, number: int) -> None:
+        pass
+
+    def player_turn(self, player, opponent) -> None:
+        pass
+
+    def ai_turn(self, player) -> None:
+        pass
+
+    def shot(self, player, x: int, y: int) -> None:
+        pass
+
+    def hit(self, player, x: int, y: int, ship) -> None:
+        pass
+
+    def miss(self, player, x: int, y: int) -> None:
+        pass
+
+    def sunk(self, player, ship) -> None:
+        pass
+
+    def no_targets(self, player) -> None:
+        pass
+
+    def game_over(self, winner, loser) -> None:
+        pass
+
+    def stats_saved(self, player, filename: str) -> None:
+        pass
+
+    def invalid_input(self, player) -> None:
+        pass
+
+    def input_read(self, prompt: str, answer: str) -> None:
+        """Игра прочитала ввод: терминал уже показал приглашение и эхо ответа"""
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+NullSink = EventSink
+
+
+class MultiSink(EventSink):
+    """Передаёт каждое событие всем вложенным приёмникам по порядку"""
+
+    def __init__(self, *sinks: EventSink):
+        self.sinks = sinks
+
+
+def _fan_out(name: str):
+    def method(self, *args):
+        for sink in self.sinks:
+            getattr(sink, name)(*args)
+    method.__name__ = name
+    return method
+
+
+for _name in ("game_start", "turn", "player_turn", "ai_turn", "shot", "hit", "miss", "sunk",
+              "no_targets", "game_over", "stats_saved", "invalid_input", "input_read", "flush"):
+    setattr(MultiSink, _name, _fan_out(_name))
+del _name
+
+
+class ConsoleRenderer(EventSink):
+    """Текстовый вывод в консоль, как в исходной игре"""
+
+    def __init__(self, out: Optional[IO[str]] = None):
+        self.out = out
+
+    def _print(self, *lines: str) -> None:
+        print(*lines, sep="\n", file=self.out or sys.stdout)
+
+    def game_start(self, first, second) -> None:
+        self._print("\nНачинаем игру!", "="*40)
+
+    def turn(self, number: int) -> None:
+        self._print(f"\nХод {number}", "-"*20)
+
+    def show_board(self, board, show_ships: bool) -> None:
+        # Не board.display(): тот печатает в sys.stdout мимо self.out
+        self._print(board.header(), *(board.render_row(x, show_ships) for x in range(board.size)))
+
+    def player_turn(self, player, opponent) -> None:
+        self._print(f"\nХод игрока {player.name}", "Ваше поле:")
+        self.show_board(player.board, True)
+        self._print("\nПоле противника:")
+        self.show_board(opponent.board, False)
+
+        self._print(f"\nСтатистика {player.name}:",
+                    f"Выстрелы: {player.shots} | Попадания: {player.hits} | Промахи: {player.misses}",
+                    f"Точность: {player.get_accuracy():.1f}% | Потоплено кораблей: {player.ships_sunk}")
+
+    def ai_turn(self, player) -> None:
+        self._print(f"\nХод компьютера {player.name} (уровень: {player.difficulty})")
+
+    def shot(self, player, x: int, y: int) -> None:
+        # Человек сам вводит координаты, повторять их незачем
+        if player.is_ai:
+            self._print(f"Компьютер стреляет в {x} {y}")
+
+    def hit(self, player, x: int, y: int, ship) -> None:
+        self._print("Попадание!")
+
+    def miss(self, player, x: int, y: int) -> None:
+        self._print("Промах!")
+
+    def sunk(self, player, ship) -> None:
+        self._print(f"{ship.name} размером {ship.size} потоплен!")
+
+    def no_targets(self, player) -> None:
+        self._print("Компьютер не нашел доступных клеток для выстрела!")
+
+    def game_over(self, winner, loser) -> None:
+        self._print("\n" + "="*40, f"Поздравляем, {winner.name} победил!", "="*40)
+
+        self._print("\nИтоговое поле победителя:")
+        self.show_board(winner.board, True)
+
+        self._print("\nИтоговое поле проигравшего:")
+        self.show_board(loser.board, True)
+
+        self._print("\nИтоговая статистика:",
+                    f"{'Параметр':<15} {'Победитель':<15} {'Проигравший':<15}",
+                    "-"*45,
+                    f"{'Имя':<15} {winner.name:<15} {loser.name:<15}",
+                    f"{'Выстрелы':<15} {winner.shots:<15} {loser.shots:<15}",
+                    f"{'Попадания':<15} {winner.hits:<15} {loser.hits:<15}",
+                    f"{'Точность':<15} {winner.get_accuracy():<15.1f}% {loser.get_accuracy():<15.1f}%",
+                    f"{'Потоплено':<15} {winner.ships_sunk:<15} {loser.ships_sunk:<15}",
+                    f"{'Очки':<15} {winner.score:<15} {loser.score:<15}")
+
+    def stats_saved(self, player, filename: str) -> None:
+        self._print(f"\nСтатистика игры сохранена в файл {filename}")
+
+    def invalid_input(self, player) -> None:
+        self._print("Неверный ввод. Введите координаты как два числа через пробел.")
+
+
+class BufferedSink(EventSink):
+    """Копит события в памяти и пишет их пачками как строки JSON.
+
+    Каждое событие - кортеж (тип, данные). Без потока события просто
+    накапливаются в events, например для тестов или разбора партии.
+    """
+
+    def __init__(self, stream: Optional[IO[str]] = None, batch_size: int = 1000):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.events: List[Tuple[str, tuple]] = []
+
+    def _emit(self, kind: str, *data) -> None:
+        self.events.append((kind, data))
+        if self.stream is not None and len(self.events) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.stream is None or not self.events:
+            return
+        self.stream.write("".join(
+            json.dumps({"event": kind, "data": data}, ensure_ascii=False) + "\n"
+            for kind, data in self.events))
+        self.stream.flush()
+        self.events.clear()
+
+    def game_start(self, first, second) -> None:
+        self._emit("game_start", first.name, second.name)
+
+    def turn(self, number: int) -> None:
+        self._emit("turn", number)
+
+    def shot(self, player, x: int, y: int) -> None:
+        self._emit("shot", player.name, x, y)
+
+    def hit(self, player, x: int, y: int, ship) -> None:
+        self._emit("hit", player.name, x, y)
+
+    def miss(self, player, x: int, y: int) -> None:
+        self._emit("miss", player.name, x, y)
+
+    def sunk(self, player, ship) -> None:
+        self._emit("sunk", player.name, ship.size, ship.positions)
+
+    def game_over(self, winner, loser) -> None:
+        self._emit("game_over", winner.name, loser.name, winner.shots, loser.shots)
+        self.flush()
@@ -1,11 +1,34 @@
 import random
-from typing import List, Tuple, Optional, Dict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Tuple, Optional, Dict
 import time
-import json
 import os
-from datetime import datetime
+
+from events import ConsoleRenderer, EventSink, MultiSink, NullSink
+import snapshot
+
+# Модули компьютерного игрока, расстановки, вывода и записи партий импортируются
+# там, где нужны: меню при запуске их не ждёт (см. benchmarks.py --startup)
+if TYPE_CHECKING:
+    from opening_book import OpeningBook
+
+# stats_store и stats_query тянут sqlite3 и datetime, поэтому импортируются
+# при сохранении или показе статистики, а не при запуске игры
+
+SHIP_SIZES = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]
 
 class Ship:
+    # Симулятор создаёт сотни тысяч кораблей: __slots__ убирает у каждого __dict__
+    __slots__ = ("size", "positions", "hits", "name")
+
+    NAMES = {
+        1: "Катер",
+        2: "Эсминец",
+        3: "Крейсер",
+        4: "Линкор",
+        5: "Авианосец"
+    }
+
     def __init__(self, size: int, positions: List[Tuple[int, int]]):
         self.size = size
         self.positions = positions
@@ -23,40 +46,155 @@ class Ship:
     
     @staticmethod
     def get_ship_name(size: int) -> str:
-        names = {
-            1: "Катер",
-            2: "Эсминец",
-            3: "Крейсер",
-            4: "Линкор",
-            5: "Авианосец"
-        }
-        return names.get(size, "Корабль")
+        return Ship.NAMES.get(size, "Корабль")
+
+class GameConfig:
+    """Размер поля и состав флота для партии"""
+
+    def __init__(self, board_size: int = 10, ship_sizes: Optional[List[int]] = None):
+        ship_sizes = list(SHIP_SIZES if ship_sizes is None else ship_sizes)
+        if board_size < 1:
+            raise ValueError("Размер поля должен быть положительным")
+        if not ship_sizes:
+            raise ValueError("Флот не может быть пустым")
+        if any(size < 1 or size > board_size for size in ship_sizes):
+            raise ValueError(f"Корабли должны иметь размер от 1 до {board_size}")
+        # Иначе компьютер не смог бы разместить флот, а человек бесконечно получал бы отказ.
+        # Стандартный флот помещается на любое поле от 10x10, и настройки по умолчанию
+        # перебор не запускают. find_fleet кэширует ответ и не зависит от случайности
+        if ship_sizes != SHIP_SIZES or board_size < 10:
+            from placement import PlacementError, PlacementUnverified, find_fleet
+
+            try:
+                find_fleet(board_size, ship_sizes)
+            except PlacementError:
+                raise ValueError(f"Флот не помещается на поле {board_size}x{board_size}") from None
+            except PlacementUnverified:
+                raise ValueError(f"Не удалось проверить, помещается ли флот на поле "
+                                 f"{board_size}x{board_size}: слишком плотная расстановка") from None
+        self.board_size = board_size
+        self.ship_sizes = ship_sizes
+
+    @classmethod
+    def parse(cls, board_size: str, ship_sizes: str) -> 'GameConfig':
+        """Конфигурация из пользовательского ввода: "15" и "5 4 3 3 2 1" """
+        return cls(int(board_size), [int(size) for size in ship_sizes.split()])
+
+class _GridRow:
+    def __init__(self, board: 'Board', x: int):
+        self.board = board
+        self.x = x
+
+    def __getitem__(self, y: int) -> str:
+        if not 0 <= y < self.board.size:
+            raise IndexError(y)
+        return self.board.cell(self.x, y)
+
+    def __len__(self) -> int:
+        return self.board.size
+
+class _GridView:
+    """Только для чтения: grid[x][y] как у прежней плотной сетки"""
+
+    def __init__(self, board: 'Board'):
+        self.board = board
+
+    def __getitem__(self, x: int) -> _GridRow:
+        if not 0 <= x < self.board.size:
+            raise IndexError(x)
+        return _GridRow(self.board, x)
+
+    def __len__(self) -> int:
+        return self.board.size
+
+# Журнал changed_rows длиннее стольких записей на строку поля сбрасывается:
+# на безголовых и серверных полях его никто не читает
+CHANGED_ROWS_PER_ROW = 4
+
+
+def ask(events: EventSink, prompt: str) -> str:
+    """input() во время партии. Приёмник узнаёт о вводе, чтобы отрисовщик
+    учёл строки приглашения и эха под кадром"""
+    answer = input(prompt)
+    events.input_read(prompt, answer)
+    return answer
+
+
+@lru_cache(maxsize=16)
+def _water_row(size: int) -> str:
+    """Пустая строка поля без номера - шаблон, на который накладываются отметки"""
+    return " ~" * size
+
+
+@lru_cache(maxsize=16)
+def _header(size: int) -> str:
+    return "   " + " ".join(f"{i:2}" for i in range(size))
+
 
 class Board:
+    # __weakref__ нужен DiffConsoleRenderer: он держит кэш строк в WeakKeyDictionary
+    __slots__ = ("size", "cells", "rows", "ship_at", "ships", "hit_cells", "miss_cells",
+                 "changed_rows", "generation", "__weakref__")
+
     def __init__(self, size: int = 10):
         self.size = size
-        self.grid = [['~' for _ in range(size)] for _ in range(size)]
+        # Хранятся только непустые клетки: '■', 'X' или '○'. Всё остальное - вода '~'
+        self.cells = {}
+        # Те же отметки по строкам {x: {y: отметка}}: строка рисуется без обхода поля
+        self.rows = {}
+        self.ship_at = {}
         self.ships = []
         self.hit_cells = set()
         self.miss_cells = set()
+        # Журнал изменённых строк: отрисовщики перерисовывают только их.
+        # generation растёт при reset() и сбросе журнала, после чего
+        # отрисовщики перерисовывают поле целиком
+        self.changed_rows = []
+        self.generation = 0
+
+    def reset(self) -> None:
+        """Пустое поле того же размера для следующей партии, без новых контейнеров"""
+        self.cells.clear()
+        self.rows.clear()
+        self.ship_at.clear()
+        self.ships.clear()
+        self.hit_cells.clear()
+        self.miss_cells.clear()
+        self.changed_rows.clear()
+        self.generation += 1
+
+    def forget_changes(self) -> None:
+        """Сбрасывает журнал изменённых строк; отрисовщики перерисуют поле целиком"""
+        self.changed_rows.clear()
+        self.generation += 1
+
+    @property
+    def grid(self) -> _GridView:
+        return _GridView(self)
+
+    def cell(self, x: int, y: int) -> str:
+        return self.cells.get((x, y), '~')
     
     def place_ship(self, ship: Ship) -> bool:
         for x, y in ship.positions:
             if not (0 <= x < self.size and 0 <= y < self.size):
                 return False
-            if self.grid[x][y] != '~':
+            if (x, y) in self.cells:
                 return False
         
         for x, y in ship.positions:
             for dx in [-1, 0, 1]:
                 for dy in [-1, 0, 1]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.size and 0 <= ny < self.size:
-                        if self.grid[nx][ny] != '~':
-                            return False
+                    if (x + dx, y + dy) in self.cells:
+                        return False
         
         for x, y in ship.positions:
-            self.grid[x][y] = '■'
+            self.cells[(x, y)] = '■'
+            self.rows.setdefault(x, {})[y] = '■'
+            self.ship_at[(x, y)] = ship
+            self.changed_rows.append(x)
+        if len(self.changed_rows) > CHANGED_ROWS_PER_ROW * self.size:
+            self.forget_changes()
         
         self.ships.append(ship)
         return True
@@ -65,21 +203,23 @@ class Board:
         if not (0 <= x < self.size and 0 <= y < self.size):
             return False, None
         
-        if self.grid[x][y] == 'X' or self.grid[x][y] == '○':
+        cell = self.cells.get((x, y))
+        if cell == 'X' or cell == '○':
             return False, None
         
-        hit_ship = None
-        for ship in self.ships:
-            if ship.hit((x, y)):
-                hit_ship = ship
-                break
-        
+        self.changed_rows.append(x)
+        if len(self.changed_rows) > CHANGED_ROWS_PER_ROW * self.size:
+            self.forget_changes()
+        hit_ship = self.ship_at.get((x, y))
         if hit_ship:
-            self.grid[x][y] = 'X'
+            hit_ship.hit((x, y))
+            self.cells[(x, y)] = 'X'
+            self.rows[x][y] = 'X'
             self.hit_cells.add((x, y))
             return True, hit_ship
         else:
-            self.grid[x][y] = '○'
+            self.cells[(x, y)] = '○'
+            self.rows.setdefault(x, {})[y] = '○'
             self.miss_cells.add((x, y))
             return False, None
     
@@ -87,28 +227,153 @@ class Board:
         return all(ship.is_sunk() for ship in self.ships)
     
     def display(self, show_ships: bool = False) -> None:
-        print("   " + " ".join(f"{i:2}" for i in range(self.size)))
-        for i in range(self.size):
-            row = []
-            for j in range(self.size):
-                cell = self.grid[i][j]
-                if not show_ships and cell == '■':
-                    row.append(' ~')
-                else:
-                    row.append(f" {cell}")
-            print(f"{i:2}" + "".join(row))
+        # Только через header() и render_row(): их реализуют и Board, и BitBoard
+        print(self.header())
+        for x in range(self.size):
+            print(self.render_row(x, show_ships))
     
+    def header(self) -> str:
+        return _header(self.size)
+
+    def row_marks(self, x: int) -> Dict[int, str]:
+        """Непустые клетки строки x: {y: отметка}. Словарь не изменять"""
+        return self.rows.get(x, {})
+
+    def render_row(self, x: int, show_ships: bool = False) -> str:
+        # Шаблон пустой строки и отметки только этой строки, без опроса каждой клетки
+        marks = self.row_marks(x)
+        if not show_ships:
+            marks = {y: mark for y, mark in marks.items() if mark != '■'}
+        if not marks:
+            return f"{x:2}" + _water_row(self.size)
+        row = [' ~'] * self.size
+        for y, mark in marks.items():
+            row[y] = f" {mark}"
+        return f"{x:2}" + "".join(row)
+
     def get_ship_at_position(self, x: int, y: int) -> Optional[Ship]:
-        for ship in self.ships:
-            if (x, y) in ship.positions:
-                return ship
-        return None
+        return self.ship_at.get((x, y))
+
+    def snapshot(self) -> tuple:
+        """Состояние поля из примитивов: корабли и обстрелянные клетки индексами x * size + y"""
+        size = self.size
+        return (size, [(ship.size, [x * size + y for x, y in ship.positions]) for ship in self.ships],
+                [x * size + y for x, y in self.hit_cells], [x * size + y for x, y in self.miss_cells])
+
+    @classmethod
+    def from_snapshot(cls, state: tuple) -> 'Board':
+        # Попадания восстанавливаются через receive_attack, заодно с попаданиями в корабли
+        size, ships, hit_cells, miss_cells = state
+        board = cls(size)
+        for ship_size, cells in ships:
+            board.place_ship(Ship(ship_size, [divmod(cell, size) for cell in cells]))
+        for cell in hit_cells:
+            board.receive_attack(*divmod(cell, size))
+        for cell in miss_cells:
+            board.receive_attack(*divmod(cell, size))
+        return board
+
+class ShotPool:
+    """Множество ещё не обстрелянных клеток с проверкой, удалением и случайным выбором за O(1).
+
+    Клетки лежат в виртуальном массиве [0, count): удаление меняет клетку местами
+    с последней и уменьшает count. Массив не хранится целиком - в словарях
+    записаны только переставленные клетки, поэтому память растёт с числом
+    выстрелов, а не с площадью поля.
+    """
+
+    def __init__(self, size: int, rng: Optional[random.Random] = None):
+        self.size = size
+        self.rng = rng if rng is not None else random.Random()
+        self.count = size * size
+        self._slots = {}
+        self._where = {}
+
+    def reset(self) -> None:
+        self.count = self.size * self.size
+        self._slots.clear()
+        self._where.clear()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, shot: Tuple[int, int]) -> bool:
+        x, y = shot
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return False
+        cell = x * self.size + y
+        return self._where.get(cell, cell) < self.count
+
+    def __iter__(self):
+        for position in range(self.count):
+            yield divmod(self._slots.get(position, position), self.size)
+
+    def _take(self, position: int, cell: int) -> None:
+        last = self.count - 1
+        if position != last:
+            moved = self._slots.get(last, last)
+            self._slots[position] = moved
+            self._where[moved] = position
+        self._slots.pop(last, None)
+        self._where[cell] = last
+        self.count = last
+
+    def remove(self, shot: Tuple[int, int]) -> None:
+        if shot not in self:
+            raise ValueError(f"Клетка {shot} уже удалена")
+        cell = shot[0] * self.size + shot[1]
+        self._take(self._where.get(cell, cell), cell)
+
+    def discard(self, shot: Tuple[int, int]) -> None:
+        if shot in self:
+            self.remove(shot)
+
+    def pop(self) -> Tuple[int, int]:
+        """Удаляет и возвращает случайную клетку"""
+        if not self.count:
+            raise IndexError("pop from empty ShotPool")
+        position = self.rng.randrange(self.count)
+        cell = self._slots.get(position, position)
+        self._take(position, cell)
+        return divmod(cell, self.size)
+
+    def snapshot(self) -> tuple:
+        # Копии: снимок в памяти не должен меняться вместе с пулом
+        return self.count, dict(self._slots), dict(self._where)
+
+    def restore(self, state: tuple) -> None:
+        count, slots, where = state
+        self.count = count
+        self._slots = dict(slots)
+        self._where = dict(where)
+
+class GameInterrupted(Exception):
+    """Игрок прервал партию командой 'q'"""
+
 
 class Player:
-    def __init__(self, name: str):
+    # __weakref__ нужен instrumentation: он держит незаконченные ходы в WeakKeyDictionary
+    __slots__ = ("name", "config", "events", "board", "enemy_board", "score", "shots", "hits",
+                 "misses", "ships_sunk", "__weakref__")
+    is_ai = False
+
+    def __init__(self, name: str, board_factory: Callable[[int], Board] = Board,
+                 config: Optional[GameConfig] = None, events: Optional[EventSink] = None):
         self.name = name
-        self.board = Board()
-        self.enemy_board = Board()
+        self.config = config if config is not None else GameConfig()
+        self.events = events if events is not None else ConsoleRenderer()
+        self.board = board_factory(self.config.board_size)
+        self.enemy_board = board_factory(self.config.board_size)
+        self.score = 0
+        self.shots = 0
+        self.hits = 0
+        self.misses = 0
+        self.ships_sunk = 0
+
+    def reset(self) -> None:
+        """Готовит игрока к новой партии: поля очищаются, счётчики обнуляются"""
+        self.board.reset()
+        self.enemy_board.reset()
         self.score = 0
         self.shots = 0
         self.hits = 0
@@ -116,7 +381,7 @@ class Player:
         self.ships_sunk = 0
     
     def place_ships(self) -> None:
-        ship_sizes = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]
+        ship_sizes = self.config.ship_sizes
         print(f"\n{self.name}, доступные корабли:")
         for size in ship_sizes:
             print(f"- {Ship.get_ship_name(size)} (размер: {size})")
@@ -155,34 +420,26 @@ class Player:
         input("Нажмите Enter чтобы продолжить...")
 
     def make_move(self, opponent: 'Player') -> bool:
-        print(f"\nХод игрока {self.name}")
-        print("Ваше поле:")
-        self.board.display(show_ships=True)
-        print("\nПоле противника:")
-        opponent.board.display(show_ships=False)
-        
-        # Показать статистику
-        print(f"\nСтатистика {self.name}:")
-        print(f"Выстрелы: {self.shots} | Попадания: {self.hits} | Промахи: {self.misses}")
-        print(f"Точность: {self.get_accuracy():.1f}% | Потоплено кораблей: {self.ships_sunk}")
+        # Поля и статистика игрока
+        self.events.player_turn(self, opponent)
         
         while True:
             try:
-                coords = input("Введите координаты для выстрела (строка столбец) или 'q' для выхода: ")
+                coords = ask(self.events, "Введите координаты для выстрела (строка столбец) или 'q' для выхода: ")
                 if coords.lower() == 'q':
-                    print("Игра прервана.")
-                    exit()
+                    raise GameInterrupted()
                 
                 x, y = map(int, coords.split())
+                self.events.shot(self, x, y)
                 hit, ship = opponent.board.receive_attack(x, y)
                 self.shots += 1
                 
                 if hit:
                     self.hits += 1
-                    print("Попадание!")
+                    self.events.hit(self, x, y, ship)
                     if ship.is_sunk():
                         self.ships_sunk += 1
-                        print(f"{ship.name} размером {ship.size} потоплен!")
+                        self.events.sunk(self, ship)
                         # Награда за потопление корабля
                         self.score += ship.size * 10
                     else:
@@ -191,17 +448,22 @@ class Player:
                     return True
                 else:
                     self.misses += 1
-                    print("Промах!")
+                    self.events.miss(self, x, y)
                     return False
             except ValueError:
-                print("Неверный ввод. Введите координаты как два числа через пробел.")
+                self.events.invalid_input(self)
 
     def get_accuracy(self) -> float:
         if self.shots == 0:
             return 0.0
         return (self.hits / self.shots) * 100
     
-    def save_stats(self, filename: str = "battleship_stats.json") -> None:
+    def save_stats(self, filename: Optional[str] = None) -> None:
+        from datetime import datetime
+
+        from stats_store import DEFAULT_DB, StatsStore
+
+        filename = filename or DEFAULT_DB
         stats = {
             "player": self.name,
             "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -213,71 +475,132 @@ class Player:
             "score": self.score
         }
         
-        all_stats = []
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                try:
-                    all_stats = json.load(f)
-                except json.JSONDecodeError:
-                    all_stats = []
+        with StatsStore(filename) as store:
+            store.append(stats)
         
-        all_stats.append(stats)
-        
-        with open(filename, "w") as f:
-            json.dump(all_stats, f, indent=2)
-        
-        print(f"\nСтатистика игры сохранена в файл {filename}")
+        self.events.stats_saved(self, filename)
+
+    def snapshot(self) -> tuple:
+        return (self.name, self.score, self.shots, self.hits, self.misses, self.ships_sunk,
+                self.board.snapshot())
+
+    def restore(self, state: tuple) -> None:
+        self.name, self.score, self.shots, self.hits, self.misses, self.ships_sunk, board = state
+        self.board = type(self.board).from_snapshot(board)
 
 class AIPlayer(Player):
+    __slots__ = ("rng", "verbose", "last_hits", "directions", "current_direction", "first_hit",
+                 "difficulty", "randomness", "available_shots", "density", "book_entry",
+                 "opening_pos", "endgame")
+    is_ai = True
+
     DIFFICULTY_LEVELS = {
         "easy": {"delay": 2.0, "randomness": 0.7},
         "medium": {"delay": 1.0, "randomness": 0.4},
-        "hard": {"delay": 0.5, "randomness": 0.1}
+        "hard": {"delay": 0.5, "randomness": 0.1},
+        "expert": {"delay": 0.5, "randomness": 0.0}
     }
+    # Уровни, которые пользуются дебютной книгой, и сколько расстановок
+    # сравнивается по книге при размещении флота
+    BOOK_LEVELS = ("hard", "expert")
+    PLACEMENT_CANDIDATES = 8
+    # Уровни, которые добивают последние корабли перебором расстановок. У "expert"
+    # карта плотности целится почти так же точно, и решатель его только замедляет
+    ENDGAME_LEVELS = ("hard",)
     
-    def __init__(self, difficulty: str = "medium"):
-        super().__init__("Компьютер")
+    def __init__(self, difficulty: str = "medium", rng: Optional[random.Random] = None,
+                 verbose: bool = True, board_factory: Callable[[int], Board] = Board,
+                 config: Optional[GameConfig] = None, events: Optional[EventSink] = None,
+                 book: Optional['OpeningBook'] = None, randomness: Optional[float] = None,
+                 endgame: bool = True):
+        # rng позволяет симулятору задавать собственный генератор для каждого процесса,
+        # verbose=False отключает задержки и по умолчанию подставляет пустой приёмник событий.
+        # randomness заменяет значение уровня - так турнир подбирает уровни сложности.
+        # endgame=False отключает решатель эндшпиля: он замедляет массовые прогоны
+        if events is None:
+            events = ConsoleRenderer() if verbose else NullSink()
+        super().__init__("Компьютер", board_factory, config, events)
+        self.rng = rng if rng is not None else random.Random()
+        self.verbose = verbose
         self.last_hits = []
         self.directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
         self.current_direction = None
         self.first_hit = None
         self.difficulty = difficulty if difficulty in self.DIFFICULTY_LEVELS else "medium"
-        self.available_shots = [(x, y) for x in range(10) for y in range(10)]
-        random.shuffle(self.available_shots)
-    
+        self.randomness = randomness if randomness is not None \
+            else self.DIFFICULTY_LEVELS[self.difficulty]["randomness"]
+        self.available_shots = ShotPool(self.board.size, self.rng)
+        # Уровень "expert" выбирает выстрел по карте плотности оставшихся кораблей.
+        # На огромных полях её таблицы не помещаются в память, и "expert" играет
+        # как "hard" без случайных выстрелов
+        self.density = None
+        if not self.uses_randomness(self.difficulty, self.board.size):
+            from targeting import DensityMap
+
+            self.density = DensityMap(self.board.size, self.config.ship_sizes)
+        # Книга не стоит ничего во время хода: поиск идёт по готовому порядку клеток,
+        # а расстановки сравниваются только при размещении флота
+        self.book_entry = None
+        if book is not None and self.difficulty in self.BOOK_LEVELS:
+            self.book_entry = book.entry(self.board.size, self.config.ship_sizes)
+        self.opening_pos = 0
+        self.endgame = None
+        if endgame and self.difficulty in self.ENDGAME_LEVELS:
+            from endgame import solver_for
+            from placement import TABLE_MAX_BOARD_SIZE
+
+            if self.board.size <= TABLE_MAX_BOARD_SIZE:
+                self.endgame = solver_for(self.board.size)
+
+    @staticmethod
+    def uses_randomness(difficulty: str, board_size: int) -> bool:
+        """Влияет ли randomness на игру уровня: "expert" с картой плотности её не читает"""
+        from targeting import DensityMap
+
+        return not (difficulty == "expert" and board_size <= DensityMap.MAX_BOARD_SIZE)
+
+    def reset(self) -> None:
+        """Новая партия с тем же уровнем, генератором, книгой и решателем эндшпиля"""
+        super().reset()
+        self.last_hits = []
+        self.current_direction = None
+        self.first_hit = None
+        self.available_shots.reset()
+        if self.density is not None:
+            self.density.reset()
+        self.opening_pos = 0
+
     def place_ships(self) -> None:
-        ship_sizes = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]
-        for size in ship_sizes:
-            placed = False
-            attempts = 0
-            
-            while not placed and attempts < 100:
-                x = random.randint(0, self.board.size - 1)
-                y = random.randint(0, self.board.size - 1)
-                orientation = random.choice(['г', 'в'])
-                
-                positions = []
-                if orientation == 'г':
-                    for i in range(size):
-                        positions.append((x, y + i))
-                else:
-                    for i in range(size):
-                        positions.append((x + i, y))
-                
-                ship = Ship(size, positions)
-                if self.board.place_ship(ship):
-                    placed = True
-                else:
-                    attempts += 1
-            
-            if not placed:
-                print(f"Компьютер не смог разместить корабль размером {size} после 100 попыток.")
+        from placement import make_fleet_sampler
+
+        ship_sizes = self.config.ship_sizes
+        sampler = make_fleet_sampler(self.board.size, ship_sizes, self.rng)
+        fleet = sampler.sample()
+        if self.book_entry is not None:
+            # Из нескольких случайных расстановок берём ту, куда соперники стреляют позже
+            cost = self.book_entry.placement_cost(fleet)
+            for _ in range(self.PLACEMENT_CANDIDATES - 1):
+                candidate = sampler.sample()
+                candidate_cost = self.book_entry.placement_cost(candidate)
+                if candidate_cost < cost:
+                    fleet, cost = candidate, candidate_cost
+        for size, positions in zip(ship_sizes, fleet):
+            self.board.place_ship(Ship(size, positions))
     
     def make_move(self, opponent: Player) -> bool:
-        print(f"\nХод компьютера {self.name} (уровень: {self.difficulty})")
-        time.sleep(self.DIFFICULTY_LEVELS[self.difficulty]["delay"])
+        self.events.ai_turn(self)
+        if self.verbose:
+            time.sleep(self.DIFFICULTY_LEVELS[self.difficulty]["delay"])
+
+        if self.endgame is not None:
+            target = self.endgame_shot(opponent)
+            if target is not None:
+                return self.make_endgame_move(opponent, *target)
 
-        if self.last_hits and random.random() > self.DIFFICULTY_LEVELS[self.difficulty]["randomness"]:
+        if self.density is not None:
+            return self.make_density_move(opponent)
+
+        if self.last_hits and self.rng.random() > self.randomness:
             if not self.current_direction:
                 if not self.first_hit:
                     self.first_hit = self.last_hits[0]
@@ -287,9 +610,9 @@ class AIPlayer(Player):
                     x += dx
                     y += dy
                     if 0 <= x < self.board.size and 0 <= y < self.board.size:
-                        if opponent.board.grid[x][y] not in ['X', '○'] and (x, y) in self.available_shots:
+                        if opponent.board.cell(x, y) not in ['X', '○'] and (x, y) in self.available_shots:
                             self.available_shots.remove((x, y))
-                            print(f"Компьютер стреляет в {x} {y}")
+                            self.events.shot(self, x, y)
                             hit, ship = opponent.board.receive_attack(x, y)
                             self.shots += 1
                             
@@ -297,11 +620,11 @@ class AIPlayer(Player):
                                 self.hits += 1
                                 self.last_hits.append((x, y))
                                 self.current_direction = (dx, dy)
-                                print("Попадание!")
+                                self.events.hit(self, x, y, ship)
                                 if ship.is_sunk():
                                     self.ships_sunk += 1
                                     self.score += ship.size * 10
-                                    print(f"{ship.name} размером {ship.size} потоплен!")
+                                    self.events.sunk(self, ship)
                                     self.last_hits = []
                                     self.current_direction = None
                                     self.first_hit = None
@@ -311,7 +634,7 @@ class AIPlayer(Player):
                                 return True
                             else:
                                 self.misses += 1
-                                print("Промах!")
+                                self.events.miss(self, x, y)
                                 return False
             else:
                 last_x, last_y = self.last_hits[-1]
@@ -320,20 +643,20 @@ class AIPlayer(Player):
                 y = last_y + dy
                 
                 if 0 <= x < self.board.size and 0 <= y < self.board.size:
-                    if opponent.board.grid[x][y] not in ['X', '○'] and (x, y) in self.available_shots:
+                    if opponent.board.cell(x, y) not in ['X', '○'] and (x, y) in self.available_shots:
                         self.available_shots.remove((x, y))
-                        print(f"Компьютер стреляет в {x} {y}")
+                        self.events.shot(self, x, y)
                         hit, ship = opponent.board.receive_attack(x, y)
                         self.shots += 1
                         
                         if hit:
                             self.hits += 1
                             self.last_hits.append((x, y))
-                            print("Попадание!")
+                            self.events.hit(self, x, y, ship)
                             if ship.is_sunk():
                                 self.ships_sunk += 1
                                 self.score += ship.size * 10
-                                print(f"{ship.name} размером {ship.size} потоплен!")
+                                self.events.sunk(self, ship)
                                 self.last_hits = []
                                 self.current_direction = None
                                 self.first_hit = None
@@ -343,7 +666,7 @@ class AIPlayer(Player):
                             return True
                         else:
                             self.misses += 1
-                            print("Промах!")
+                            self.events.miss(self, x, y)
                             self.current_direction = (-dx, -dy)
                             return False
                 else:
@@ -351,20 +674,20 @@ class AIPlayer(Player):
                     return self.make_move(opponent)
                 
         while self.available_shots:
-            x, y = self.available_shots.pop()
-            if opponent.board.grid[x][y] not in ['X', '○']:
-                print(f"Компьютер стреляет в {x} {y}")
+            x, y = self.hunt_shot()
+            if opponent.board.cell(x, y) not in ['X', '○']:
+                self.events.shot(self, x, y)
                 hit, ship = opponent.board.receive_attack(x, y)
                 self.shots += 1
                 
                 if hit:
                     self.hits += 1
                     self.last_hits.append((x, y))
-                    print("Попадание!")
+                    self.events.hit(self, x, y, ship)
                     if ship.is_sunk():
                         self.ships_sunk += 1
                         self.score += ship.size * 10
-                        print(f"{ship.name} размером {ship.size} потоплен!")
+                        self.events.sunk(self, ship)
                         self.last_hits = []
                         self.remove_adjacent_cells(ship, opponent)
                     else:
@@ -372,35 +695,191 @@ class AIPlayer(Player):
                     return True
                 else:
                     self.misses += 1
-                    print("Промах!")
+                    self.events.miss(self, x, y)
                     return False
         
-        print("Компьютер не нашел доступных клеток для выстрела!")
+        self.events.no_targets(self)
         return False
     
+    def make_density_move(self, opponent: Player) -> bool:
+        target = self.density.best_cell(self.rng)
+        if target is None:
+            self.events.no_targets(self)
+            return False
+
+        x, y = target
+        self.available_shots.discard((x, y))
+        self.events.shot(self, x, y)
+        hit, ship = opponent.board.receive_attack(x, y)
+        self.shots += 1
+
+        if hit:
+            self.hits += 1
+            self.density.record_hit(x, y)
+            self.events.hit(self, x, y, ship)
+            if ship.is_sunk():
+                self.ships_sunk += 1
+                self.score += ship.size * 10
+                self.events.sunk(self, ship)
+                self.density.record_sunk(ship.positions)
+                self.remove_adjacent_cells(ship, opponent)
+            else:
+                self.score += 5
+            return True
+        else:
+            self.misses += 1
+            self.density.record_miss(x, y)
+            self.events.miss(self, x, y)
+            return False
+
+    def endgame_shot(self, opponent: Player) -> Optional[Tuple[int, int]]:
+        """Выстрел решателя эндшпиля, если у соперника осталось мало кораблей.
+
+        Используется только открытая информация: результаты выстрелов и
+        потопленные корабли, которые целиком видны на поле.
+        """
+        from endgame import ENDGAME_SHIPS
+        from placement import halo_mask
+
+        board = opponent.board
+        remaining = [ship.size for ship in board.ships if not ship.is_sunk()]
+        if not remaining or len(remaining) > ENDGAME_SHIPS:
+            return None
+        size = board.size
+        blocked = open_hits = 0
+        for x, y in board.miss_cells:
+            blocked |= 1 << (x * size + y)
+        for x, y in board.hit_cells:
+            open_hits |= 1 << (x * size + y)
+        for ship in board.ships:
+            if ship.is_sunk():
+                mask = 0
+                for x, y in ship.positions:
+                    mask |= 1 << (x * size + y)
+                open_hits &= ~mask
+                blocked |= halo_mask(mask, size)
+        return self.endgame.best_shot(remaining, blocked, open_hits)
+
+    def make_endgame_move(self, opponent: Player, x: int, y: int) -> bool:
+        self.available_shots.discard((x, y))
+        self.events.shot(self, x, y)
+        hit, ship = opponent.board.receive_attack(x, y)
+        self.shots += 1
+
+        if hit:
+            self.hits += 1
+            self.last_hits.append((x, y))
+            if self.density is not None:
+                self.density.record_hit(x, y)
+            self.events.hit(self, x, y, ship)
+            if ship.is_sunk():
+                self.ships_sunk += 1
+                self.score += ship.size * 10
+                self.events.sunk(self, ship)
+                self.last_hits = []
+                self.current_direction = None
+                self.first_hit = None
+                if self.density is not None:
+                    self.density.record_sunk(ship.positions)
+                self.remove_adjacent_cells(ship, opponent)
+            else:
+                self.score += 5
+            return True
+        else:
+            self.misses += 1
+            if self.density is not None:
+                self.density.record_miss(x, y)
+            self.events.miss(self, x, y)
+            return False
+
+    def hunt_shot(self) -> Tuple[int, int]:
+        """Следующая клетка поиска: по порядку дебютной книги, иначе случайная"""
+        if self.book_entry is not None and self.density is None:
+            order = self.book_entry.order
+            while self.opening_pos < len(order):
+                shot = divmod(order[self.opening_pos], self.board.size)
+                self.opening_pos += 1
+                if shot in self.available_shots:
+                    self.available_shots.remove(shot)
+                    return shot
+        return self.available_shots.pop()
+
+    def snapshot(self) -> tuple:
+        density = self.density.snapshot() if self.density is not None else None
+        return (super().snapshot(), list(self.last_hits), self.current_direction, self.first_hit,
+                self.available_shots.snapshot(), snapshot.pack_random(self.rng), density,
+                self.opening_pos, self.randomness)
+
+    def restore(self, state: tuple) -> None:
+        (player, last_hits, direction, first_hit, shots, rng_state, density, opening_pos,
+         self.randomness) = state
+        super().restore(player)
+        self.opening_pos = opening_pos
+        self.last_hits = list(last_hits)
+        self.current_direction = direction
+        self.first_hit = first_hit
+        self.available_shots.restore(shots)
+        snapshot.unpack_random(self.rng, rng_state)
+        if density is not None and self.density is not None:
+            self.density.restore(density)
+
     def remove_adjacent_cells(self, ship: Ship, opponent: Player) -> None:
         """Удаляет соседние клетки потопленного корабля из доступных для выстрелов"""
         for x, y in ship.positions:
             for dx in [-1, 0, 1]:
                 for dy in [-1, 0, 1]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.board.size and 0 <= ny < self.board.size:
-                        if (nx, ny) in self.available_shots:
-                            self.available_shots.remove((nx, ny))
+                    self.available_shots.discard((x + dx, y + dy))
 
 class Game:
-    def __init__(self):
+    def __init__(self, config: Optional[GameConfig] = None, events: Optional[EventSink] = None,
+                 replay_path: Optional[str] = None,
+                 save_path: str = snapshot.DEFAULT_SAVE):
+        self.config = config if config is not None else GameConfig()
+        self.save_path = save_path
+        self.book = None
+        self.turn = 1
+        self.resumed = False
+        self.events = events
+        self.replay_path = replay_path
+        self.recorder = None
+        self.prepared = False
         print("Добро пожаловать в игру 'Морской бой'!")
         print("="*40)
         self.show_menu()
     
+    def prepare(self) -> None:
+        """Вывод, запись партий и дебютная книга - к первой партии, а не к запуску меню"""
+        if self.prepared:
+            return
+        self.prepared = True
+        from opening_book import BOOK_FILE, load_book
+        from replay import DEFAULT_REPLAYS, ReplayRecorder
+
+        if os.path.exists(BOOK_FILE):
+            try:
+                self.book = load_book(BOOK_FILE)
+            except (OSError, ValueError) as e:
+                print(f"Дебютная книга не загружена: {e}")
+        if self.events is None:
+            from rendering import DiffConsoleRenderer
+
+            self.events = DiffConsoleRenderer()
+        # Каждая партия дописывается в журнал: replay_path=None - журнал по умолчанию,
+        # пустая строка отключает запись
+        replay_path = DEFAULT_REPLAYS if self.replay_path is None else self.replay_path
+        if replay_path:
+            self.recorder = ReplayRecorder(replay_path)
+            self.events = MultiSink(self.events, self.recorder)
+
     def show_menu(self) -> None:
         while True:
             print("\nГлавное меню:")
             print("1. Играть против компьютера")
             print("2. Играть против другого игрока")
             print("3. Просмотреть статистику")
-            print("4. Выход")
+            print("4. Настройки поля и флота")
+            print("5. Продолжить сохранённую игру")
+            print("6. Выход")
             
             choice = input("Выберите опцию: ")
             
@@ -413,43 +892,73 @@ class Game:
             elif choice == '3':
                 self.show_stats()
             elif choice == '4':
+                self.configure()
+            elif choice == '5':
+                if self.resume():
+                    break
+            elif choice == '6':
                 print("До свидания!")
                 exit()
             else:
                 print("Неверный выбор. Попробуйте снова.")
     
+    def configure(self) -> None:
+        print(f"\nТекущий размер поля: {self.config.board_size}")
+        print(f"Текущий флот: {' '.join(map(str, self.config.ship_sizes))}")
+        size = input("Размер поля (Enter - оставить): ").strip() or str(self.config.board_size)
+        fleet = input("Размеры кораблей через пробел (Enter - оставить): ").strip() \
+            or " ".join(map(str, self.config.ship_sizes))
+        try:
+            self.config = GameConfig.parse(size, fleet)
+            print("Настройки сохранены.")
+        except ValueError as e:
+            print(f"Неверные настройки: {e}")
+
     def setup_game_vs_ai(self) -> None:
+        self.prepare()
         print("\nВыберите уровень сложности:")
         print("1. Легкий")
         print("2. Средний")
         print("3. Сложный")
+        print("4. Эксперт")
         
         while True:
-            choice = input("Ваш выбор (1-3): ")
-            if choice in ['1', '2', '3']:
-                difficulty = ["easy", "medium", "hard"][int(choice)-1]
+            choice = input("Ваш выбор (1-4): ")
+            if choice in ['1', '2', '3', '4']:
+                difficulty = ["easy", "medium", "hard", "expert"][int(choice)-1]
                 break
             print("Неверный выбор. Попробуйте снова.")
         
-        self.player1 = Player(input("Введите ваше имя: "))
-        self.player2 = AIPlayer(difficulty)
+        self.player1 = Player(input("Введите ваше имя: "), config=self.config, events=self.events)
+        self.player2 = AIPlayer(difficulty, config=self.config, events=self.events, book=self.book)
         self.current_player = self.player1
         self.opponent = self.player2
     
     def setup_game_vs_player(self) -> None:
-        self.player1 = Player(input("Введите имя первого игрока: "))
-        self.player2 = Player(input("Введите имя второго игрока: "))
+        self.prepare()
+        self.player1 = Player(input("Введите имя первого игрока: "), config=self.config,
+                              events=self.events)
+        self.player2 = Player(input("Введите имя второго игрока: "), config=self.config,
+                              events=self.events)
         self.current_player = self.player1
         self.opponent = self.player2
     
-    def show_stats(self, filename: str = "battleship_stats.json") -> None:
-        if not os.path.exists(filename):
+    def show_stats(self, filename: Optional[str] = None) -> None:
+        import sqlite3
+
+        from stats_query import leaderboard, percentiles
+        from stats_store import DEFAULT_DB, LEGACY_JSON, StatsStore
+
+        filename = filename or DEFAULT_DB
+        if not os.path.exists(filename) and not os.path.exists(LEGACY_JSON):
             print("Статистика пока недоступна.")
             return
         
         try:
-            with open(filename, "r") as f:
-                stats = json.load(f)
+            with StatsStore(filename) as store:
+                stats = store.recent(10)
+                leaders = leaderboard(store, "score", limit=5)
+                accuracy = percentiles(store, "accuracy", (50, 90))
             
             if not stats:
                 print("Статистика пока недоступна.")
@@ -460,14 +969,71 @@ class Game:
             print(f"{'Игрок':<15} {'Дата':<20} {'Выстрелы':<10} {'Попадания':<10} {'Точность':<10} {'Потоплено':<10} {'Очки':<10}")
             print("-"*80)
             
-            for game in sorted(stats, key=lambda x: x['date'], reverse=True)[:10]:
+            for game in stats:
                 print(f"{game['player']:<15} {game['date']:<20} {game['shots']:<10} {game['hits']:<10} "
                       f"{game['accuracy']:.1f}%{'':<3} {game['ships_sunk']:<10} {game['score']:<10}")
             
+            print("\nЛучшие игроки по сумме очков:")
+            print("="*80)
+            print(f"{'Игрок':<15} {'Игры':<10} {'Очки':<10} {'Средние':<10} {'Рекорд':<10} {'Точность':<10}")
+            print("-"*80)
+            for leader in leaders:
+                print(f"{leader.player:<15} {leader.games:<10} {leader.score_total:<10} "
+                      f"{leader.avg_score:<10.1f} {leader.best_score:<10} {leader.accuracy:.1f}%")
+            print(f"\nМедиана точности: {accuracy[50]:.1f}% | 90-й процентиль: {accuracy[90]:.1f}%")
+            
             input("\nНажмите Enter чтобы вернуться в меню...")
-        except json.JSONDecodeError:
+        except sqlite3.DatabaseError:
             print("Ошибка чтения файла статистики.")
     
+    def snapshot(self) -> tuple:
+        """Состояние партии: настройки, оба игрока, чей ход, номер хода и записанные выстрелы"""
+        players = [(player.difficulty if player.is_ai else None, player.snapshot())
+                   for player in (self.player1, self.player2)]
+        recording = self.recorder.snapshot() if self.recorder is not None else None
+        return (self.config.board_size, self.config.ship_sizes, players,
+                self.current_player is self.player1, self.turn, recording)
+
+    def restore(self, state: tuple) -> None:
+        board_size, ship_sizes, players, first_is_current, self.turn, recording = state
+        self.config = GameConfig(board_size, ship_sizes)
+        # Без записи начала партии продолженная игра в журнал не попадёт. Приёмник
+        # выбирается до создания игроков, иначе они слали бы выстрелы в ненужную запись
+        if self.recorder is not None:
+            if recording is None:
+                # Первый приёмник MultiSink из __init__ - исходный, без записи
+                self.events = self.events.sinks[0]
+                self.recorder = None
+            else:
+                self.recorder.restore(recording)
+        restored = []
+        for difficulty, player_state in players:
+            if difficulty is None:
+                player = Player(player_state[0], config=self.config, events=self.events)
+            else:
+                player = AIPlayer(difficulty, config=self.config, events=self.events, book=self.book)
+            player.restore(player_state)
+            restored.append(player)
+        self.player1, self.player2 = restored
+        if first_is_current:
+            self.current_player, self.opponent = self.player1, self.player2
+        else:
+            self.current_player, self.opponent = self.player2, self.player1
+
+    def resume(self) -> bool:
+        if not os.path.exists(self.save_path):
+            print("Сохранённой игры нет.")
+            return False
+        self.prepare()
+        try:
+            self.restore(snapshot.load(self.save_path))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Не удалось загрузить сохранение: {e}")
+            return False
+        self.resumed = True
+        print(f"Игра восстановлена, ход {self.turn}.")
+        return True
+
     def setup(self) -> None:
         print("\nЭтап размещения кораблей:")
         print("="*40)
@@ -482,44 +1048,30 @@ class Game:
             print("\nИгрок 2 размещает корабли:")
             self.player2.place_ships()
     def play(self) -> None:
-        print("\nНачинаем игру!")
-        print("="*40)
-        
-        turn = 1
         while True:
-            print(f"\nХод {turn}")
-            print("-"*20)
+            self.events.turn(self.turn)
             
-            if self.current_player.make_move(self.opponent):
+            try:
+                hit = self.current_player.make_move(self.opponent)
+            except GameInterrupted:
+                snapshot.save(self.save_path, self.snapshot())
+                print(f"Игра прервана и сохранена в файл {self.save_path}.")
+                exit()
+            if hit:
                 if self.opponent.board.all_ships_sunk():
                     self.end_game(self.current_player, self.opponent)
                     break
             else:
                 self.current_player, self.opponent = self.opponent, self.current_player
-                turn += 1
+                self.turn += 1
+            # Снимок после каждого хода, чтобы падение процесса не стоило партии
+            snapshot.save(self.save_path, self.snapshot())
             
-            input("\nНажмите Enter чтобы продолжить...")
+            ask(self.events, "\nНажмите Enter чтобы продолжить...")
     
     def end_game(self, winner: Player, loser: Player) -> None:
-        print("\n" + "="*40)
-        print(f"Поздравляем, {winner.name} победил!")
-        print("="*40)
-        
-        print("\nИтоговое поле победителя:")
-        winner.board.display(show_ships=True)
-        
-        print("\nИтоговое поле проигравшего:")
-        loser.board.display(show_ships=True)
-        
-        print("\nИтоговая статистика:")
-        print(f"{'Параметр':<15} {'Победитель':<15} {'Проигравший':<15}")
-        print("-"*45)
-        print(f"{'Имя':<15} {winner.name:<15} {loser.name:<15}")
-        print(f"{'Выстрелы':<15} {winner.shots:<15} {loser.shots:<15}")
-        print(f"{'Попадания':<15} {winner.hits:<15} {loser.hits:<15}")
-        print(f"{'Точность':<15} {winner.get_accuracy():<15.1f}% {loser.get_accuracy():<15.1f}%")
-        print(f"{'Потоплено':<15} {winner.ships_sunk:<15} {loser.ships_sunk:<15}")
-        print(f"{'Очки':<15} {winner.score:<15} {loser.score:<15}")
+        snapshot.remove(self.save_path)
+        self.events.game_over(winner, loser)
         
         winner.save_stats()
         loser.save_stats()
@@ -528,9 +1080,30 @@ class Game:
         self.show_menu()
     
     def start(self) -> None:
-        self.setup()
+        if not self.resumed:
+            self.turn = 1
+            self.setup()
+            # У продолженной партии game_start уже был: повтор сбросил бы запись выстрелов
+            self.events.game_start(self.current_player, self.opponent)
+        self.resumed = False
         self.play()
 
+
+def main() -> None:
+    if os.environ.get("SEABATTLE_PROFILE", "") not in ("", "0"):
+        # Обёртки ставятся на классы модуля gameseabattle; если этот файл
+        # запущен как __main__, Game нужно взять оттуда же
+        from instrumentation import METRICS
+        from gameseabattle import Game as ProfiledGame
+
+        try:
+            ProfiledGame().start()
+        finally:
+            METRICS.report()
+    else:
+        game = Game()
+        game.start()
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.start()
\ No newline at end of file
+    main()
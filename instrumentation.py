@@ -0,0 +1,289 @@
+"""Счётчики и гистограммы времени для горячих путей игры, включаемые по желанию.
+
+Включается переменной окружения SEABATTLE_PROFILE=1 (или install() из кода,
+например флагом --profile у simulation.py). Код игры при этом не меняется:
+install() подменяет методы классов обёртками, которые пишут в METRICS, а
+без него методы остаются исходными и замеры не стоят ничего.
+
+Что замеряется:
+    ai.decision        время хода AIPlayer целиком, вместе с вложенными вызовами make_move
+    ai.direction_flip  время и число вложенных вызовов make_move после смены направления
+    ai.shots_per_turn  выстрелов компьютера за ход до промаха
+    board.*            receive_attack и place_ship у Board и BitBoard
+    placement.*        выбор расстановки, неудачные быстрые пробы, узлы перебора
+    events.*           вывод на экран (методы ConsoleRenderer)
+    stats.*            чтение и запись статистики в SQLite
+"""
+import functools
+import json
+import os
+import sys
+import time
+import weakref
+from collections import Counter
+from typing import IO, Callable, Dict, List, Optional, Tuple
+
+ENV_VAR = "SEABATTLE_PROFILE"
+
+
+def enabled_by_env() -> bool:
+    return os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+class Metrics:
+    """Счётчики и гистограммы. Время хранится по корзинам степеней двойки в наносекундах"""
+
+    def __init__(self):
+        self.counters: Counter = Counter()
+        self.timings: Dict[str, Counter] = {}
+        self.totals: Counter = Counter()
+        self.values: Dict[str, Counter] = {}
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def observe_time(self, name: str, ns: int) -> None:
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Counter()
+        histogram[ns.bit_length()] += 1
+        self.totals[name] += ns
+
+    def observe(self, name: str, value: int) -> None:
+        histogram = self.values.get(name)
+        if histogram is None:
+            histogram = self.values[name] = Counter()
+        histogram[value] += 1
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def merge(self, state: Dict) -> None:
+        """Добавляет результаты другого процесса, полученные через snapshot()"""
+        self.counters.update(state["counters"])
+        self.totals.update(state["totals"])
+        for name, histogram in state["timings"].items():
+            self.timings.setdefault(name, Counter()).update(histogram)
+        for name, histogram in state["values"].items():
+            self.values.setdefault(name, Counter()).update(histogram)
+
+    def snapshot(self) -> Dict:
+        return {
+            "counters": dict(self.counters),
+            "totals": dict(self.totals),
+            "timings": {name: dict(histogram) for name, histogram in self.timings.items()},
+            "values": {name: dict(histogram) for name, histogram in self.values.items()},
+        }
+
+    @staticmethod
+    def _quantile(histogram: Counter, q: float) -> int:
+        total = sum(histogram.values())
+        seen = 0
+        for key in sorted(histogram):
+            seen += histogram[key]
+            if seen >= total * q:
+                return key
+        return 0
+
+    def summary(self) -> Dict:
+        timings = {}
+        for name, histogram in self.timings.items():
+            calls = sum(histogram.values())
+            # Перцентиль - верхняя граница корзины, то есть оценка сверху
+            timings[name] = {
+                "calls": calls,
+                "total_ms": self.totals[name] / 1e6,
+                "mean_us": self.totals[name] / calls / 1e3 if calls else 0.0,
+                "p50_us": (1 << self._quantile(histogram, 0.5)) / 1e3,
+                "p99_us": (1 << self._quantile(histogram, 0.99)) / 1e3,
+            }
+        values = {}
+        for name, histogram in self.values.items():
+            total = sum(histogram.values())
+            values[name] = {
+                "count": total,
+                "mean": sum(value * n for value, n in histogram.items()) / total if total else 0.0,
+                "distribution": dict(sorted(histogram.items())),
+            }
+        return {"counters": dict(sorted(self.counters.items())), "timings": timings, "values": values}
+
+    def report(self, out: Optional[IO[str]] = None) -> None:
+        out = out or sys.stderr
+        summary = self.summary()
+        print(f"{'Замер':<32} {'Вызовы':>10} {'Всего, мс':>12} {'Среднее, мкс':>14} "
+              f"{'p50, мкс':>10} {'p99, мкс':>10}", file=out)
+        for name, row in sorted(summary["timings"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{name:<32} {row['calls']:>10} {row['total_ms']:>12.1f} {row['mean_us']:>14.2f} "
+                  f"{row['p50_us']:>10.1f} {row['p99_us']:>10.1f}", file=out)
+        for name, value in summary["counters"].items():
+            print(f"{name:<32} {value:>10}", file=out)
+        for name, row in summary["values"].items():
+            print(f"{name:<32} {row['count']:>10} среднее {row['mean']:.2f}", file=out)
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+METRICS = Metrics()
+
+# Подменённые методы: (класс, имя, исходный объект из __dict__ класса)
+_patched: List[Tuple[type, str, object]] = []
+# Выстрелы незаконченного хода каждого AIPlayer. Слабые ключи: игрок, выброшенный
+# посреди хода, не передаст свой счёт новому объекту с тем же id()
+_turn_shots: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+
+def _replace(owner: type, name: str, make_wrapper: Callable[[Callable], Callable]) -> None:
+    # Обёртываются только методы, определённые в самом классе: унаследованные
+    # уже обёрнуты у родителя
+    original = owner.__dict__.get(name)
+    if original is None:
+        return
+    _patched.append((owner, name, original))
+    setattr(owner, name, functools.wraps(original)(make_wrapper(original)))
+
+
+def _timed(metric: str) -> Callable[[Callable], Callable]:
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                METRICS.observe_time(metric, time.perf_counter_ns() - start)
+        return wrapper
+    return make_wrapper
+
+
+def _timed_iter(metric: str) -> Callable[[Callable], Callable]:
+    # Для генераторов: вызов только создаёт генератор, а работа идёт при
+    # переборе. Суммируется время внутри next(), без времени потребителя
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            iterator = original(*args, **kwargs)
+            elapsed = time.perf_counter_ns() - start
+            try:
+                while True:
+                    start = time.perf_counter_ns()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter_ns() - start
+                    yield item
+            finally:
+                # Прерванный перебор закрывает и исходный генератор вместе с курсором
+                iterator.close()
+                METRICS.observe_time(metric, elapsed)
+        return wrapper
+    return make_wrapper
+
+
+def _counted(metric: str, when: Callable[[object], bool] = lambda result: True
+             ) -> Callable[[Callable], Callable]:
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            result = original(*args, **kwargs)
+            if when(result):
+                METRICS.count(metric)
+            return result
+        return wrapper
+    return make_wrapper
+
+
+def _ai_move(original: Callable) -> Callable:
+    # make_move вызывает сам себя после смены направления: внешний вызов - одно
+    # решение, вложенные замеряются отдельно. Ход кончается промахом или победой
+    depth = [0]
+
+    def wrapper(self, opponent):
+        if depth[0]:
+            start = time.perf_counter_ns()
+            try:
+                return original(self, opponent)
+            finally:
+                METRICS.observe_time("ai.direction_flip", time.perf_counter_ns() - start)
+        depth[0] += 1
+        start = time.perf_counter_ns()
+        try:
+            result = original(self, opponent)
+        finally:
+            depth[0] -= 1
+            METRICS.observe_time("ai.decision", time.perf_counter_ns() - start)
+        shots = _turn_shots.get(self, 0) + 1
+        if result and not opponent.board.all_ships_sunk():
+            _turn_shots[self] = shots
+        else:
+            _turn_shots.pop(self, None)
+            METRICS.observe("ai.shots_per_turn", shots)
+        return result
+    return wrapper
+
+
+def _ai_reset(original: Callable) -> Callable:
+    # Партия, прерванная посреди хода, закрывает этот ход, а не дописывает его в следующую
+    def wrapper(self):
+        shots = _turn_shots.pop(self, None)
+        if shots is not None:
+            METRICS.observe("ai.shots_per_turn", shots)
+        return original(self)
+    return wrapper
+
+
+def install() -> None:
+    """Подменяет методы игровых классов замеряющими обёртками; повторный вызов ничего не делает"""
+    if _patched:
+        return
+    from bitboard import BitBoard
+    from events import ConsoleRenderer
+    from gameseabattle import AIPlayer, Board
+    from placement import FleetSampler, SparseFleetSampler
+    from rendering import DiffConsoleRenderer
+    from stats_store import StatsStore
+
+    _replace(AIPlayer, "make_move", _ai_move)
+    _replace(AIPlayer, "reset", _ai_reset)
+    for board in (Board, BitBoard):
+        _replace(board, "receive_attack", _timed("board.receive_attack"))
+        _replace(board, "place_ship", _timed("board.place_ship"))
+    for sampler in (FleetSampler, SparseFleetSampler):
+        _replace(sampler, "sample", _timed("placement.sample"))
+    _replace(FleetSampler, "_quick", _counted("placement.quick_failures", lambda result: result is None))
+    _replace(FleetSampler, "_search", _counted("placement.backtrack_nodes"))
+    for renderer in (ConsoleRenderer, DiffConsoleRenderer):
+        for name in ("player_turn", "show_board", "shot", "hit", "miss", "sunk", "game_over"):
+            _replace(renderer, name, _timed(f"events.{name}"))
+    for name in ("append", "append_many", "recent", "count"):
+        _replace(StatsStore, name, _timed(f"stats.{name}"))
+    _replace(StatsStore, "iter_records", _timed_iter("stats.iter_records"))
+
+
+def uninstall() -> None:
+    while _patched:
+        owner, name, original = _patched.pop()
+        setattr(owner, name, original)
+
+
+class Profiler:
+    """cProfile для участка кода с сохранением в формате pstats"""
+
+    def __init__(self, path: str):
+        import cProfile
+
+        self.path = path
+        self.profile = cProfile.Profile()
+
+    def __enter__(self) -> 'Profiler':
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.profile.disable()
+        self.profile.dump_stats(self.path)
+
+
+if enabled_by_env():
+    install()
@@ -0,0 +1,66 @@
+"""Точка входа "Морского боя" с подкомандами.
+
+    python launcher.py                 игра за консолью (то же, что play)
+    python launcher.py play
+    python launcher.py simulate 10000 --a hard --b expert
+    python launcher.py stats --by accuracy
+    python launcher.py serve --port 8765
+
+Модуль подкоманды импортируется только при её вызове: запуск игры не платит
+за asyncio сервера, sqlite3 статистики или пул процессов симулятора. По той
+же причине здесь нет argparse - разбором аргументов занимается сама подкоманда.
+Время запуска play проверяет benchmarks.py --startup.
+"""
+import sys
+
+# Подкоманда -> (модуль с функцией main, описание)
+COMMANDS = {
+    "play": ("gameseabattle", "игра за консолью"),
+    "simulate": ("simulation", "безголовая симуляция партий компьютер против компьютера"),
+    "tournament": ("tournament", "турнир компьютерных игроков и подбор уровней"),
+    "stats": ("stats_query", "рейтинги и процентили по истории игр"),
+    "serve": ("server", "сетевой сервер"),
+    "replay": ("replay", "просмотр журнала партий"),
+    "book": ("opening_book", "сборка и просмотр дебютной книги"),
+    "bench": ("benchmarks", "замеры производительности"),
+}
+
+
+def usage() -> str:
+    lines = ["Использование: launcher.py [подкоманда] [аргументы]", "", "Подкоманды:"]
+    lines.extend(f"  {name:<12} {description}" for name, (_, description) in COMMANDS.items())
+    lines.append("")
+    lines.append("Справка по подкоманде: launcher.py <подкоманда> --help")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    command = argv.pop(0) if argv else "play"
+    if command in ("-h", "--help"):
+        print(usage())
+        return 0
+    if command not in COMMANDS:
+        print(f"Неизвестная подкоманда: {command}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    if command == "play":
+        if argv:
+            print("play не принимает аргументов", file=sys.stderr)
+            return 2
+        from gameseabattle import main as play
+
+        play()
+        return 0
+
+    import importlib
+
+    module_name, _ = COMMANDS[command]
+    # Справка argparse подкоманды показывает "launcher.py simulate" вместо имени модуля
+    sys.argv[0] = f"{sys.argv[0]} {command}"
+    result = importlib.import_module(module_name).main(argv)
+    return result if isinstance(result, int) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Нагрузочный клиент для server.py.
+
+Открывает 2 * matches подключений, играет все партии случайными выстрелами и
+печатает пропускную способность (партий и ходов в секунду, партий на секунду
+процессорного времени сервера) и перцентили задержки ответа на выстрел.
+
+    python loadtest.py --matches 2000 --spawn
+"""
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+
+class Bot:
+    """Клиент, который стреляет в случайные необстрелянные клетки"""
+
+    def __init__(self, name: str, rng: random.Random):
+        self.name = name
+        self.rng = rng
+        self.latencies: List[float] = []
+        self.shots: List[tuple] = []
+        self.sent_at = 0.0
+        self.seat = 0
+        self.won = False
+
+    def _fire(self, writer: asyncio.StreamWriter) -> None:
+        x, y = self.shots.pop()
+        self.sent_at = time.perf_counter()
+        writer.write(json.dumps({"op": "fire", "x": x, "y": y}).encode() + b"\n")
+
+    async def play(self, host: str, port: int) -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(json.dumps({"op": "join", "name": self.name}).encode() + b"\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                message = json.loads(line)
+                event = message["event"]
+                if event == "start":
+                    self.seat = message["you"]
+                    size = message["size"]
+                    self.shots = [(x, y) for x in range(size) for y in range(size)]
+                    self.rng.shuffle(self.shots)
+                    if message["turn"] == self.seat:
+                        self._fire(writer)
+                elif event == "result":
+                    self.latencies.append(time.perf_counter() - self.sent_at)
+                    if message["win"]:
+                        self.won = True
+                        return
+                    if message["turn"] == self.seat and self.shots:
+                        self._fire(writer)
+                elif event == "incoming":
+                    if message["win"]:
+                        return
+                    if message["turn"] == self.seat and self.shots:
+                        self._fire(writer)
+                elif event in ("opponent_left", "error"):
+                    return
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def _request(host: str, port: int, payload: Dict) -> Dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps(payload).encode() + b"\n")
+    response = json.loads(await reader.readline())
+    writer.close()
+    return response
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+async def run(matches: int, host: str, port: int, concurrency: int, seed: Optional[int]) -> Dict:
+    rng = random.Random(seed)
+    before = await _request(host, port, {"op": "stats"})
+    limit = asyncio.Semaphore(concurrency)
+    bots = [Bot(f"bot{i}", random.Random(rng.getrandbits(64))) for i in range(matches * 2)]
+
+    async def play(bot: Bot) -> None:
+        async with limit:
+            await bot.play(host, port)
+
+    start = time.perf_counter()
+    # Лимит чётный, и боты стартуют по порядку, поэтому ожидающему в очереди
+    # сервера боту всегда достаётся соперник
+    await asyncio.gather(*(play(bot) for bot in bots))
+    elapsed = time.perf_counter() - start
+    after = await _request(host, port, {"op": "stats"})
+
+    latencies = [latency for bot in bots for latency in bot.latencies]
+    finished = after["matches_finished"] - before["matches_finished"]
+    server_cpu = after["cpu_time"] - before["cpu_time"]
+    return {
+        "matches": finished,
+        "moves": len(latencies),
+        "seconds": elapsed,
+        "matches_per_sec": finished / elapsed if elapsed else 0.0,
+        "moves_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "server_cpu_seconds": server_cpu,
+        "matches_per_server_cpu_second": finished / server_cpu if server_cpu else 0.0,
+        "latency_ms": {q: percentile(latencies, q) * 1000 for q in (50, 95, 99)},
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера 'Морского боя'")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4000,
+                        help="сколько подключений держать одновременно (чётное число)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--spawn", action="store_true", help="запустить сервер в отдельном процессе")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        server_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+        server = subprocess.Popen([sys.executable, server_script, "--host", args.host,
+                                   "--port", str(args.port)], stdout=subprocess.DEVNULL)
+        time.sleep(0.5)
+    try:
+        concurrency = max(2, args.concurrency - args.concurrency % 2)
+        report = asyncio.run(run(args.matches, args.host, args.port, concurrency, args.seed))
+        print(json.dumps(report, indent=2))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Дебютная книга: порядок первых выстрелов и статистика расстановок из журналов партий.
+
+Книга собирается офлайн из журналов replay.py, например из симуляций:
+
+    python simulation.py 100000 --a hard --b expert --replays games.sbr
+    python opening_book.py build games.sbr --output battleship_book.sbb
+    python opening_book.py show --board-size 10
+
+Для каждой пары (размер поля, флот) в книге два массива uint32 по клетке поля:
+
+    order - порядок поиска: каждая следующая клетка накрывает больше всего
+            расстановок, ещё не задетых предыдущими, дальше - по частоте кораблей
+    early - насколько рано соперники стреляли в клетку (больше - раньше)
+
+Файл: MAGIC, версия, число записей, затем для каждой записи заголовок из
+varint (размер поля, число кораблей, их размеры, число партий) и выровненное
+по 4 байтам тело order + early в little-endian. Файл отображается в память,
+массивы читаются без копирования, разобранные записи кэшируются с вытеснением
+давно не использованных.
+"""
+import mmap
+import random
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from replay import Replay, ReplayFile, read_varint, write_varint
+
+MAGIC = b"SBBK"
+VERSION = 1
+BOOK_FILE = "battleship_book.sbb"
+# Сколько разных конфигураций держать разобранными одновременно
+BOOK_CACHE_SIZE = 8
+# Сколько расстановок на конфигурацию хранить для построения порядка поиска
+MAX_FLEETS = 200000
+
+BookKey = Tuple[int, Tuple[int, ...]]
+
+
+class BookError(ValueError):
+    pass
+
+
+def book_key(board_size: int, ship_sizes: Iterable[int]) -> BookKey:
+    return board_size, tuple(sorted(ship_sizes, reverse=True))
+
+
+class BookEntry:
+    """Данные книги для одной конфигурации; order и early - memoryview поверх файла"""
+
+    def __init__(self, board_size: int, ship_sizes: Tuple[int, ...], games: int,
+                 order: Sequence[int], early: Sequence[int]):
+        self.board_size = board_size
+        self.ship_sizes = ship_sizes
+        self.games = games
+        self.order = order
+        self.early = early
+
+    def placement_cost(self, fleet: Iterable[Iterable[Tuple[int, int]]]) -> int:
+        """Насколько рано соперники обычно стреляют в клетки этой расстановки"""
+        size, early = self.board_size, self.early
+        return sum(early[x * size + y] for positions in fleet for x, y in positions)
+
+
+class _Stats:
+    """Накопленные данные одной конфигурации при построении книги"""
+
+    def __init__(self, board_size: int):
+        area = board_size * board_size
+        self.board_size = board_size
+        self.games = 0
+        self.seen_fleets = 0
+        self.occupancy = [0] * area
+        self.early = [0] * area
+        self.fleets: List[int] = []
+
+
+class BookBuilder:
+    """Собирает статистику из партий и пишет файл книги"""
+
+    def __init__(self, max_fleets: int = MAX_FLEETS, seed: Optional[int] = None):
+        self.max_fleets = max_fleets
+        self.rng = random.Random(seed)
+        self.stats: Dict[BookKey, _Stats] = {}
+
+    def add_replay(self, replay: Replay) -> None:
+        size = replay.size
+        area = size * size
+        # Ранними считаются первые четверть выстрелов каждого игрока
+        window = max(1, area // 4)
+        fired = [0, 0]
+        seat_stats = []
+        for seat in (0, 1):
+            fleet = replay.fleets[seat]
+            key = book_key(size, (ship_size for ship_size, _ in fleet))
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = _Stats(size)
+            # Оба флота обычно одной конфигурации: партия считается для неё один раз
+            if stats not in seat_stats:
+                stats.games += 1
+            self._add_fleet(stats, replay.ship_masks[seat],
+                            [x * size + y for _, positions in fleet for x, y in positions])
+            seat_stats.append(stats)
+
+        for seat, cell, _ in replay.moves():
+            rank = fired[seat]
+            fired[seat] += 1
+            if rank < window and cell < area:
+                # Время выстрела важно для расстановки корабля на поле соперника
+                seat_stats[1 - seat].early[cell] += window - rank
+
+    def _add_fleet(self, stats: _Stats, mask: int, cells: List[int]) -> None:
+        for cell in cells:
+            stats.occupancy[cell] += 1
+        # Равномерная выборка расстановок, если их больше max_fleets
+        stats.seen_fleets += 1
+        if len(stats.fleets) < self.max_fleets:
+            stats.fleets.append(mask)
+        else:
+            slot = self.rng.randrange(stats.seen_fleets)
+            if slot < self.max_fleets:
+                stats.fleets[slot] = mask
+
+    @staticmethod
+    def opening_order(stats: _Stats) -> List[int]:
+        """Жадный порядок: клетка, накрывающая больше всего ещё не задетых расстановок"""
+        area = stats.board_size * stats.board_size
+        by_cell: List[List[int]] = [[] for _ in range(area)]
+        cells_of = []
+        for index, mask in enumerate(stats.fleets):
+            cells = []
+            while mask:
+                low = mask & -mask
+                cell = low.bit_length() - 1
+                cells.append(cell)
+                by_cell[cell].append(index)
+                mask ^= low
+            cells_of.append(cells)
+
+        counts = [len(fleets) for fleets in by_cell]
+        alive = bytearray(b'\x01') * len(stats.fleets)
+        taken = bytearray(area)
+        order = []
+        while True:
+            best = max(range(area), key=lambda cell: -1 if taken[cell] else counts[cell])
+            if taken[best] or counts[best] == 0:
+                break
+            order.append(best)
+            taken[best] = 1
+            for index in by_cell[best]:
+                if alive[index]:
+                    alive[index] = 0
+                    for cell in cells_of[index]:
+                        counts[cell] -= 1
+        # После дебюта - по убыванию частоты кораблей
+        order.extend(sorted((cell for cell in range(area) if not taken[cell]),
+                            key=lambda cell: -stats.occupancy[cell]))
+        return order
+
+    def write(self, path: str) -> None:
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        write_varint(out, len(self.stats))
+        for (board_size, ship_sizes), stats in sorted(self.stats.items()):
+            write_varint(out, board_size)
+            write_varint(out, len(ship_sizes))
+            for ship_size in ship_sizes:
+                write_varint(out, ship_size)
+            write_varint(out, stats.games)
+            out += bytes(-len(out) % 4)
+            limit = 0xFFFFFFFF
+            body = array('I', self.opening_order(stats))
+            body.extend(min(weight, limit) for weight in stats.early)
+            if sys.byteorder == "big":
+                body.byteswap()
+            out += body.tobytes()
+        with open(path, "wb") as f:
+            f.write(out)
+
+
+class OpeningBook:
+    """Книга, отображённая в память. entry() разбирает запись при первом обращении"""
+
+    def __init__(self, path: str, cache_size: int = BOOK_CACHE_SIZE):
+        with open(path, "rb") as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise BookError(f"Файл {path} пуст")
+        if self.data[:len(MAGIC)] != MAGIC or len(self.data) <= len(MAGIC):
+            raise BookError(f"Файл {path} не является дебютной книгой")
+        if self.data[len(MAGIC)] != VERSION:
+            raise BookError(f"Неподдерживаемая версия книги {self.data[len(MAGIC)]}")
+
+        # Каталог: ключ -> (число партий, смещение тела)
+        self.index: Dict[BookKey, Tuple[int, int]] = {}
+        try:
+            count, pos = read_varint(self.data, len(MAGIC) + 1)
+            for _ in range(count):
+                board_size, pos = read_varint(self.data, pos)
+                n_ships, pos = read_varint(self.data, pos)
+                ship_sizes = []
+                for _ in range(n_ships):
+                    ship_size, pos = read_varint(self.data, pos)
+                    ship_sizes.append(ship_size)
+                games, pos = read_varint(self.data, pos)
+                pos += -pos % 4
+                self.index[(board_size, tuple(ship_sizes))] = games, pos
+                pos += board_size * board_size * 8
+        except IndexError:
+            raise BookError(f"Файл {path} обрывается посреди записи")
+        if pos > len(self.data):
+            raise BookError(f"Файл {path} обрывается посреди записи")
+        self._entry = lru_cache(maxsize=cache_size)(self._load_entry)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self) -> List[BookKey]:
+        return list(self.index)
+
+    def _load_entry(self, key: BookKey) -> Optional[BookEntry]:
+        found = self.index.get(key)
+        if found is None:
+            return None
+        games, pos = found
+        board_size, ship_sizes = key
+        area = board_size * board_size
+        view = memoryview(self.data)[pos:pos + area * 8]
+        if sys.byteorder == "big":
+            body = array('I', view.tobytes())
+            body.byteswap()
+            view = memoryview(body)
+        else:
+            view = view.cast('I')
+        return BookEntry(board_size, ship_sizes, games, view[:area], view[area:])
+
+    def entry(self, board_size: int, ship_sizes: Iterable[int]) -> Optional[BookEntry]:
+        return self._entry(book_key(board_size, ship_sizes))
+
+
+@lru_cache(maxsize=4)
+def load_book(path: str = BOOK_FILE) -> OpeningBook:
+    """Книга из файла; каждый процесс отображает файл один раз"""
+    return OpeningBook(path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Дебютная книга для компьютерного игрока")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="собрать книгу из журналов партий")
+    build.add_argument("replays", nargs="+")
+    build.add_argument("--output", default=BOOK_FILE)
+    build.add_argument("--max-fleets", type=int, default=MAX_FLEETS)
+    build.add_argument("--seed", type=int, default=0)
+    show = commands.add_parser("show", help="показать дебют для конфигурации")
+    show.add_argument("--book", default=BOOK_FILE)
+    show.add_argument("--board-size", type=int, default=10)
+    show.add_argument("--fleet", default=None, help="размеры кораблей через пробел")
+    show.add_argument("--shots", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        builder = BookBuilder(args.max_fleets, args.seed)
+        games = 0
+        for path in args.replays:
+            with ReplayFile(path) as replays:
+                for replay in replays:
+                    builder.add_replay(replay)
+                    games += 1
+        builder.write(args.output)
+        print(f"Партий: {games}, конфигураций: {len(builder.stats)}, книга записана в {args.output}")
+        return
+
+    from gameseabattle import SHIP_SIZES
+
+    fleet = [int(size) for size in args.fleet.split()] if args.fleet else SHIP_SIZES
+    entry = OpeningBook(args.book).entry(args.board_size, fleet)
+    if entry is None:
+        print("Для этой конфигурации в книге нет данных.")
+        return
+    print(f"Партий в книге: {entry.games}")
+    print("Дебют:", " ".join(f"{cell // entry.board_size},{cell % entry.board_size}"
+                             for cell in entry.order[:args.shots]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+import random
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from targeting import ship_placements
+
+# Сколько случайных положений пробуем из полной таблицы, прежде чем отфильтровать её целиком
+QUICK_TRIES = 16
+# Для полей крупнее таблицы положений с масками слишком велики, используется SparseFleetSampler
+TABLE_MAX_BOARD_SIZE = 64
+# Сколько случайных положений пробует SparseFleetSampler для одного корабля
+SPARSE_TRIES = 10000
+# Сколько раз SparseFleetSampler начинает расстановку заново, прежде чем взять find_fleet
+SPARSE_RESTARTS = 3
+# Предел узлов случайного перебора за один sample(); он же ограничивает число тупиков в _failed
+SEARCH_NODES = 5000
+# Предел узлов точного перебора find_fleet
+EXACT_NODES = 50000
+
+
+class PlacementError(ValueError):
+    """Флот невозможно разместить на поле такого размера"""
+
+
+class PlacementUnverified(RuntimeError):
+    """Точный перебор не уложился в EXACT_NODES: расстановка не найдена, но и невозможность не доказана"""
+
+
+class _SearchBudget(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def neighbour_masks(size: int) -> Tuple[int, ...]:
+    """Для каждой клетки поля маска 3x3 окрестности (включая саму клетку)"""
+    masks = []
+    for x in range(size):
+        for y in range(size):
+            mask = 0
+            for nx in range(max(0, x - 1), min(size, x + 2)):
+                for ny in range(max(0, y - 1), min(size, y + 2)):
+                    mask |= 1 << (nx * size + ny)
+            masks.append(mask)
+    return tuple(masks)
+
+
+def halo_mask(mask: int, size: int) -> int:
+    """Клетки корабля вместе с запретной зоной вокруг него"""
+    neighbours = neighbour_masks(size)
+    halo = 0
+    while mask:
+        low = mask & -mask
+        halo |= neighbours[low.bit_length() - 1]
+        mask ^= low
+    return halo
+
+
+@lru_cache(maxsize=None)
+def placement_table(board_size: int, ship_size: int
+                    ) -> Tuple[Tuple[List[Tuple[int, int]], ...], Tuple[int, ...], Tuple[int, ...]]:
+    """Все законные положения корабля: (координаты, маска клеток, маска с окрестностью)"""
+    positions, masks, halos = [], [], []
+    for cells in ship_placements(board_size, ship_size):
+        mask = 0
+        for cell in cells:
+            mask |= 1 << cell
+        positions.append([divmod(cell, board_size) for cell in cells])
+        masks.append(mask)
+        halos.append(halo_mask(mask, board_size))
+    return tuple(positions), tuple(masks), tuple(halos)
+
+
+def fleet_may_fit(board_size: int, ship_sizes: Sequence[int]) -> bool:
+    """Необходимые условия размещения; True ещё не гарантирует, что расстановка есть.
+
+    Любые две клетки квадрата 2x2 соседние, поэтому в каждом квадрате разбиения
+    поля лежит не больше одного корабля, а корабль длины L задевает не меньше
+    ceil(L/2) квадратов. Кроме того, корабль, продлённый на клетку вправо и вниз,
+    занимает прямоугольник (L+1)x2, и такие прямоугольники не пересекаются
+    внутри поля (n+1)x(n+1).
+    """
+    blocks = ((board_size + 1) // 2) ** 2
+    if sum((size + 1) // 2 for size in ship_sizes) > blocks:
+        return False
+    return sum(2 * (size + 1) for size in ship_sizes) <= (board_size + 1) ** 2
+
+
+def check_fleet(board_size: int, ship_sizes: Sequence[int]) -> None:
+    """Быстрые проверки флота; PlacementError, если он заведомо не помещается"""
+    if any(size < 1 or size > board_size for size in ship_sizes):
+        raise PlacementError(f"Корабль не помещается на поле {board_size}x{board_size}")
+    if sum(ship_sizes) > board_size * board_size:
+        raise PlacementError("Суммарный размер флота больше площади поля")
+    if not fleet_may_fit(board_size, ship_sizes):
+        raise PlacementError(f"Флот не помещается на поле {board_size}x{board_size}")
+
+
+def _exact_search(board_size: int, ship_sizes: Sequence[int], max_nodes: int
+                  ) -> Optional[List[List[Tuple[int, int]]]]:
+    """Перебор по клеткам: первая свободная клетка - начало одного из кораблей или вода.
+
+    Дальнейший перебор зависит только от номера клетки, запретов на клетках не
+    раньше неё и числа оставшихся кораблей каждого размера, поэтому тупики
+    запоминаются по этому ключу. Оставшиеся корабли должны уместиться в
+    оставшиеся строки по тем же оценкам, что и в fleet_may_fit. Возвращает
+    расстановку в порядке ship_sizes или None, если её нет; при превышении
+    max_nodes бросает _SearchBudget.
+    """
+    n = board_size
+    sizes = sorted(set(ship_sizes), reverse=True)
+    starts: Dict[int, List[Tuple[int, int, int, List[Tuple[int, int]]]]] = {}
+    for kind, size in enumerate(sizes):
+        for positions, mask, halo in zip(*placement_table(n, size)):
+            starts.setdefault((mask & -mask).bit_length() - 1, []).append((kind, mask, halo, positions))
+    full = (1 << n * n) - 1
+    half = (n + 1) // 2
+    failed = set()
+    chosen = []
+    nodes = 0
+
+    def search(idx: int, forbidden: int, counts: Tuple[int, ...]) -> bool:
+        nonlocal nodes
+        if not any(counts):
+            return True
+        blocks = sum((size + 1) // 2 * count for size, count in zip(sizes, counts))
+        area = sum(2 * (size + 1) * count for size, count in zip(sizes, counts))
+        # Клетки, оставленные водой, перебираются циклом: глубина рекурсии - число кораблей
+        visited = []
+        while True:
+            free = full & ~forbidden & ~((1 << idx) - 1)
+            if not free:
+                break
+            idx = (free & -free).bit_length() - 1
+            rows_left = n - idx // n
+            if blocks > (rows_left + 1) // 2 * half or area > (rows_left + 1) * (n + 1):
+                break
+            key = (idx, forbidden >> idx, counts)
+            if key in failed:
+                break
+            nodes += 1
+            if nodes > max_nodes:
+                raise _SearchBudget
+            visited.append(key)
+            for kind, mask, halo, positions in starts.get(idx, ()):
+                if counts[kind] and not mask & forbidden:
+                    chosen.append((kind, positions))
+                    left = counts[:kind] + (counts[kind] - 1,) + counts[kind + 1:]
+                    if search(idx + 1, forbidden | halo, left):
+                        return True
+                    chosen.pop()
+            forbidden |= 1 << idx
+            idx += 1
+        failed.update(visited)
+        return False
+
+    if not search(0, 0, tuple(Counter(ship_sizes)[size] for size in sizes)):
+        return None
+    by_size: Dict[int, List[List[Tuple[int, int]]]] = {}
+    for kind, positions in chosen:
+        by_size.setdefault(sizes[kind], []).append(list(positions))
+    return [by_size[size].pop() for size in ship_sizes]
+
+
+def _shelf_fleet(board_size: int, ship_sizes: Sequence[int]) -> Optional[List[List[Tuple[int, int]]]]:
+    """Горизонтальные корабли подряд через клетку в строках 0, 2, 4...; None, если не хватило строк"""
+    fleet = [None] * len(ship_sizes)
+    x = y = 0
+    for ship_index in sorted(range(len(ship_sizes)), key=lambda i: -ship_sizes[i]):
+        size = ship_sizes[ship_index]
+        if y + size > board_size:
+            x, y = x + 2, 0
+        if x >= board_size:
+            return None
+        fleet[ship_index] = [(x, y + i) for i in range(size)]
+        y += size + 1
+    return fleet
+
+
+@lru_cache(maxsize=64)
+def _solve(board_size: int, ship_sizes: Tuple[int, ...]) -> Tuple[Optional[tuple], bool]:
+    # (расстановка или None, доказана ли невозможность); кэшируются все три исхода
+    if board_size > TABLE_MAX_BOARD_SIZE:
+        fleet = _shelf_fleet(board_size, ship_sizes)
+        return (tuple(map(tuple, fleet)), False) if fleet is not None else (None, False)
+    try:
+        fleet = _exact_search(board_size, ship_sizes, EXACT_NODES)
+    except _SearchBudget:
+        return None, False
+    return (tuple(map(tuple, fleet)), False) if fleet is not None else (None, True)
+
+
+def find_fleet(board_size: int, ship_sizes: Sequence[int]) -> List[List[Tuple[int, int]]]:
+    """Одна расстановка флота в порядке ship_sizes, не случайная.
+
+    PlacementError означает, что расстановки нет. Если точный перебор не уложился
+    в EXACT_NODES узлов (а на полях крупнее TABLE_MAX_BOARD_SIZE - если флот не
+    встал рядами через строку), бросается PlacementUnverified.
+    """
+    check_fleet(board_size, ship_sizes)
+    fleet, impossible = _solve(board_size, tuple(ship_sizes))
+    if impossible:
+        raise PlacementError(f"Флот невозможно разместить на поле {board_size}x{board_size}")
+    if fleet is None:
+        raise PlacementUnverified(f"Не удалось ни найти расстановку флота на поле "
+                                  f"{board_size}x{board_size}, ни доказать, что её нет")
+    return [list(positions) for positions in fleet]
+
+
+def _symmetric_fleet(board_size: int, ship_sizes: Sequence[int],
+                     rng: random.Random) -> List[List[Tuple[int, int]]]:
+    """find_fleet, повёрнутая или отражённая случайной из восьми симметрий поля"""
+    last = board_size - 1
+    flip_x, flip_y, transpose = rng.random() < 0.5, rng.random() < 0.5, rng.random() < 0.5
+    fleet = []
+    for positions in find_fleet(board_size, ship_sizes):
+        moved = []
+        for x, y in positions:
+            x, y = (last - x if flip_x else x), (last - y if flip_y else y)
+            moved.append((y, x) if transpose else (x, y))
+        fleet.append(moved)
+    return fleet
+
+
+class FleetSampler:
+    """Случайная расстановка флота по заранее посчитанным таблицам положений.
+
+    Положение корабля подходит, если его клетки не пересекают окрестности уже
+    поставленных кораблей. Обычно хватает нескольких случайных проб; если нет,
+    выполняется случайный перебор с возвратом до SEARCH_NODES узлов, а если и он
+    не уложился - берётся расстановка find_fleet в случайной симметрии поля.
+    PlacementError означает только доказанную невозможность.
+    """
+
+    def __init__(self, board_size: int, ship_sizes: Sequence[int],
+                 rng: Optional[random.Random] = None):
+        check_fleet(board_size, ship_sizes)
+        self.board_size = board_size
+        self.ship_sizes = list(ship_sizes)
+        self.rng = rng if rng is not None else random.Random()
+        # Крупные корабли ставим первыми: для них меньше всего свободных мест
+        self.order = sorted(range(len(self.ship_sizes)), key=lambda i: -self.ship_sizes[i])
+        self.tables = [placement_table(board_size, self.ship_sizes[i]) for i in self.order]
+        # Тупиковые состояния перебора (глубина, запретная маска) в пределах одного sample()
+        self._failed = set()
+        self._nodes = 0
+        # Случайный перебор уже не уложился в предел: дальше сразу берём find_fleet
+        self._exhausted = False
+
+    def _quick(self) -> Optional[List[int]]:
+        rng = self.rng
+        forbidden = 0
+        chosen = []
+        for _, masks, halos in self.tables:
+            count = len(masks)
+            for _ in range(QUICK_TRIES):
+                index = rng.randrange(count)
+                if not masks[index] & forbidden:
+                    break
+            else:
+                return None
+            forbidden |= halos[index]
+            chosen.append(index)
+        return chosen
+
+    def _search(self, depth: int, forbidden: int, chosen: List[int]) -> bool:
+        if depth == len(self.tables):
+            return True
+        key = (depth, forbidden)
+        if key in self._failed:
+            return False
+        self._nodes += 1
+        if self._nodes > SEARCH_NODES:
+            raise _SearchBudget
+        _, masks, halos = self.tables[depth]
+        candidates = [index for index in range(len(masks)) if not masks[index] & forbidden]
+        self.rng.shuffle(candidates)
+        for index in candidates:
+            chosen.append(index)
+            if self._search(depth + 1, forbidden | halos[index], chosen):
+                return True
+            chosen.pop()
+        self._failed.add(key)
+        return False
+
+    def sample(self) -> List[List[Tuple[int, int]]]:
+        """Координаты кораблей в порядке ship_sizes"""
+        chosen = self._quick()
+        if chosen is None and self._exhausted:
+            return _symmetric_fleet(self.board_size, self.ship_sizes, self.rng)
+        if chosen is None:
+            chosen = []
+            self._nodes = 0
+            try:
+                found = self._search(0, 0, chosen)
+            except _SearchBudget:
+                self._exhausted = True
+                return _symmetric_fleet(self.board_size, self.ship_sizes, self.rng)
+            finally:
+                self._failed = set()
+            if not found:
+                raise PlacementError("Флот невозможно разместить на поле "
+                                     f"{self.board_size}x{self.board_size}")
+
+        fleet = [None] * len(self.ship_sizes)
+        for ship_index, table, index in zip(self.order, self.tables, chosen):
+            fleet[ship_index] = list(table[0][index])
+        return fleet
+
+    def stream(self, n_fleets: Optional[int] = None) -> Iterator[List[List[Tuple[int, int]]]]:
+        """Поток расстановок: n_fleets штук или бесконечно"""
+        produced = 0
+        while n_fleets is None or produced < n_fleets:
+            yield self.sample()
+            produced += 1
+
+
+class SparseFleetSampler:
+    """Расстановка флота на больших полях без таблиц положений.
+
+    Хранит только занятые клетки и их окрестности, поэтому память и время
+    зависят от размера флота, а не от площади поля. Полного перебора нет:
+    если корабль не удалось поставить за SPARSE_TRIES проб, расстановка
+    начинается заново, а после SPARSE_RESTARTS неудач берётся find_fleet
+    в случайной симметрии поля.
+    """
+
+    def __init__(self, board_size: int, ship_sizes: Sequence[int],
+                 rng: Optional[random.Random] = None):
+        check_fleet(board_size, ship_sizes)
+        self.board_size = board_size
+        self.ship_sizes = list(ship_sizes)
+        self.rng = rng if rng is not None else random.Random()
+
+    def _place_one(self, size: int, forbidden: set) -> Optional[List[Tuple[int, int]]]:
+        rng = self.rng
+        limit = self.board_size - size
+        for _ in range(SPARSE_TRIES):
+            if rng.random() < 0.5:
+                x, y = rng.randrange(self.board_size), rng.randint(0, limit)
+                positions = [(x, y + i) for i in range(size)]
+            else:
+                x, y = rng.randint(0, limit), rng.randrange(self.board_size)
+                positions = [(x + i, y) for i in range(size)]
+            if not any(position in forbidden for position in positions):
+                return positions
+        return None
+
+    def _random_fleet(self) -> Optional[List[List[Tuple[int, int]]]]:
+        forbidden = set()
+        fleet = [None] * len(self.ship_sizes)
+        order = sorted(range(len(self.ship_sizes)), key=lambda i: -self.ship_sizes[i])
+        for ship_index in order:
+            positions = self._place_one(self.ship_sizes[ship_index], forbidden)
+            if positions is None:
+                return None
+            for x, y in positions:
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        forbidden.add((x + dx, y + dy))
+            fleet[ship_index] = positions
+        return fleet
+
+    def sample(self) -> List[List[Tuple[int, int]]]:
+        """Координаты кораблей в порядке ship_sizes"""
+        for _ in range(SPARSE_RESTARTS):
+            fleet = self._random_fleet()
+            if fleet is not None:
+                return fleet
+        return _symmetric_fleet(self.board_size, self.ship_sizes, self.rng)
+
+    def stream(self, n_fleets: Optional[int] = None) -> Iterator[List[List[Tuple[int, int]]]]:
+        produced = 0
+        while n_fleets is None or produced < n_fleets:
+            yield self.sample()
+            produced += 1
+
+
+def make_fleet_sampler(board_size: int, ship_sizes: Sequence[int],
+                       rng: Optional[random.Random] = None):
+    """Табличный FleetSampler для обычных полей и SparseFleetSampler для больших"""
+    if board_size <= TABLE_MAX_BOARD_SIZE:
+        return FleetSampler(board_size, ship_sizes, rng)
+    return SparseFleetSampler(board_size, ship_sizes, rng)
@@ -0,0 +1,150 @@
+import sys
+import weakref
+from typing import IO, Dict, List, Optional
+
+from events import ConsoleRenderer
+
+# Строки под кадром, оставляемые для сообщений хода и приглашения ввода
+ROWS_BELOW_FRAME = 6
+# Строки кадра хода помимо строк двух полей: заголовки, шапки полей, статистика
+FRAME_TEXT_LINES = 9
+
+class BoardView:
+    """Закэшированные строки отрисовки поля.
+
+    Board.changed_rows - журнал строк, изменённых размещением или выстрелом;
+    refresh() перерисовывает только строки, появившиеся в журнале с прошлого вызова,
+    а после Board.reset() или сброса журнала (forget_changes) - всё поле.
+    focus - строка последнего изменения, вокруг неё строится окно window().
+    """
+
+    def __init__(self, board, show_ships: bool):
+        self.board = board
+        self.show_ships = show_ships
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        board = self.board
+        self.lines = [board.header()] + [board.render_row(x, self.show_ships) for x in range(board.size)]
+        self.seen = len(board.changed_rows)
+        self.generation = board.generation
+        self.focus = board.changed_rows[-1] if board.changed_rows else 0
+
+    def refresh(self) -> List[str]:
+        log = self.board.changed_rows
+        if self.generation != self.board.generation:
+            self._rebuild()
+        elif self.seen < len(log):
+            for x in set(log[self.seen:]):
+                self.lines[x + 1] = self.board.render_row(x, self.show_ships)
+            self.seen = len(log)
+            self.focus = log[-1]
+        return self.lines
+
+    def window(self, rows: Optional[int]) -> List[str]:
+        """Шапка и не больше rows строк поля вокруг focus; None - поле целиком"""
+        lines = self.refresh()
+        size = self.board.size
+        if rows is None or rows >= size:
+            return lines
+        start = min(max(0, self.focus - rows // 2), size - rows)
+        return [lines[0]] + lines[1 + start:1 + start + rows]
+
+
+class DiffConsoleRenderer(ConsoleRenderer):
+    """Консольный вывод с кэшем строк полей и записью кадра одним вызовом write.
+
+    На терминале кадр хода рисуется с верхней строки экрана, и при следующем
+    кадре через ANSI-позиционирование переписываются только отличающиеся строки.
+    Если поля не помещаются на экран, от каждого показывается окно строк вокруг
+    последнего выстрела, а строки обрезаются по ширине терминала - так кадр
+    всегда умещается на экране и остаётся разностным.
+    Строки под кадром считаются по событиям, включая приглашения ввода
+    (input_read), и если они могли прокрутить экран, кадр рисуется заново
+    целиком. Вне терминала вывод совпадает с ConsoleRenderer.
+    """
+
+    def __init__(self, out: Optional[IO[str]] = None, ansi: Optional[bool] = None):
+        super().__init__(out)
+        stream = out or sys.stdout
+        self.ansi = stream.isatty() if ansi is None else ansi
+        self.views: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self.screen: List[str] = []
+        self.lines_below = 0
+
+    @property
+    def stream(self) -> IO[str]:
+        return self.out or sys.stdout
+
+    def _view(self, board, show_ships: bool) -> BoardView:
+        views: Dict[bool, BoardView] = self.views.setdefault(board, {})
+        view = views.get(show_ships)
+        if view is None:
+            view = views[show_ships] = BoardView(board, show_ships)
+        return view
+
+    def _print(self, *lines: str) -> None:
+        text = "\n".join(lines) + "\n"
+        self.lines_below += text.count("\n")
+        self.stream.write(text)
+
+    def show_board(self, board, show_ships: bool) -> None:
+        self._print(*self._view(board, show_ships).refresh())
+
+    def player_turn(self, player, opponent) -> None:
+        # shutil импортируется здесь, а не при запуске: он тянет модули архивов
+        import shutil
+
+        terminal = shutil.get_terminal_size()
+        board_rows = None
+        if self.ansi:
+            board_rows = max(1, (terminal.lines - ROWS_BELOW_FRAME - FRAME_TEXT_LINES) // 2)
+        lines = [f"Ход игрока {player.name}", "Ваше поле:"]
+        lines += self._view(player.board, True).window(board_rows)
+        lines += ["", "Поле противника:"]
+        lines += self._view(opponent.board, False).window(board_rows)
+        lines += ["",
+                  f"Статистика {player.name}:",
+                  f"Выстрелы: {player.shots} | Попадания: {player.hits} | Промахи: {player.misses}",
+                  f"Точность: {player.get_accuracy():.1f}% | Потоплено кораблей: {player.ships_sunk}"]
+        self._write_frame(lines, terminal.lines, terminal.columns)
+
+    def _write_frame(self, lines: List[str], rows: int, columns: int) -> None:
+        stream = self.stream
+        if self.ansi:
+            # Перенос длинной строки сдвинул бы позиции всех строк ниже
+            columns = max(1, columns)
+            lines = [line[:columns] for line in lines]
+        if not self.ansi or len(lines) >= rows:
+            self.screen = []
+            stream.write("\n" + "\n".join(lines) + "\n")
+            stream.flush()
+            return
+
+        parts = []
+        if not self.screen or len(self.screen) + self.lines_below >= rows:
+            # Экран мог прокрутиться - прежние позиции строк больше не верны
+            parts.append("\x1b[2J")
+            self.screen = []
+        for index, line in enumerate(lines):
+            if index >= len(self.screen) or self.screen[index] != line:
+                parts.append(f"\x1b[{index + 1};1H{line}\x1b[K")
+        # Курсор под кадр, сообщения прошлого хода стираются
+        parts.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+        stream.write("".join(parts))
+        stream.flush()
+        self.screen = lines
+        self.lines_below = 0
+
+    def game_start(self, first, second) -> None:
+        # Меню и расстановка печатались мимо отрисовщика: первый кадр рисуется целиком
+        self.screen = []
+        super().game_start(first, second)
+
+    def input_read(self, prompt: str, answer: str) -> None:
+        import shutil
+
+        # Длинное приглашение вместе с эхом ответа переносится на несколько строк
+        columns = max(1, shutil.get_terminal_size().columns)
+        for line in (prompt + answer).split("\n"):
+            self.lines_below += max(1, -(-len(line) // columns))
@@ -0,0 +1,371 @@
+"""Компактный двоичный журнал партий и их воспроизведение.
+
+Файл начинается с MAGIC и номера версии, дальше идут записи партий, каждая
+с префиксом длины (varint), поэтому записи можно пропускать не разбирая.
+Все числа в записи - беззнаковые varint:
+
+    размер поля
+    имена двух игроков: длина в байтах и UTF-8; место 0 - тот, кто ходил первым
+    для каждого места: число кораблей, затем размер корабля и start * 2 + vertical,
+        где start = x * size + y - первая клетка корабля
+    число выстрелов, затем клетки выстрелов (x * size + y) по порядку
+
+Клетка size * size означает выстрел мимо поля или пропуск хода - ход переходит
+к сопернику, поле не меняется. Кто стрелял, не хранится: его определяют правила
+(попадание оставляет ход за стрелявшим).
+
+    python replay.py battleship_replays.sbr
+    python replay.py battleship_replays.sbr --game 0 --shot 25
+"""
+import mmap
+import os
+from array import array
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from events import EventSink
+
+MAGIC = b"SBRP"
+VERSION = 1
+DEFAULT_REPLAYS = "battleship_replays.sbr"
+# Через сколько выстрелов Replay запоминает состояние полей
+SNAPSHOT_EVERY = 32
+
+# Корабль в журнале: размер и клетки
+Fleet = List[Tuple[int, List[Tuple[int, int]]]]
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos: int) -> Tuple[int, int]:
+    """Число и позиция сразу за ним"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_ship(positions: Sequence[Tuple[int, int]], size: int) -> int:
+    x, y = positions[0]
+    vertical = len(positions) > 1 and positions[1][0] != x
+    dx, dy = (1, 0) if vertical else (0, 1)
+    if any(position != (x + dx * i, y + dy * i) for i, position in enumerate(positions)):
+        raise ReplayError(f"Корабль {positions} не является отрезком по возрастанию клеток")
+    return (x * size + y) * 2 + vertical
+
+
+def decode_ship(code: int, ship_size: int, size: int) -> List[Tuple[int, int]]:
+    x, y = divmod(code >> 1, size)
+    if code & 1:
+        return [(x + i, y) for i in range(ship_size)]
+    return [(x, y + i) for i in range(ship_size)]
+
+
+def encode_game(size: int, names: Sequence[str], fleets: Sequence[Fleet],
+                shots: Sequence[int]) -> bytes:
+    """Тело записи партии без префикса длины"""
+    out = bytearray()
+    write_varint(out, size)
+    for name in names:
+        raw = name.encode("utf-8")
+        write_varint(out, len(raw))
+        out += raw
+    for fleet in fleets:
+        write_varint(out, len(fleet))
+        for ship_size, positions in fleet:
+            write_varint(out, ship_size)
+            write_varint(out, encode_ship(positions, size))
+    write_varint(out, len(shots))
+    for cell in shots:
+        write_varint(out, cell)
+    return bytes(out)
+
+
+def append_replays(path: str, records: Sequence[bytes]) -> None:
+    """Дописывает записи в журнал одной операцией записи"""
+    out = bytearray()
+    for record in records:
+        write_varint(out, len(record))
+        out += record
+    with open(path, "ab") as f:
+        if f.tell() == 0:
+            f.write(MAGIC + bytes([VERSION]))
+        f.write(out)
+
+
+class Replay:
+    """Одна партия из журнала: флоты, выстрелы и состояние полей после любого выстрела"""
+
+    def __init__(self, data, start: int = 0, end: Optional[int] = None):
+        end = len(data) if end is None else end
+        try:
+            self.size, pos = read_varint(data, start)
+            names = []
+            for _ in range(2):
+                length, pos = read_varint(data, pos)
+                names.append(bytes(data[pos:pos + length]).decode("utf-8"))
+                pos += length
+            self.names = tuple(names)
+            self.fleets: List[Fleet] = []
+            for _ in range(2):
+                count, pos = read_varint(data, pos)
+                fleet = []
+                for _ in range(count):
+                    ship_size, pos = read_varint(data, pos)
+                    code, pos = read_varint(data, pos)
+                    fleet.append((ship_size, decode_ship(code, ship_size, self.size)))
+                self.fleets.append(fleet)
+            count, pos = read_varint(data, pos)
+            self.shots = array('I')
+            for _ in range(count):
+                cell, pos = read_varint(data, pos)
+                self.shots.append(cell)
+        except (IndexError, UnicodeDecodeError) as e:
+            raise ReplayError(f"Повреждённая запись партии: {e}") from e
+        if pos != end:
+            raise ReplayError("Длина записи партии не совпадает с содержимым")
+
+        self.ship_masks = tuple(
+            sum(1 << (x * self.size + y) for _, positions in fleet for x, y in positions)
+            for fleet in self.fleets)
+        self._snapshots: Optional[List[Tuple[int, int, int, int, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.shots)
+
+    def _step(self, state: Tuple[int, int, int, int, int], cell: int) -> Tuple[int, int, int, int, int]:
+        # Состояние: попадания и промахи по полю места 0, затем места 1, и чей ход
+        hit0, miss0, hit1, miss1, seat = state
+        target = 1 - seat
+        if cell >= self.size * self.size:
+            return hit0, miss0, hit1, miss1, target
+        bit = 1 << cell
+        hits, misses = (hit0, miss0) if target == 0 else (hit1, miss1)
+        if (hits | misses) & bit:
+            return hit0, miss0, hit1, miss1, target
+        if self.ship_masks[target] & bit:
+            hits |= bit
+        else:
+            misses |= bit
+            seat = target
+        if target == 0:
+            return hits, misses, hit1, miss1, seat
+        return hit0, miss0, hits, misses, seat
+
+    def state_at(self, shot: int) -> Tuple[int, int, int, int, int]:
+        """Маски попаданий и промахов по полям мест 0 и 1 и место, которое ходит,
+        после первых shot выстрелов"""
+        if not 0 <= shot <= len(self.shots):
+            raise IndexError(f"В партии {len(self.shots)} выстрелов")
+        if self._snapshots is None:
+            # Снимок k - состояние после k * SNAPSHOT_EVERY выстрелов
+            state = (0, 0, 0, 0, 0)
+            self._snapshots = [state]
+            for index, cell in enumerate(self.shots, 1):
+                state = self._step(state, cell)
+                if index % SNAPSHOT_EVERY == 0:
+                    self._snapshots.append(state)
+        index = shot // SNAPSHOT_EVERY
+        state = self._snapshots[index]
+        for cell in self.shots[index * SNAPSHOT_EVERY:shot]:
+            state = self._step(state, cell)
+        return state
+
+    def moves(self) -> Iterator[Tuple[int, int, bool]]:
+        """Выстрелы по порядку: место стрелявшего, клетка и было ли попадание"""
+        state = (0, 0, 0, 0, 0)
+        for cell in self.shots:
+            seat = state[4]
+            # Попадания по полю соперника: место 0 стреляет по полю места 1
+            target_hits = 2 if seat == 0 else 0
+            before = state[target_hits]
+            state = self._step(state, cell)
+            yield seat, cell, state[target_hits] != before
+
+    def shooter(self, shot: int) -> int:
+        """Место игрока, сделавшего выстрел с номером shot (с нуля)"""
+        return self.state_at(shot)[4]
+
+    @property
+    def winner(self) -> Optional[int]:
+        hit0, _, hit1, _, _ = self.state_at(len(self.shots))
+        if self.ship_masks[0] and self.ship_masks[0] & ~hit0 == 0:
+            return 1
+        if self.ship_masks[1] and self.ship_masks[1] & ~hit1 == 0:
+            return 0
+        return None
+
+    def board_at(self, shot: int, seat: int, board_factory=None):
+        """Поле игрока seat после первых shot выстрелов"""
+        from gameseabattle import Board, Ship
+
+        state = self.state_at(shot)
+        marks = state[0] | state[1] if seat == 0 else state[2] | state[3]
+        board = (board_factory or Board)(self.size)
+        for ship_size, positions in self.fleets[seat]:
+            board.place_ship(Ship(ship_size, list(positions)))
+        while marks:
+            low = marks & -marks
+            board.receive_attack(*divmod(low.bit_length() - 1, self.size))
+            marks ^= low
+        return board
+
+
+class ReplayFile:
+    """Журнал партий, отображённый в память. Записи разбираются только при обращении"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ReplayError(f"Файл {path} пуст")
+        if len(self.data) <= len(MAGIC) or self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ReplayError(f"Файл {path} не является журналом партий")
+        if self.data[len(MAGIC)] != VERSION:
+            self.close()
+            raise ReplayError(f"Неподдерживаемая версия журнала {self.data[len(MAGIC)]}")
+        self._offsets: Optional[array] = None
+
+    def __enter__(self) -> 'ReplayFile':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.data.close()
+        self._file.close()
+
+    def records(self) -> Iterator[Tuple[int, int]]:
+        """Границы тел записей (начало, конец) без их разбора"""
+        pos = len(MAGIC) + 1
+        end = len(self.data)
+        while pos < end:
+            try:
+                length, pos = read_varint(self.data, pos)
+            except IndexError:
+                raise ReplayError("Журнал обрывается посреди записи")
+            if pos + length > end:
+                raise ReplayError("Журнал обрывается посреди записи")
+            yield pos, pos + length
+            pos += length
+
+    def _index(self) -> array:
+        if self._offsets is None:
+            self._offsets = array('Q')
+            for start, end in self.records():
+                self._offsets.append(start)
+                self._offsets.append(end)
+        return self._offsets
+
+    def __len__(self) -> int:
+        return len(self._index()) // 2
+
+    def __getitem__(self, index: int) -> Replay:
+        offsets = self._index()
+        if index < 0:
+            index += len(offsets) // 2
+        if not 0 <= index < len(offsets) // 2:
+            raise IndexError("Нет партии с таким номером")
+        return Replay(self.data, offsets[2 * index], offsets[2 * index + 1])
+
+    def __iter__(self) -> Iterator[Replay]:
+        for start, end in self.records():
+            yield Replay(self.data, start, end)
+
+
+class ReplayRecorder(EventSink):
+    """Приёмник событий, который пишет каждую партию в журнал.
+
+    Без path записи копятся в records - так симулятор собирает партии в
+    процессе-работнике и пишет их одним куском.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.records: List[bytes] = []
+        self.size = 0
+        self.names: Tuple[str, str] = ("", "")
+        self.fleets: List[Fleet] = []
+        self.shots = array('I')
+
+    def game_start(self, first, second) -> None:
+        self.size = first.board.size
+        self.names = (first.name, second.name)
+        self.fleets = [[(ship.size, ship.positions) for ship in player.board.ships]
+                       for player in (first, second)]
+        self.shots = array('I')
+
+    def snapshot(self) -> tuple:
+        """Начатая партия для файла сохранения: без неё продолженная игра попала бы в журнал без начала"""
+        return self.size, self.names, self.fleets, self.shots.tobytes()
+
+    def restore(self, state: tuple) -> None:
+        self.size, names, self.fleets, shots = state
+        self.names = tuple(names)
+        self.shots = array('I')
+        self.shots.frombytes(shots)
+
+    def shot(self, player, x: int, y: int) -> None:
+        if 0 <= x < self.size and 0 <= y < self.size:
+            self.shots.append(x * self.size + y)
+        else:
+            self.shots.append(self.size * self.size)
+
+    def no_targets(self, player) -> None:
+        self.shots.append(self.size * self.size)
+
+    def game_over(self, winner, loser) -> None:
+        record = encode_game(self.size, self.names, self.fleets, self.shots)
+        if self.path is None:
+            self.records.append(record)
+        else:
+            append_replays(self.path, [record])
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Просмотр журнала партий 'Морского боя'")
+    parser.add_argument("path", nargs="?", default=DEFAULT_REPLAYS)
+    parser.add_argument("--game", type=int, default=None, help="номер партии для показа")
+    parser.add_argument("--shot", type=int, default=None, help="показать поля после этого числа выстрелов")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        parser.error(f"файл {args.path} не найден")
+    with ReplayFile(args.path) as replays:
+        if args.game is None:
+            games = shots = 0
+            for replay in replays:
+                games += 1
+                shots += len(replay)
+            print(f"Партий: {games}, выстрелов: {shots}, "
+                  f"в среднем {shots / games if games else 0:.1f} на партию")
+            return
+
+        replay = replays[args.game]
+        shot = len(replay) if args.shot is None else args.shot
+        print(f"{replay.names[0]} против {replay.names[1]}, выстрел {shot} из {len(replay)}")
+        for seat in (0, 1):
+            print(f"\nПоле {replay.names[seat]}:")
+            replay.board_at(shot, seat).display(show_ships=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Асинхронный сервер сетевой игры: JSON-строки поверх TCP.
+
+Клиент -> сервер, по одному объекту JSON на строку:
+    {"op": "join", "name": "Аня"}      встать в очередь, сервер подберёт соперника
+    {"op": "fire", "x": 3, "y": 4}     выстрел в свой ход
+    {"op": "ping"} / {"op": "stats"}
+
+Сервер -> клиент:
+    {"event": "start", "match": 7, "you": 0, "turn": 0, "size": 10, "ships": [[[x, y], ...], ...]}
+    {"event": "result", "x": 3, "y": 4, "hit": true, "sunk": 2, "win": false, "turn": 0}
+    {"event": "incoming", ...}          то же, что result, но для обстрелянного игрока
+    {"event": "opponent_left"} / {"event": "error", "message": "..."}
+
+Правила - те же Board.receive_attack, что и в консольной игре: попадание
+оставляет ход за стрелявшим, промах, повторный выстрел и выстрел за поле
+передают ход.
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Dict, Optional, Sequence
+
+from gameseabattle import Board, GameConfig, Ship
+from placement import make_fleet_sampler
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Самая длинная допустимая строка от клиента
+MAX_LINE = 4096
+# Сколько неотправленных сообщений может накопиться у медленного клиента
+OUTBOX_SIZE = 64
+
+
+class Session:
+    """Одно подключение: очередь исходящих сообщений и текущий матч"""
+
+    __slots__ = ("reader", "writer", "name", "outbox", "match", "seat", "closed")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.name = ""
+        self.outbox = asyncio.Queue(OUTBOX_SIZE)
+        self.match: Optional['Match'] = None
+        self.seat = 0
+        self.closed = False
+
+    def send(self, message: Dict) -> None:
+        if self.closed:
+            return
+        try:
+            self.outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            # Клиент не читает ответы - отключаем, а не копим память
+            self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+
+class Match:
+    """Состояние партии: два поля и чей ход"""
+
+    __slots__ = ("match_id", "sessions", "boards", "turn", "finished")
+
+    def __init__(self, match_id: int, first: Session, second: Session, config: GameConfig,
+                 rng: random.Random):
+        self.match_id = match_id
+        self.sessions = (first, second)
+        self.boards = (Board(config.board_size), Board(config.board_size))
+        sampler = make_fleet_sampler(config.board_size, config.ship_sizes, rng)
+        for board in self.boards:
+            for size, positions in zip(config.ship_sizes, sampler.sample()):
+                board.place_ship(Ship(size, positions))
+        self.turn = rng.randrange(2)
+        self.finished = False
+
+    def fire(self, seat: int, x: int, y: int) -> Dict:
+        target = self.boards[1 - seat]
+        hit, ship = target.receive_attack(x, y)
+        win = hit and target.all_ships_sunk()
+        if not hit:
+            self.turn = 1 - seat
+        if win:
+            self.finished = True
+        return {
+            "x": x,
+            "y": y,
+            "hit": hit,
+            "sunk": ship.size if hit and ship.is_sunk() else None,
+            "win": win,
+            "turn": self.turn,
+        }
+
+
+class GameServer:
+    def __init__(self, config: Optional[GameConfig] = None, max_connections: int = 20000,
+                 seed: Optional[int] = None):
+        self.config = config if config is not None else GameConfig()
+        self.rng = random.Random(seed)
+        self.slots = asyncio.Semaphore(max_connections)
+        self.waiting: Optional[Session] = None
+        self.match_ids = itertools.count(1)
+        self.active_matches = 0
+        self.stats = {"connections": 0, "matches_started": 0, "matches_finished": 0, "moves": 0}
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE, backlog=4096)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.slots.locked():
+            writer.write(b'{"event": "error", "message": "server is full"}\n')
+            writer.close()
+            return
+        async with self.slots:
+            session = Session(reader, writer)
+            self.stats["connections"] += 1
+            sender = asyncio.ensure_future(self._send_loop(session))
+            try:
+                await self._read_loop(session)
+            finally:
+                self._leave(session)
+                session.close()
+                sender.cancel()
+
+    async def _send_loop(self, session: Session) -> None:
+        writer = session.writer
+        try:
+            while True:
+                message = await session.outbox.get()
+                lines = [message]
+                # Всё, что уже накопилось, уходит одной записью
+                while not session.outbox.empty():
+                    lines.append(session.outbox.get_nowait())
+                writer.write("".join(json.dumps(line) + "\n" for line in lines).encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def _read_loop(self, session: Session) -> None:
+        while not session.closed:
+            try:
+                line = await session.reader.readline()
+            except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                return
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                op = request["op"]
+            except (ValueError, KeyError, TypeError):
+                session.send({"event": "error", "message": "bad request"})
+                continue
+            # Список или словарь в op не хешируется и уронил бы сессию на поиске
+            handler = self.HANDLERS.get(op) if isinstance(op, str) else None
+            if handler is None:
+                session.send({"event": "error", "message": f"unknown op {op!r}"})
+                continue
+            handler(self, session, request)
+
+    def _join(self, session: Session, request: Dict) -> None:
+        if session.match is not None or self.waiting is session:
+            session.send({"event": "error", "message": "already joined"})
+            return
+        session.name = str(request.get("name", ""))[:32]
+        if self.waiting is None or self.waiting.closed:
+            self.waiting = session
+            session.send({"event": "waiting"})
+            return
+
+        opponent, self.waiting = self.waiting, None
+        match = Match(next(self.match_ids), opponent, session, self.config, self.rng)
+        self.active_matches += 1
+        self.stats["matches_started"] += 1
+        for seat, player in enumerate(match.sessions):
+            player.match = match
+            player.seat = seat
+            player.send({
+                "event": "start",
+                "match": match.match_id,
+                "you": seat,
+                "opponent": match.sessions[1 - seat].name,
+                "turn": match.turn,
+                "size": self.config.board_size,
+                "ships": [ship.positions for ship in match.boards[seat].ships],
+            })
+
+    def _fire(self, session: Session, request: Dict) -> None:
+        match = session.match
+        if match is None or match.finished:
+            session.send({"event": "error", "message": "no active match"})
+            return
+        if match.turn != session.seat:
+            session.send({"event": "error", "message": "not your turn"})
+            return
+        try:
+            x, y = int(request["x"]), int(request["y"])
+        except (KeyError, TypeError, ValueError, OverflowError):
+            # OverflowError - от int(1e400): JSON пропускает такие числа как inf
+            session.send({"event": "error", "message": "x and y must be integers"})
+            return
+
+        result = match.fire(session.seat, x, y)
+        self.stats["moves"] += 1
+        session.send(dict(result, event="result"))
+        match.sessions[1 - session.seat].send(dict(result, event="incoming"))
+        if match.finished:
+            self._finish(match)
+
+    def _finish(self, match: Match) -> None:
+        self.active_matches -= 1
+        self.stats["matches_finished"] += 1
+        for player in match.sessions:
+            player.match = None
+
+    def _leave(self, session: Session) -> None:
+        if self.waiting is session:
+            self.waiting = None
+        match = session.match
+        if match is not None and not match.finished:
+            match.finished = True
+            match.sessions[1 - session.seat].send({"event": "opponent_left"})
+            self._finish(match)
+
+    def _ping(self, session: Session, request: Dict) -> None:
+        session.send({"event": "pong"})
+
+    def _stats(self, session: Session, request: Dict) -> None:
+        session.send(dict(self.stats, event="stats", active_matches=self.active_matches,
+                          cpu_time=time.process_time()))
+
+    HANDLERS = {"join": _join, "fire": _fire, "ping": _ping, "stats": _stats}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сервер сетевого 'Морского боя'")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--board-size", type=int, default=10)
+    parser.add_argument("--max-connections", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = GameServer(GameConfig(args.board_size), args.max_connections, args.seed)
+    print(f"Сервер слушает {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from bitboard import BitBoard
+from events import EventSink
+from gameseabattle import AIPlayer, Board, GameConfig
+from opening_book import load_book
+from placement import TABLE_MAX_BOARD_SIZE, make_fleet_sampler
+from replay import ReplayRecorder, append_replays
+
+class SimulationResult:
+    """Сводные результаты серии партий компьютер против компьютера"""
+
+    def __init__(self, difficulty_a: str, difficulty_b: str):
+        self.difficulty_a = difficulty_a
+        self.difficulty_b = difficulty_b
+        self.games = 0
+        self.wins_a = 0
+        self.wins_b = 0
+        self.shots_to_win_a = Counter()
+        self.shots_to_win_b = Counter()
+
+    def add_game(self, winner: str, shots: int) -> None:
+        self.games += 1
+        if winner == "a":
+            self.wins_a += 1
+            self.shots_to_win_a[shots] += 1
+        else:
+            self.wins_b += 1
+            self.shots_to_win_b[shots] += 1
+
+    def merge(self, other: 'SimulationResult') -> None:
+        self.games += other.games
+        self.wins_a += other.wins_a
+        self.wins_b += other.wins_b
+        self.shots_to_win_a.update(other.shots_to_win_a)
+        self.shots_to_win_b.update(other.shots_to_win_b)
+
+    @property
+    def win_rate_a(self) -> float:
+        return self.wins_a / self.games if self.games else 0.0
+
+    @property
+    def win_rate_b(self) -> float:
+        return self.wins_b / self.games if self.games else 0.0
+
+    @staticmethod
+    def mean_shots(distribution: Counter) -> float:
+        total = sum(distribution.values())
+        if total == 0:
+            return 0.0
+        return sum(shots * count for shots, count in distribution.items()) / total
+
+    def to_dict(self) -> Dict:
+        return {
+            "games": self.games,
+            "difficulty_a": self.difficulty_a,
+            "difficulty_b": self.difficulty_b,
+            "wins_a": self.wins_a,
+            "wins_b": self.wins_b,
+            "win_rate_a": self.win_rate_a,
+            "win_rate_b": self.win_rate_b,
+            "mean_shots_to_win_a": self.mean_shots(self.shots_to_win_a),
+            "mean_shots_to_win_b": self.mean_shots(self.shots_to_win_b),
+            "shots_to_win_a": dict(sorted(self.shots_to_win_a.items())),
+            "shots_to_win_b": dict(sorted(self.shots_to_win_b.items())),
+        }
+
+
+def play_headless_game(player_a: AIPlayer, player_b: AIPlayer, a_starts: bool = True,
+                       events: Optional[EventSink] = None) -> Tuple[str, int]:
+    """Играет одну партию без ввода-вывода. Возвращает ("a" или "b", выстрелы победителя).
+
+    events получает начало и конец партии, как Game.events; ходы игроки
+    сообщают своим приёмникам.
+    """
+    player_a.place_ships()
+    player_b.place_ships()
+
+    current, opponent = (player_a, player_b) if a_starts else (player_b, player_a)
+    if events is not None:
+        events.game_start(current, opponent)
+    # Страховка от бесконечной партии: каждый ход тратит клетку из пула игрока
+    max_moves = 2 * player_a.board.size * player_b.board.size + 2
+    winner = None
+    for _ in range(max_moves):
+        if current.make_move(opponent):
+            if opponent.board.all_ships_sunk():
+                winner, loser = current, opponent
+                break
+        else:
+            current, opponent = opponent, current
+
+    if winner is None:
+        # Ничья невозможна по правилам, но на всякий случай засчитываем победу тому,
+        # кто потопил больше кораблей
+        winner, loser = (player_a, player_b) if player_a.ships_sunk >= player_b.ships_sunk \
+            else (player_b, player_a)
+    if events is not None:
+        events.game_over(winner, loser)
+    return ("a" if winner is player_a else "b"), winner.shots
+
+
+Chunk = Tuple[int, int, str, str, int, Callable[[int], Board], GameConfig, bool, Optional[str], bool, bool]
+
+
+def _run_chunk(args: Chunk) -> Tuple[SimulationResult, List[bytes], Optional[Dict]]:
+    """Результаты пакета партий, их записи для журнала (если record) и замеры (если profile)"""
+    (first_game, n_games, difficulty_a, difficulty_b, seed, board_factory, config, record,
+     book_path, profile, endgame) = args
+    if profile:
+        import instrumentation
+
+        instrumentation.install()
+        instrumentation.METRICS.reset()
+    rng = random.Random(seed)
+    book = load_book(book_path) if book_path else None
+    result = SimulationResult(difficulty_a, difficulty_b)
+    recorder = ReplayRecorder() if record else None
+    # Игроки с полями создаются на пакет и очищаются reset() между партиями
+    player_a = AIPlayer(difficulty_a, rng=rng, verbose=False, board_factory=board_factory,
+                        config=config, events=recorder, book=book, endgame=endgame)
+    player_b = AIPlayer(difficulty_b, rng=rng, verbose=False, board_factory=board_factory,
+                        config=config, events=recorder, book=book, endgame=endgame)
+    for game_index in range(first_game, first_game + n_games):
+        if game_index != first_game:
+            player_a.reset()
+            player_b.reset()
+        # Первый ход чередуется, чтобы право первого выстрела не искажало статистику
+        winner, shots = play_headless_game(player_a, player_b, a_starts=game_index % 2 == 0,
+                                           events=recorder)
+        result.add_game(winner, shots)
+    metrics = instrumentation.METRICS.snapshot() if profile else None
+    return result, recorder.records if recorder is not None else [], metrics
+
+
+def _make_chunks(n_games: int, difficulty_a: str, difficulty_b: str, seed: Optional[int],
+                 chunk_size: int, board_factory: Callable[[int], Board], config: GameConfig,
+                 record: bool = False, book_path: Optional[str] = None,
+                 profile: bool = False, endgame: bool = False) -> List[Chunk]:
+    # Сиды пакетов зависят только от seed и chunk_size, но не от числа процессов,
+    # поэтому результат воспроизводим на любой машине
+    seeder = random.Random(seed)
+    chunks = []
+    for first_game in range(0, n_games, chunk_size):
+        size = min(chunk_size, n_games - first_game)
+        chunks.append((first_game, size, difficulty_a, difficulty_b, seeder.getrandbits(64),
+                       board_factory, config, record, book_path, profile, endgame))
+    return chunks
+
+
+def simulate(n_games: int, difficulty_a: str = "medium", difficulty_b: str = "medium",
+             seed: Optional[int] = None, workers: Optional[int] = None,
+             chunk_size: int = 1000, board_factory: Optional[Callable[[int], Board]] = None,
+             config: Optional[GameConfig] = None, replays: Optional[str] = None,
+             book: Optional[str] = None, profile: Optional[bool] = None,
+             endgame: bool = False) -> SimulationResult:
+    """Прогоняет n_games партий AIPlayer против AIPlayer на пуле процессов.
+
+    Если задан replays, партии дописываются в этот журнал в порядке пакетов.
+    book - путь к дебютной книге; каждый процесс отображает её в память сам.
+    profile включает замеры instrumentation (по умолчанию - по SEABATTLE_PROFILE);
+    после прогона в instrumentation.METRICS лежат замеры всех процессов.
+    endgame включает решатель эндшпиля уровня "hard"; по умолчанию он выключен,
+    потому что в несколько раз замедляет партии ради пары сэкономленных выстрелов.
+    """
+    if n_games < 0:
+        raise ValueError("n_games не может быть отрицательным")
+    if chunk_size < 1:
+        raise ValueError("chunk_size должен быть положительным")
+
+    config = config if config is not None else GameConfig()
+    if board_factory is None:
+        # BitBoard держит плотный массив владельцев клеток, на больших полях нужен разреженный Board
+        board_factory = BitBoard if config.board_size <= TABLE_MAX_BOARD_SIZE else Board
+    if profile is None:
+        profile = os.environ.get("SEABATTLE_PROFILE", "") not in ("", "0")
+    chunks = _make_chunks(n_games, difficulty_a, difficulty_b, seed, chunk_size, board_factory,
+                          config, replays is not None, book, profile, endgame)
+    result = SimulationResult(difficulty_a, difficulty_b)
+    workers = workers or os.cpu_count() or 1
+    # Замеры пакетов складываются отдельно: в этом процессе _run_chunk сбрасывает общие
+    metrics: List[Dict] = []
+
+    def collect(partial: SimulationResult, records: List[bytes], chunk_metrics: Optional[Dict]) -> None:
+        result.merge(partial)
+        if records:
+            append_replays(replays, records)
+        if chunk_metrics is not None:
+            metrics.append(chunk_metrics)
+
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            collect(*_run_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            for partial in executor.map(_run_chunk, chunks):
+                collect(*partial)
+
+    if profile:
+        import instrumentation
+
+        instrumentation.METRICS.reset()
+        for chunk_metrics in metrics:
+            instrumentation.METRICS.merge(chunk_metrics)
+    return result
+
+
+def random_baseline(n_games: int, config: Optional[GameConfig] = None, seed: Optional[int] = None,
+                    batch_size: int = 10000) -> Counter:
+    """Распределение числа выстрелов до победы у стрелка наугад без повторов.
+
+    Партии играются пакетным движком batch_engine по batch_size полей за раз,
+    поэтому нужен NumPy. Расстановки те же, что у AIPlayer.place_ships, и
+    результат зависит только от seed и batch_size.
+    """
+    import numpy as np
+
+    from batch_engine import BatchBoards, play_random
+
+    if n_games < 0:
+        raise ValueError("n_games не может быть отрицательным")
+    if batch_size < 1:
+        raise ValueError("batch_size должен быть положительным")
+    config = config if config is not None else GameConfig()
+    rng = random.Random(seed)
+    sampler = make_fleet_sampler(config.board_size, config.ship_sizes, rng)
+    shots_to_win = Counter()
+    for first_game in range(0, n_games, batch_size):
+        size = min(batch_size, n_games - first_game)
+        batch = BatchBoards.from_fleets([sampler.sample() for _ in range(size)], config.board_size)
+        shots = play_random(batch, np.random.default_rng(rng.getrandbits(64)))
+        shots_to_win.update(shots.tolist())
+    return shots_to_win
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+    import contextlib
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Безголовая симуляция партий компьютер против компьютера")
+    parser.add_argument("games", type=int)
+    parser.add_argument("--a", dest="difficulty_a", default="medium", choices=list(AIPlayer.DIFFICULTY_LEVELS))
+    parser.add_argument("--b", dest="difficulty_b", default="medium", choices=list(AIPlayer.DIFFICULTY_LEVELS))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--board-size", type=int, default=10)
+    parser.add_argument("--fleet", default=None, help="размеры кораблей через пробел")
+    parser.add_argument("--replays", default=None, help="дописать партии в этот журнал")
+    parser.add_argument("--book", default=None, help="дебютная книга для уровней hard и expert")
+    parser.add_argument("--endgame", action="store_true", help="решатель эндшпиля для уровня hard")
+    parser.add_argument("--batch", action="store_true",
+                        help="вместо партий AIPlayer - стрелок наугад на пакетном движке (нужен NumPy)")
+    parser.add_argument("--profile", action="store_true",
+                        help="счётчики и гистограммы времени, сводка в stderr")
+    parser.add_argument("--profile-json", default=None, help="записать сводку замеров в JSON")
+    parser.add_argument("--profile-out", default=None,
+                        help="записать дамп cProfile (pstats); партии играются в одном процессе")
+    args = parser.parse_args(argv)
+
+    game_config = GameConfig(args.board_size,
+                             [int(size) for size in args.fleet.split()] if args.fleet else None)
+    if args.batch:
+        shots_to_win = random_baseline(args.games, game_config, args.seed, args.chunk_size)
+        print(json.dumps({
+            "games": args.games,
+            "mean_shots_to_win": SimulationResult.mean_shots(shots_to_win),
+            "shots_to_win": dict(sorted(shots_to_win.items())),
+        }, ensure_ascii=False, indent=2))
+        return
+    profile = args.profile or args.profile_json is not None or None
+    workers = args.workers
+    profiler = contextlib.nullcontext()
+    if args.profile_out:
+        from instrumentation import Profiler
+
+        # cProfile видит только свой процесс
+        workers = 1
+        profiler = Profiler(args.profile_out)
+    with profiler:
+        summary = simulate(args.games, args.difficulty_a, args.difficulty_b, args.seed,
+                           workers, args.chunk_size, config=game_config, replays=args.replays,
+                           book=args.book, profile=profile, endgame=args.endgame)
+    print(json.dumps(summary.to_dict(), ensure_ascii=False, indent=2))
+    if args.profile_out:
+        print(f"Дамп cProfile записан в {args.profile_out}", file=sys.stderr)
+    if "instrumentation" in sys.modules:
+        from instrumentation import METRICS
+
+        if METRICS.timings:
+            METRICS.report()
+        if args.profile_json:
+            METRICS.dump(args.profile_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Сохранение и восстановление партии.
+
+Объекты игры сами отдают своё состояние кортежами из чисел, строк, списков,
+словарей и множеств (методы snapshot/restore у Board, Player, AIPlayer и Game),
+а этот модуль только упаковывает его в marshal с заголовком версии. marshal
+на таких данных работает за микросекунды, поэтому снимок можно делать после
+каждого хода. Формат marshal привязан к версии Python и не предназначен для
+данных из недоверенных источников - только для собственных файлов сохранения.
+"""
+import marshal
+import os
+import random
+from array import array
+
+MAGIC = b"SBSN"
+VERSION = 5
+DEFAULT_SAVE = "battleship_save.dat"
+# Версия 2 не ищет повторяющиеся объекты и пишет быстрее; в снимках их нет
+MARSHAL_VERSION = 2
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def pack_random(rng: random.Random) -> tuple:
+    """Состояние генератора, где 625 слов Mersenne Twister сжаты в bytes"""
+    version, words, gauss_next = rng.getstate()
+    return version, array('I', words).tobytes(), gauss_next
+
+
+def unpack_random(rng: random.Random, state: tuple) -> None:
+    version, words, gauss_next = state
+    unpacked = array('I')
+    unpacked.frombytes(words)
+    rng.setstate((version, tuple(unpacked), gauss_next))
+
+
+def dumps(state: tuple) -> bytes:
+    return MAGIC + bytes([VERSION]) + marshal.dumps(state, MARSHAL_VERSION)
+
+
+def loads(data: bytes) -> tuple:
+    if data[:len(MAGIC)] != MAGIC:
+        raise SnapshotError("Это не файл сохранения игры")
+    if len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION:
+        raise SnapshotError("Неподдерживаемая версия сохранения")
+    try:
+        return marshal.loads(data[len(MAGIC) + 1:])
+    except (EOFError, ValueError, TypeError) as e:
+        raise SnapshotError(f"Повреждённое сохранение: {e}") from e
+
+
+def save(path: str, state: tuple) -> None:
+    """Записывает снимок атомарно: при сбое остаётся прежнее сохранение"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(state))
+    os.replace(tmp_path, path)
+
+
+def load(path: str) -> tuple:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
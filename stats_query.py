@@ -0,0 +1,194 @@
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from stats_store import ACCURACY_BUCKETS_PER_PERCENT, StatsStore
+
+
+class PlayerSummary:
+    """Сводка по игроку: суммы счётчиков за все его партии"""
+
+    def __init__(self, player: str, games: int = 0, shots: int = 0, hits: int = 0, misses: int = 0,
+                 ships_sunk: int = 0, score_total: int = 0, best_score: int = 0,
+                 first_date: Optional[str] = None, last_date: Optional[str] = None):
+        self.player = player
+        self.games = games
+        self.shots = shots
+        self.hits = hits
+        self.misses = misses
+        self.ships_sunk = ships_sunk
+        self.score_total = score_total
+        self.best_score = best_score
+        self.first_date = first_date
+        self.last_date = last_date
+
+    def add(self, record: Dict) -> None:
+        self.games += 1
+        self.shots += record["shots"]
+        self.hits += record["hits"]
+        self.misses += record["misses"]
+        self.ships_sunk += record["ships_sunk"]
+        self.score_total += record["score"]
+        self.best_score = max(self.best_score, record["score"])
+        date = record["date"]
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+
+    @property
+    def accuracy(self) -> float:
+        if self.shots == 0:
+            return 0.0
+        return (self.hits / self.shots) * 100
+
+    @property
+    def avg_score(self) -> float:
+        return self.score_total / self.games if self.games else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "player": self.player,
+            "games": self.games,
+            "shots": self.shots,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ships_sunk": self.ships_sunk,
+            "score_total": self.score_total,
+            "best_score": self.best_score,
+            "accuracy": self.accuracy,
+            "avg_score": self.avg_score,
+            "first_date": self.first_date,
+            "last_date": self.last_date,
+        }
+
+
+LEADERBOARD_KEYS = {
+    "score": lambda summary: summary.score_total,
+    "avg_score": lambda summary: summary.avg_score,
+    "best_score": lambda summary: summary.best_score,
+    "accuracy": lambda summary: summary.accuracy,
+    "games": lambda summary: summary.games,
+}
+
+
+def aggregate(records: Iterable[Dict]) -> Dict[str, PlayerSummary]:
+    """Свёртка потока записей по игрокам: память O(число игроков)"""
+    summaries = {}
+    for record in records:
+        summary = summaries.get(record["player"])
+        if summary is None:
+            summary = summaries[record["player"]] = PlayerSummary(record["player"])
+        summary.add(record)
+    return summaries
+
+
+def player_summaries(store: StatsStore, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     player: Optional[str] = None) -> Dict[str, PlayerSummary]:
+    """Без фильтра по датам читает готовые сводки, иначе сворачивает записи периода потоком"""
+    if date_from is None and date_to is None:
+        query = ("SELECT player, games, shots, hits, misses, ships_sunk, score_total, best_score, "
+                 "first_date, last_date FROM player_summary")
+        params = ()
+        if player is not None:
+            query += " WHERE player = ?"
+            params = (player,)
+        return {row["player"]: PlayerSummary(*row) for row in store.conn.execute(query, params)}
+    return aggregate(store.iter_records(player=player, date_from=date_from, date_to=date_to))
+
+
+def leaderboard(store: StatsStore, by: str = "score", limit: int = 10, min_games: int = 1,
+                date_from: Optional[str] = None, date_to: Optional[str] = None,
+                player: Optional[str] = None) -> List[PlayerSummary]:
+    if by not in LEADERBOARD_KEYS:
+        raise ValueError(f"Неизвестный критерий: {by}. Доступны: {', '.join(LEADERBOARD_KEYS)}")
+    summaries = player_summaries(store, date_from, date_to, player).values()
+    eligible = (summary for summary in summaries if summary.games >= min_games)
+    return heapq.nlargest(limit, eligible, key=LEADERBOARD_KEYS[by])
+
+
+def histogram_percentiles(histogram: Dict[float, int], qs: Sequence[float]) -> Dict[float, float]:
+    """Процентили по методу ближайшего ранга из гистограммы значение -> количество"""
+    total = sum(histogram.values())
+    if total == 0:
+        return {q: 0.0 for q in qs}
+    items = sorted(histogram.items())
+    result = {}
+    for q in qs:
+        rank = max(1, -(-q * total // 100))
+        seen = 0
+        for value, count in items:
+            seen += count
+            if seen >= rank:
+                result[q] = value
+                break
+    return result
+
+
+def _stored_histogram(store: StatsStore, field: str, player: Optional[str]) -> Dict[float, int]:
+    table, column = ("accuracy_hist", "bucket") if field == "accuracy" else ("score_hist", "score")
+    query = f"SELECT {column}, SUM(count) FROM {table}"
+    params = ()
+    if player is not None:
+        query += " WHERE player = ?"
+        params = (player,)
+    query += f" GROUP BY {column}"
+    histogram = {}
+    for value, count in store.conn.execute(query, params):
+        if field == "accuracy":
+            value = value / ACCURACY_BUCKETS_PER_PERCENT
+        histogram[value] = count
+    return histogram
+
+
+def percentiles(store: StatsStore, field: str = "accuracy", qs: Sequence[float] = (50, 90, 99),
+                player: Optional[str] = None, date_from: Optional[str] = None,
+                date_to: Optional[str] = None) -> Dict[float, float]:
+    """Процентили точности (с шагом 0.1%) или очков за партию.
+
+    Память ограничена числом корзин гистограммы, а не числом партий.
+    """
+    if field not in ("accuracy", "score"):
+        raise ValueError("Процентили считаются только по accuracy или score")
+    if date_from is None and date_to is None:
+        return histogram_percentiles(_stored_histogram(store, field, player), qs)
+
+    histogram = Counter()
+    for record in store.iter_records(player=player, date_from=date_from, date_to=date_to):
+        if field == "accuracy":
+            histogram[StatsStore.accuracy_bucket(record["accuracy"]) / ACCURACY_BUCKETS_PER_PERCENT] += 1
+        else:
+            histogram[record["score"]] += 1
+    return histogram_percentiles(histogram, qs)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+    import json
+
+    from stats_store import DEFAULT_DB
+
+    parser = argparse.ArgumentParser(description="Рейтинги и процентили по истории игр")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--by", default="score", choices=list(LEADERBOARD_KEYS))
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--min-games", type=int, default=1)
+    parser.add_argument("--from", dest="date_from", default=None, help="ГГГГ-ММ-ДД [ЧЧ:ММ:СС]")
+    parser.add_argument("--to", dest="date_to", default=None, help="ГГГГ-ММ-ДД [ЧЧ:ММ:СС]")
+    parser.add_argument("--player", default=None)
+    args = parser.parse_args(argv)
+
+    with StatsStore(args.db) as stats:
+        report = {
+            "leaderboard": [summary.to_dict() for summary in leaderboard(
+                stats, args.by, args.limit, args.min_games, args.date_from, args.date_to, args.player)],
+            "accuracy_percentiles": percentiles(
+                stats, "accuracy", player=args.player, date_from=args.date_from, date_to=args.date_to),
+            "score_percentiles": percentiles(
+                stats, "score", player=args.player, date_from=args.date_from, date_to=args.date_to),
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
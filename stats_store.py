@@ -0,0 +1,229 @@
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_DB = "battleship_stats.db"
+LEGACY_JSON = "battleship_stats.json"
+
+FIELDS = ("player", "date", "shots", "hits", "misses", "accuracy", "ships_sunk", "score")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    date TEXT NOT NULL,
+    shots INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL,
+    accuracy REAL NOT NULL,
+    ships_sunk INTEGER NOT NULL,
+    score INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_games_date ON games (date);
+CREATE INDEX IF NOT EXISTS idx_games_player_date ON games (player, date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS player_summary (
+    player TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    shots INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL,
+    ships_sunk INTEGER NOT NULL,
+    score_total INTEGER NOT NULL,
+    best_score INTEGER NOT NULL,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accuracy_hist (
+    player TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (player, bucket)
+);
+CREATE TABLE IF NOT EXISTS score_hist (
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (player, score)
+);
+"""
+
+# Точность хранится в гистограмме с шагом 0.1%
+ACCURACY_BUCKETS_PER_PERCENT = 10
+
+_UPSERT_SUMMARY = """
+INSERT INTO player_summary
+    (player, games, shots, hits, misses, ships_sunk, score_total, best_score, first_date, last_date)
+VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (player) DO UPDATE SET
+    games = games + 1,
+    shots = shots + excluded.shots,
+    hits = hits + excluded.hits,
+    misses = misses + excluded.misses,
+    ships_sunk = ships_sunk + excluded.ships_sunk,
+    score_total = score_total + excluded.score_total,
+    best_score = MAX(best_score, excluded.best_score),
+    first_date = MIN(first_date, excluded.first_date),
+    last_date = MAX(last_date, excluded.last_date)
+"""
+
+_UPSERT_ACCURACY = """
+INSERT INTO accuracy_hist (player, bucket, count) VALUES (?, ?, 1)
+ON CONFLICT (player, bucket) DO UPDATE SET count = count + 1
+"""
+
+_UPSERT_SCORE = """
+INSERT INTO score_hist (player, score, count) VALUES (?, ?, 1)
+ON CONFLICT (player, score) DO UPDATE SET count = count + 1
+"""
+
+_INSERT = f"INSERT INTO games ({', '.join(FIELDS)}) VALUES ({', '.join('?' for _ in FIELDS)})"
+
+
+class StatsStore:
+    """Журнал сыгранных партий в SQLite: записи только добавляются.
+
+    Каждая запись - отдельная короткая транзакция в режиме WAL, поэтому
+    несколько процессов симулятора могут писать одновременно, а чтение
+    последних партий идёт по индексу по дате без загрузки всей истории.
+    В той же транзакции обновляются сводки по игрокам и гистограммы точности
+    и очков, из которых stats_query отвечает без просмотра истории.
+    При первом открытии в базу один раз переносится старый JSON-файл.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB, legacy_json: Optional[str] = LEGACY_JSON):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._ensure_summaries()
+        if legacy_json and os.path.exists(legacy_json):
+            self.migrate_json(legacy_json)
+
+    def __enter__(self) -> 'StatsStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @staticmethod
+    def _row(record: Dict) -> tuple:
+        return tuple(record[field] for field in FIELDS)
+
+    def append(self, record: Dict) -> None:
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict]) -> None:
+        with self._transaction():
+            self._insert_rows([self._row(record) for record in records])
+
+    @staticmethod
+    def accuracy_bucket(accuracy: float) -> int:
+        return int(round(accuracy * ACCURACY_BUCKETS_PER_PERCENT))
+
+    def _insert_rows(self, rows: List[tuple]) -> None:
+        self.conn.executemany(_INSERT, rows)
+        self._update_summaries(rows)
+
+    def _update_summaries(self, rows: List[tuple]) -> None:
+        # Порядок полей в строке совпадает с FIELDS
+        self.conn.executemany(_UPSERT_SUMMARY, (
+            (player, shots, hits, misses, ships_sunk, score, score, date, date)
+            for player, date, shots, hits, misses, _, ships_sunk, score in rows))
+        self.conn.executemany(_UPSERT_ACCURACY, (
+            (row[0], self.accuracy_bucket(row[5])) for row in rows))
+        self.conn.executemany(_UPSERT_SCORE, ((row[0], row[7]) for row in rows))
+
+    def _ensure_summaries(self) -> None:
+        # Базы, созданные до появления сводок, пересчитываются один раз
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'summaries'").fetchone():
+            return
+        with self._transaction():
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'summaries'").fetchone():
+                return
+            self.conn.execute("DELETE FROM player_summary")
+            self.conn.execute("DELETE FROM accuracy_hist")
+            self.conn.execute("DELETE FROM score_hist")
+            cursor = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM games ORDER BY id")
+            while True:
+                rows = [tuple(row) for row in cursor.fetchmany(10000)]
+                if not rows:
+                    break
+                self._update_summaries(rows)
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('summaries', '1')")
+
+    def migrate_json(self, path: str) -> int:
+        """Переносит историю из старого battleship_stats.json. Повторный вызов ничего не делает"""
+        key = f"migrated:{os.path.abspath(path)}"
+        # Уже перенесённый файл проверяется без блокировки на запись: иначе каждое
+        # открытие базы ждало бы пишущие процессы симулятора
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        with self._transaction():
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+            try:
+                with open(path, "r") as f:
+                    records = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                records = []
+            rows = [self._row(record) for record in records
+                    if isinstance(record, dict) and all(field in record for field in FIELDS)]
+            self._insert_rows(rows)
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(len(rows))))
+        return len(rows)
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM games ORDER BY date DESC, id DESC LIMIT ?", (limit,))
+        return [dict(row) for row in cursor]
+
+    def iter_records(self, player: Optional[str] = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None) -> Iterator[Dict]:
+        """Потоковое чтение записей в порядке даты с необязательными фильтрами"""
+        conditions, params = [], []
+        if player is not None:
+            conditions.append("player = ?")
+            params.append(player)
+        if date_from is not None:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            if len(date_to) == len("ГГГГ-ММ-ДД"):
+                # Дата без времени включает весь день
+                date_to += " 23:59:59"
+            conditions.append("date <= ?")
+            params.append(date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM games {where} ORDER BY date, id", params)
+        for row in cursor:
+            yield dict(row)
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def _transaction(self) -> '_Transaction':
+        return _Transaction(self.conn)
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE сразу берёт блокировку на запись, чтобы параллельные
+    # процессы не упирались в ошибку обновления блокировки посреди транзакции
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
@@ -0,0 +1,195 @@
+import random
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+
+@lru_cache(maxsize=None)
+def ship_placements(board_size: int, ship_size: int) -> Tuple[Tuple[int, ...], ...]:
+    """Все положения корабля на пустом поле в виде кортежей индексов клеток x * size + y"""
+    placements = []
+    for x in range(board_size):
+        for y in range(board_size - ship_size + 1):
+            placements.append(tuple(x * board_size + y + i for i in range(ship_size)))
+    if ship_size > 1:
+        for x in range(board_size - ship_size + 1):
+            for y in range(board_size):
+                placements.append(tuple((x + i) * board_size + y for i in range(ship_size)))
+    return tuple(placements)
+
+
+@lru_cache(maxsize=None)
+def cell_placements(board_size: int, ship_size: int) -> Tuple[Tuple[int, ...], ...]:
+    """Для каждой клетки номера положений корабля, которые её накрывают"""
+    by_cell = [[] for _ in range(board_size * board_size)]
+    for index, cells in enumerate(ship_placements(board_size, ship_size)):
+        for cell in cells:
+            by_cell[cell].append(index)
+    return tuple(tuple(indices) for indices in by_cell)
+
+
+class DensityMap:
+    """Карта плотности вероятностей для уровня "expert".
+
+    heat[c] - число допустимых положений оставшихся кораблей, накрывающих клетку c.
+    Карта не пересчитывается целиком: промах вычёркивает только положения через
+    эту клетку, потопление - положения через корабль и его окрестность.
+    """
+
+    # Таблицы положений занимают O(площадь * число типов кораблей)
+    MAX_BOARD_SIZE = 100
+
+    def __init__(self, board_size: int, ship_sizes: Iterable[int]):
+        self.size = board_size
+        area = board_size * board_size
+        self.remaining = Counter(ship_sizes)
+        self.alive = {}
+        self.cover = {}
+        self.heat = [0] * area
+        self.shot = bytearray(area)
+        self.blocked = bytearray(area)
+        self.open_hits = set()
+
+        for ship_size, count in self.remaining.items():
+            placements = ship_placements(board_size, ship_size)
+            self.alive[ship_size] = bytearray(b'\x01') * len(placements)
+            cover = [0] * area
+            for cells in placements:
+                for cell in cells:
+                    cover[cell] += 1
+            self.cover[ship_size] = cover
+            for cell in range(area):
+                self.heat[cell] += count * cover[cell]
+        # Начальное состояние для reset(): копируется в те же списки, а не считается заново
+        self._initial = (Counter(self.remaining), list(self.heat),
+                         {ship_size: list(cover) for ship_size, cover in self.cover.items()})
+
+    def reset(self) -> None:
+        remaining, heat, cover = self._initial
+        self.remaining = Counter(remaining)
+        self.heat[:] = heat
+        for ship_size, counts in cover.items():
+            self.cover[ship_size][:] = counts
+            alive = self.alive[ship_size]
+            alive[:] = b'\x01' * len(alive)
+        self.shot[:] = bytes(len(self.shot))
+        self.blocked[:] = bytes(len(self.blocked))
+        self.open_hits.clear()
+
+    def _block(self, cell: int) -> None:
+        if self.blocked[cell]:
+            return
+        self.blocked[cell] = 1
+        for ship_size, alive in self.alive.items():
+            weight = self.remaining[ship_size]
+            cover = self.cover[ship_size]
+            placements = ship_placements(self.size, ship_size)
+            for index in cell_placements(self.size, ship_size)[cell]:
+                if alive[index]:
+                    alive[index] = 0
+                    for covered in placements[index]:
+                        cover[covered] -= 1
+                        self.heat[covered] -= weight
+
+    def record_miss(self, x: int, y: int) -> None:
+        cell = x * self.size + y
+        self.shot[cell] = 1
+        self._block(cell)
+
+    def record_hit(self, x: int, y: int) -> None:
+        cell = x * self.size + y
+        self.shot[cell] = 1
+        self.open_hits.add(cell)
+
+    def record_sunk(self, positions: List[Tuple[int, int]]) -> None:
+        ship_size = len(positions)
+        if self.remaining[ship_size] > 0:
+            self.remaining[ship_size] -= 1
+            cover = self.cover[ship_size]
+            for cell in range(len(self.heat)):
+                self.heat[cell] -= cover[cell]
+
+        # Клетки корабля и соседние с ним заведомо не содержат других кораблей
+        for x, y in positions:
+            self.open_hits.discard(x * self.size + y)
+            for nx in range(max(0, x - 1), min(self.size, x + 2)):
+                for ny in range(max(0, y - 1), min(self.size, y + 2)):
+                    self._block(nx * self.size + ny)
+
+    def snapshot(self) -> tuple:
+        """Копия исходных данных карты; cover и heat из них пересчитывает restore()"""
+        alive = {ship_size: bytes(flags) for ship_size, flags in self.alive.items()}
+        return (dict(self.remaining), alive, bytes(self.shot), bytes(self.blocked),
+                sorted(self.open_hits))
+
+    def restore(self, state: tuple) -> None:
+        remaining, alive, shot, blocked, open_hits = state
+        self.remaining = Counter(remaining)
+        self.alive = {ship_size: bytearray(flags) for ship_size, flags in alive.items()}
+        self.shot = bytearray(shot)
+        self.blocked = bytearray(blocked)
+        self.open_hits = set(open_hits)
+
+        area = len(self.shot)
+        self.heat = heat = [0] * area
+        for ship_size, flags in self.alive.items():
+            cover = [0] * area
+            for index, cells in enumerate(ship_placements(self.size, ship_size)):
+                if flags[index]:
+                    for cell in cells:
+                        cover[cell] += 1
+            self.cover[ship_size] = cover
+            weight = self.remaining[ship_size]
+            if weight:
+                for cell in range(area):
+                    heat[cell] += weight * cover[cell]
+
+    def _target_scores(self) -> dict:
+        # Добивание: учитываем только положения через уже раненые клетки,
+        # каждое раненое попадание в положении увеличивает его вес
+        scores = {}
+        for ship_size, alive in self.alive.items():
+            weight = self.remaining[ship_size]
+            if not weight:
+                continue
+            placements = ship_placements(self.size, ship_size)
+            by_cell = cell_placements(self.size, ship_size)
+            for hit in self.open_hits:
+                for index in by_cell[hit]:
+                    if not alive[index]:
+                        continue
+                    cells = placements[index]
+                    if all(cell in self.open_hits for cell in cells):
+                        # Такой корабль уже был бы потоплен
+                        continue
+                    bonus = weight * sum(1 for cell in cells if cell in self.open_hits)
+                    for cell in cells:
+                        if not self.shot[cell]:
+                            scores[cell] = scores.get(cell, 0) + bonus
+        return scores
+
+    def best_cell(self, rng: Optional[random.Random] = None) -> Optional[Tuple[int, int]]:
+        rng = rng or random
+        best = []
+        best_score = -1
+        if self.open_hits:
+            for cell, score in self._target_scores().items():
+                if score > best_score:
+                    best, best_score = [cell], score
+                elif score == best_score:
+                    best.append(cell)
+
+        if not best:
+            shot, blocked, heat = self.shot, self.blocked, self.heat
+            for cell in range(len(heat)):
+                if shot[cell] or blocked[cell]:
+                    continue
+                score = heat[cell]
+                if score > best_score:
+                    best, best_score = [cell], score
+                elif score == best_score:
+                    best.append(cell)
+
+        if not best:
+            return None
+        return divmod(rng.choice(best), self.size)
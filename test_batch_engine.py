@@ -0,0 +1,73 @@
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import benchmarks
+import simulation
+from batch_engine import BatchBoards
+from gameseabattle import AIPlayer, GameConfig
+from placement import make_fleet_sampler
+from simulation import SimulationResult, random_baseline
+
+
+def test_fire_matches_board_receive_attack():
+    rng = random.Random(0)
+    boards = []
+    for seed in range(300):
+        player = AIPlayer("easy", random.Random(seed), verbose=False)
+        player.place_ships()
+        boards.append(player.board)
+    batch = BatchBoards.from_boards(boards)
+    ship_index = [{id(ship): i for i, ship in enumerate(board.ships)} for board in boards]
+
+    for _ in range(150):
+        # Среди выстрелов есть выходящие за поле и повторные
+        xs = np.array([rng.randint(-1, 10) for _ in boards])
+        ys = np.array([rng.randint(-1, 10) for _ in boards])
+        hit, ship_id, sunk, won = batch.fire(xs, ys)
+        for index, board in enumerate(boards):
+            was_hit, ship = board.receive_attack(int(xs[index]), int(ys[index]))
+            assert bool(hit[index]) == was_hit
+            expected_id = ship_index[index][id(ship)] if ship is not None else -1
+            assert int(ship_id[index]) == expected_id
+            assert bool(sunk[index]) == (ship is not None and ship.is_sunk())
+            assert bool(won[index]) == board.all_ships_sunk()
+
+
+def test_from_fleets_matches_add_ship():
+    sampler = make_fleet_sampler(12, [5, 4, 3, 3, 2, 1], random.Random(1))
+    fleets = [sampler.sample() for _ in range(50)] + [[]]
+    batch = BatchBoards.from_fleets(fleets, 12)
+    expected = BatchBoards(len(fleets), 12, 6)
+    for index, fleet in enumerate(fleets):
+        for positions in fleet:
+            expected.add_ship(index, positions)
+    for name in ("cells", "ship_ids", "ship_sizes", "ship_left", "cells_left", "ship_counts"):
+        assert np.array_equal(getattr(batch, name), getattr(expected, name)), name
+
+
+def test_random_baseline_is_reproducible_and_unbiased():
+    shots = random_baseline(4000, seed=3, batch_size=1500)
+    assert shots == random_baseline(4000, seed=3, batch_size=1500)
+    assert sum(shots.values()) == 4000
+    assert min(shots) >= sum(GameConfig().ship_sizes) and max(shots) <= 100
+    # Последняя из 20 клеток флота в случайной перестановке 100 клеток: 20 * 101 / 21
+    assert abs(SimulationResult.mean_shots(shots) - 20 * 101 / 21) < 0.5
+
+
+def test_simulate_batch_cli(capsys):
+    simulation.main(["300", "--batch", "--seed", "1", "--board-size", "8", "--fleet", "3 2 2 1"])
+    report = json.loads(capsys.readouterr().out)
+    assert report["games"] == sum(report["shots_to_win"].values()) == 300
+    assert 8 <= report["mean_shots_to_win"] <= 64
+
+
+def test_batch_benchmark_cases_run():
+    cases = list(benchmarks.batch_cases(10, random.Random(0), 1))
+    assert [name for name, *_ in cases] == ["batch/10/numpy_random_games_x1000",
+                                            "batch/10/python_random_games_x1000"]
+    for _, setup, fn, _ in cases:
+        fn(setup())
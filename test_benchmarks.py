@@ -0,0 +1,31 @@
+import json
+
+import benchmarks
+
+
+def test_compare_flags_only_drops_beyond_tolerance():
+    baseline = {"fast": {"ops_per_sec": 100.0}, "slow": {"ops_per_sec": 100.0},
+                "gone": {"ops_per_sec": 1.0}}
+    results = {"fast": {"ops_per_sec": 90.0}, "slow": {"ops_per_sec": 80.0}, "new": {"ops_per_sec": 5.0}}
+    assert benchmarks.compare(results, baseline, 0.15) == ["slow"]
+    assert results["slow"]["baseline_ratio"] == 0.8
+    assert "baseline_ratio" not in results["new"]
+
+
+def test_main_writes_report_and_fails_on_regression(tmp_path):
+    output, baseline = tmp_path / "bench.json", tmp_path / "baseline.json"
+    args = ["--sizes", "10", "--difficulties", "easy", "--engines", "board", "bitboard",
+            "--output", str(output)]
+    assert benchmarks.main(args) == 0
+    report = json.loads(output.read_text())
+    assert report["regressions"] == []
+    names = set(report["results"])
+    assert {"board/10/place_ship_fleet", "bitboard/10/receive_attack_x100", "ai/10/easy/headless_game"} <= names
+    for row in report["results"].values():
+        assert row["p50_us"] <= row["p99_us"]
+
+    # Базовая линия в сто раз быстрее: каждый замер - регрессия
+    for row in report["results"].values():
+        row["ops_per_sec"] *= 100
+    baseline.write_text(json.dumps(report))
+    assert benchmarks.main(args + ["--baseline", str(baseline)]) == 1
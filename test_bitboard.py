@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from bitboard import BitBoard
+from gameseabattle import Board, Ship
+
+
+def random_ship(rng, size):
+    # Часть кораблей выходит за поле, пересекается или соприкасается с другими
+    length = rng.randint(1, 5)
+    x, y = rng.randint(-1, size - 1), rng.randint(-1, size - 1)
+    if rng.random() < 0.5:
+        return length, [(x + i, y) for i in range(length)]
+    return length, [(x, y + i) for i in range(length)]
+
+
+def assert_same(board, bitboard):
+    size = board.size
+    assert [[bitboard.cell(x, y) for y in range(size)] for x in range(size)] == \
+        [[board.cell(x, y) for y in range(size)] for x in range(size)]
+    for x in range(size):
+        assert bitboard.row_marks(x) == board.row_marks(x)
+        assert bitboard.render_row(x, True) == board.render_row(x, True)
+        assert bitboard.render_row(x, False) == board.render_row(x, False)
+    assert bitboard.hit_cells == board.hit_cells
+    assert bitboard.miss_cells == board.miss_cells
+    assert bitboard.all_ships_sunk() == board.all_ships_sunk()
+    assert bitboard.snapshot()[1:] == board.snapshot()[1:]
+
+
+@pytest.mark.parametrize("size", [3, 7, 10, 16])
+def test_bitboard_matches_board_on_random_play(size):
+    rng = random.Random(size)
+    board, bitboard = Board(size), BitBoard(size)
+    for round_ in range(3):
+        if round_:
+            board.reset()
+            bitboard.reset()
+        for _ in range(3 * size):
+            length, positions = random_ship(rng, size)
+            assert bitboard.place_ship(Ship(length, list(positions))) == \
+                board.place_ship(Ship(length, list(positions)))
+        assert board.ships
+        assert_same(board, bitboard)
+
+        index = {id(ship): i for i, ship in enumerate(board.ships)}
+        bit_index = {id(ship): i for i, ship in enumerate(bitboard.ships)}
+        for _ in range(2 * size * size):
+            x, y = rng.randint(-1, size), rng.randint(-1, size)
+            hit, ship = board.receive_attack(x, y)
+            bit_hit, bit_ship = bitboard.receive_attack(x, y)
+            assert bit_hit == hit
+            assert (bit_ship is None) == (ship is None)
+            if ship is not None:
+                assert bit_index[id(bit_ship)] == index[id(ship)]
+                assert bit_ship.is_sunk() == ship.is_sunk()
+            if 0 <= x < size and 0 <= y < size:
+                found = board.get_ship_at_position(x, y)
+                bit_found = bitboard.get_ship_at_position(x, y)
+                assert (bit_found is None) == (found is None)
+        assert_same(board, bitboard)
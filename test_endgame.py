@@ -0,0 +1,48 @@
+import random
+
+from endgame import EndgameSolver
+from gameseabattle import AIPlayer
+
+
+def play(attacker, defender, on_move=None):
+    while not defender.board.all_ships_sunk():
+        if on_move is not None:
+            on_move()
+        attacker.make_move(defender)
+
+
+def pair(seed):
+    attacker = AIPlayer("hard", random.Random(seed), verbose=False)
+    defender = AIPlayer("medium", random.Random(seed + 1), verbose=False)
+    attacker.place_ships()
+    defender.place_ships()
+    return attacker, defender
+
+
+def test_endgame_shot_does_not_depend_on_table_contents():
+    warm = EndgameSolver(10)
+    for seed in range(0, 10, 2):
+        attacker, defender = pair(seed)
+        attacker.endgame = warm
+        play(attacker, defender)
+    assert warm.table
+
+    compared = 0
+    for seed in range(100, 110, 2):
+        attacker, defender = pair(seed)
+
+        def compare():
+            nonlocal compared
+            attacker.endgame = EndgameSolver(10)
+            cold = attacker.endgame_shot(defender)
+            attacker.endgame = warm
+            assert attacker.endgame_shot(defender) == cold
+            compared += cold is not None
+
+        play(attacker, defender, compare)
+    assert compared >= 10, compared
+
+
+def test_endgame_can_be_switched_off():
+    assert AIPlayer("hard", verbose=False).endgame is not None
+    assert AIPlayer("hard", verbose=False, endgame=False).endgame is None
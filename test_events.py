@@ -0,0 +1,47 @@
+import io
+import json
+import random
+
+from events import BufferedSink, ConsoleRenderer, MultiSink
+from gameseabattle import AIPlayer
+from simulation import play_headless_game
+
+
+def play(events, seed=0):
+    rng = random.Random(seed)
+    players = [AIPlayer(level, rng, verbose=False, events=events) for level in ("medium", "hard")]
+    # Оба компьютера по умолчанию зовутся одинаково, а события различают игроков по имени
+    players[0].name, players[1].name = "A", "B"
+    winner, _ = play_headless_game(*players, events=events)
+    return players, winner
+
+
+def test_buffered_sink_records_every_shot(capsys):
+    stream = io.StringIO()
+    sink = BufferedSink(stream, batch_size=7)
+    players, winner = play(sink)
+    assert capsys.readouterr().out == ""
+
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert sink.events == []
+    assert events[0] == {"event": "game_start", "data": [players[0].name, players[1].name]}
+    assert events[-1]["event"] == "game_over"
+    for player in players:
+        mine = [event for event in events if event["data"][0] == player.name]
+        kinds = [event["event"] for event in mine]
+        assert kinds.count("shot") == player.shots == kinds.count("hit") + kinds.count("miss")
+        assert kinds.count("hit") == player.hits
+        assert kinds.count("sunk") == player.ships_sunk
+    loser = players[1] if winner == "a" else players[0]
+    assert sum(1 for event in events if event["event"] == "sunk" and event["data"][0] != loser.name) == \
+        len(loser.board.ships)
+
+
+def test_multi_sink_feeds_every_sink_the_same_events():
+    first, second = BufferedSink(), BufferedSink()
+    out = io.StringIO()
+    play(MultiSink(first, ConsoleRenderer(out), second), seed=3)
+    assert first.events == second.events and first.events
+    text = out.getvalue()
+    assert text.count("Компьютер стреляет в") == sum(1 for kind, _ in first.events if kind == "shot")
+    assert "Поздравляем" in text
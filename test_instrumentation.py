@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+import instrumentation
+from gameseabattle import AIPlayer
+
+
+@pytest.fixture
+def metrics():
+    instrumentation.install()
+    instrumentation.METRICS.reset()
+    yield instrumentation.METRICS
+    instrumentation.uninstall()
+
+
+def test_shots_per_turn_adds_up_across_reused_players(metrics):
+    rng = random.Random(3)
+    attacker = AIPlayer("hard", rng, verbose=False)
+    defender = AIPlayer("medium", rng, verbose=False)
+    total = 0
+    for game in range(4):
+        if game:
+            attacker.reset()
+            defender.reset()
+        attacker.place_ships()
+        defender.place_ships()
+        # Последняя партия бросается посреди серии попаданий
+        limit = 30 if game == 3 else None
+        while not defender.board.all_ships_sunk():
+            if limit is not None and attacker.shots >= limit and attacker.last_hits:
+                break
+            attacker.make_move(defender)
+        total += attacker.shots
+        histogram = metrics.values["ai.shots_per_turn"]
+        if game < 3:
+            assert sum(shots * turns for shots, turns in histogram.items()) == total
+    attacker.reset()
+    histogram = metrics.values["ai.shots_per_turn"]
+    assert sum(shots * turns for shots, turns in histogram.items()) == total
@@ -0,0 +1,86 @@
+import pytest
+
+import opening_book
+from gameseabattle import SHIP_SIZES, AIPlayer, GameConfig
+from opening_book import BookBuilder, BookError, OpeningBook, book_key
+from replay import ReplayFile
+from simulation import play_headless_game, simulate
+
+SMALL_FLEET = [3, 2, 2, 1]
+
+
+@pytest.fixture(scope="module")
+def replays(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("book") / "games.sbr")
+    simulate(30, "hard", "medium", seed=1, workers=1, replays=path)
+    simulate(20, "easy", "hard", seed=2, workers=1, config=GameConfig(8, SMALL_FLEET), replays=path)
+    return path
+
+
+def build(replays, path, max_fleets=opening_book.MAX_FLEETS):
+    builder = BookBuilder(max_fleets, seed=0)
+    with ReplayFile(replays) as games:
+        for replay in games:
+            builder.add_replay(replay)
+    builder.write(path)
+    return builder
+
+
+def test_build_and_load_round_trip(replays, tmp_path):
+    path = str(tmp_path / "book.sbb")
+    builder = build(replays, path)
+    book = OpeningBook(path)
+    assert sorted(book.keys()) == sorted([book_key(10, SHIP_SIZES), book_key(8, SMALL_FLEET)])
+    for (board_size, ship_sizes), stats in builder.stats.items():
+        entry = book.entry(board_size, reversed(ship_sizes))
+        assert entry.games == stats.games == (30 if board_size == 10 else 20)
+        assert sorted(entry.order) == list(range(board_size * board_size))
+        assert list(entry.order) == BookBuilder.opening_order(stats)
+        assert list(entry.early) == stats.early
+        # Первая клетка дебюта задевает больше всего расстановок
+        assert stats.occupancy[entry.order[0]] == max(stats.occupancy)
+    assert book.entry(10, [4, 4]) is None
+
+
+def test_fleet_sample_is_bounded(replays, tmp_path):
+    builder = build(replays, str(tmp_path / "book.sbb"), max_fleets=7)
+    stats = builder.stats[book_key(10, SHIP_SIZES)]
+    assert stats.seen_fleets == 60 and len(stats.fleets) == 7
+
+
+def test_cli_build_and_show(replays, tmp_path, capsys):
+    path = str(tmp_path / "book.sbb")
+    opening_book.main(["build", replays, "--output", path])
+    assert "конфигураций: 2" in capsys.readouterr().out
+    opening_book.main(["show", "--book", path, "--board-size", "8", "--fleet", "3 2 2 1",
+                       "--shots", "5"])
+    out = capsys.readouterr().out
+    assert "Партий в книге: 20" in out and len(out.split("Дебют:")[1].split()) == 5
+
+
+def test_damaged_book_is_rejected(replays, tmp_path):
+    path = tmp_path / "book.sbb"
+    build(replays, str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(BookError):
+        OpeningBook(str(path))
+    path.write_bytes(b"SBRP\x01")
+    with pytest.raises(BookError):
+        OpeningBook(str(path))
+
+
+def test_hard_player_opens_with_the_book(replays, tmp_path):
+    path = str(tmp_path / "book.sbb")
+    build(replays, path)
+    book = OpeningBook(path)
+    order = book.entry(10, SHIP_SIZES).order
+    hunter = AIPlayer("hard", verbose=False, book=book, randomness=0.0)
+    target = AIPlayer("easy", verbose=False)
+    target.place_ships()
+    hunter.make_move(target)
+    assert divmod(order[0], 10) in target.board.hit_cells | target.board.miss_cells
+    hunter.reset()
+    target.reset()
+    play_headless_game(hunter, target)
+    assert target.board.all_ships_sunk() or hunter.board.all_ships_sunk()
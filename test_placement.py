@@ -0,0 +1,72 @@
+import random
+import time
+
+import pytest
+
+from placement import FleetSampler, PlacementError, SparseFleetSampler, find_fleet
+
+STANDARD = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]
+
+
+def assert_legal(board_size, ship_sizes, fleet):
+    assert [len(positions) for positions in fleet] == list(ship_sizes)
+    owner = {}
+    for index, positions in enumerate(fleet):
+        xs, ys = zip(*positions)
+        assert len(set(xs)) == 1 or len(set(ys)) == 1
+        for x, y in positions:
+            assert 0 <= x < board_size and 0 <= y < board_size
+            owner[(x, y)] = index
+    for (x, y), index in owner.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                assert owner.get((x + dx, y + dy), index) == index
+
+
+@pytest.mark.parametrize("board_size, ship_sizes", [
+    (10, [1] * 26),
+    (10, [3] * 13),
+    (8, [1] * 17),
+    # Проходит грубые оценки, невозможность доказывает перебор
+    (7, [4] * 6),
+])
+def test_impossible_fleet_raises_quickly(board_size, ship_sizes):
+    started = time.perf_counter()
+    with pytest.raises(PlacementError):
+        FleetSampler(board_size, ship_sizes, random.Random(0)).sample()
+    with pytest.raises(PlacementError):
+        find_fleet(board_size, ship_sizes)
+    assert time.perf_counter() - started < 5
+
+
+@pytest.mark.parametrize("ship_sizes", [[1] * 25, STANDARD + [1] * 10, STANDARD + [1] * 12, [2] * 20])
+def test_tight_fleet_is_always_placed(ship_sizes):
+    for seed in range(20):
+        fleet = FleetSampler(10, ship_sizes, random.Random(seed)).sample()
+        assert_legal(10, ship_sizes, fleet)
+
+
+def test_sparse_sampler_falls_back_to_rows():
+    ship_sizes = [1] * 35 * 35
+    fleet = SparseFleetSampler(70, ship_sizes, random.Random(0)).sample()
+    assert_legal(70, ship_sizes, fleet)
+
+
+def test_game_config_rejects_overfull_fleet_quickly():
+    from gameseabattle import GameConfig
+
+    started = time.perf_counter()
+    with pytest.raises(ValueError, match="не помещается"):
+        GameConfig.parse("10", " ".join(["3"] * 13))
+    assert time.perf_counter() - started < 5
+
+
+@pytest.mark.parametrize("board_size, ship_sizes", [
+    (10, [1] * 25),
+    (10, STANDARD + [1] * 10),
+    (200, STANDARD * 300),
+])
+def test_game_config_accepts_tight_fleets(board_size, ship_sizes):
+    from gameseabattle import GameConfig
+
+    assert GameConfig(board_size, ship_sizes).ship_sizes == ship_sizes
@@ -0,0 +1,35 @@
+import io
+import os
+import random
+import shutil
+
+import pytest
+
+from gameseabattle import AIPlayer, GameConfig
+from rendering import DiffConsoleRenderer
+
+
+@pytest.mark.parametrize("board_size", [10, 200])
+def test_frames_taller_than_terminal_are_diffed(monkeypatch, board_size):
+    monkeypatch.setattr(shutil, "get_terminal_size", lambda *args: os.terminal_size((80, 24)))
+    config = GameConfig(board_size, [4, 3, 2, 1])
+    first = AIPlayer("easy", random.Random(1), verbose=False, config=config)
+    second = AIPlayer("easy", random.Random(2), verbose=False, config=config)
+    first.place_ships()
+    second.place_ships()
+    out = io.StringIO()
+    renderer = DiffConsoleRenderer(out, ansi=True)
+
+    renderer.player_turn(first, second)
+    assert out.getvalue().startswith("\x1b[2J")
+    assert len(renderer.screen) < 24
+    assert all(len(line) <= 80 for line in renderer.screen)
+
+    first.make_move(second)
+    out.seek(0)
+    out.truncate()
+    renderer.player_turn(first, second)
+    frame = out.getvalue()
+    assert "\x1b[2J" not in frame
+    # Переписаны только строка выстрела, окно вокруг неё и статистика, а не весь кадр
+    assert frame.count("\x1b[") < len(renderer.screen)
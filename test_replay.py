@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from gameseabattle import AIPlayer, GameConfig
+from replay import SNAPSHOT_EVERY, ReplayError, ReplayFile, ReplayRecorder, read_varint, write_varint
+from simulation import play_headless_game, simulate
+
+
+def record_games(path, n_games, seed):
+    rng = random.Random(seed)
+    recorder = ReplayRecorder(path)
+    played = []
+    for index in range(n_games):
+        a = AIPlayer("medium", rng, verbose=False, events=recorder)
+        b = AIPlayer("hard", rng, verbose=False, events=recorder)
+        a.name, b.name = "A", "Б"
+        winner, _ = play_headless_game(a, b, a_starts=index % 2 == 0, events=recorder)
+        first, second = (a, b) if index % 2 == 0 else (b, a)
+        played.append((first, second, 0 if (winner == "a") == (first is a) else 1))
+    return played
+
+
+def test_varint_round_trip():
+    out = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 32, 2 ** 63 + 5]
+    for value in values:
+        write_varint(out, value)
+    pos, decoded = 0, []
+    while pos < len(out):
+        value, pos = read_varint(out, pos)
+        decoded.append(value)
+    assert decoded == values
+
+
+def test_recorded_games_decode_to_the_played_boards(tmp_path):
+    path = str(tmp_path / "games.sbr")
+    played = record_games(path, 6, seed=1)
+    with ReplayFile(path) as replays:
+        assert len(replays) == len(played)
+        assert replays[-1].names == replays[len(played) - 1].names
+        for replay, (first, second, winner) in zip(replays, played):
+            assert replay.names == (first.name, second.name)
+            assert replay.winner == winner
+            for seat, player in enumerate((first, second)):
+                assert replay.fleets[seat] == [(ship.size, ship.positions) for ship in player.board.ships]
+                final = replay.board_at(len(replay), seat)
+                assert final.hit_cells == player.board.hit_cells
+                assert final.miss_cells == player.board.miss_cells
+
+
+def test_state_at_matches_stepping_through_the_moves(tmp_path):
+    path = str(tmp_path / "games.sbr")
+    record_games(path, 3, seed=2)
+    with ReplayFile(path) as replays:
+        for replay in replays:
+            assert len(replay) > 2 * SNAPSHOT_EVERY
+            size = replay.size
+            boards = [replay.board_at(0, 0), replay.board_at(0, 1)]
+            # Обратный порядок: снимки строятся при первом обращении, а не по ходу партии
+            expected = [replay.state_at(len(replay))]
+            for shot, (seat, cell, hit) in enumerate(replay.moves()):
+                assert replay.shooter(shot) == seat
+                was_hit, _ = boards[1 - seat].receive_attack(*divmod(cell, size))
+                assert was_hit == hit
+                masks = tuple(sum(1 << (x * size + y) for x, y in cells) for board in boards
+                              for cells in (board.hit_cells, board.miss_cells))
+                next_seat = replay.state_at(shot + 1)[4]
+                assert replay.state_at(shot + 1) == masks + (next_seat,)
+                assert next_seat == (seat if hit else 1 - seat)
+            assert expected[0] == replay.state_at(len(replay))
+            with pytest.raises(IndexError):
+                replay.state_at(len(replay) + 1)
+
+
+def test_damaged_files_are_rejected(tmp_path):
+    path = tmp_path / "games.sbr"
+    record_games(str(path), 2, seed=3)
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])
+    with ReplayFile(str(path)) as replays:
+        with pytest.raises(ReplayError):
+            list(replays)
+    path.write_bytes(b"not a replay log")
+    with pytest.raises(ReplayError):
+        ReplayFile(str(path))
+
+
+def test_simulated_replays_do_not_depend_on_worker_count(tmp_path):
+    paths = [str(tmp_path / f"w{workers}.sbr") for workers in (1, 2)]
+    for workers, path in zip((1, 2), paths):
+        simulate(40, "easy", "medium", seed=2, workers=workers, chunk_size=10,
+                 config=GameConfig(8, [3, 2, 2, 1]), replays=path)
+    with open(paths[0], "rb") as single, open(paths[1], "rb") as pooled:
+        assert single.read() == pooled.read()
+    with ReplayFile(paths[0]) as replays:
+        assert len(replays) == 40
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from bitboard import BitBoard
+from events import BufferedSink
+from gameseabattle import AIPlayer, Board, Ship
+from simulation import play_headless_game
+
+
+def play_series(level, board_factory, reuse, n_games=4):
+    rng = random.Random(7)
+    sink = BufferedSink()
+    players = None
+    for game_index in range(n_games):
+        if reuse and players is not None:
+            for player in players:
+                player.reset()
+        else:
+            players = [AIPlayer(level, rng, verbose=False, board_factory=board_factory, events=sink)
+                       for _ in range(2)]
+        play_headless_game(*players, a_starts=game_index % 2 == 0, events=sink)
+    return sink.events, [(player.shots, player.hits, player.misses, player.ships_sunk, player.score)
+                         for player in players]
+
+
+@pytest.mark.parametrize("board_factory", [Board, BitBoard])
+@pytest.mark.parametrize("level", list(AIPlayer.DIFFICULTY_LEVELS))
+def test_reset_players_play_like_fresh_ones(board_factory, level):
+    assert play_series(level, board_factory, reuse=True) == play_series(level, board_factory, reuse=False)
+
+
+@pytest.mark.parametrize("board_factory", [Board, BitBoard])
+def test_reset_board_equals_a_new_one(board_factory):
+    rng = random.Random(1)
+    player = AIPlayer("easy", rng, verbose=False, board_factory=board_factory)
+    player.place_ships()
+    board = player.board
+    for _ in range(60):
+        board.receive_attack(rng.randrange(10), rng.randrange(10))
+    fleet = [(ship.size, list(ship.positions)) for ship in board.ships]
+    generation = board.generation
+    board.reset()
+    fresh = board_factory(10)
+    assert board.generation > generation
+    assert board.snapshot() == fresh.snapshot()
+    assert [board.render_row(x, True) for x in range(10)] == [fresh.render_row(x, True) for x in range(10)]
+    # Клетки бывших кораблей свободны: тот же флот встаёт заново
+    for size, positions in fleet:
+        assert board.place_ship(Ship(size, positions))
+    assert board.get_ship_at_position(*fleet[0][1][0]) is board.ships[0]
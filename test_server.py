@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import loadtest
+from gameseabattle import GameConfig
+from server import MAX_LINE, OUTBOX_SIZE, GameServer, Session
+
+
+async def start(game_server):
+    server = await asyncio.start_server(game_server.handle, "127.0.0.1", 0, limit=MAX_LINE)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    async def send(self, payload):
+        raw = payload if isinstance(payload, bytes) else json.dumps(payload).encode() + b"\n"
+        self.writer.write(raw)
+        await self.writer.drain()
+
+    async def receive(self):
+        return json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+
+    async def ask(self, payload):
+        await self.send(payload)
+        return await self.receive()
+
+
+def test_error_replies():
+    async def scenario():
+        server, port = await start(GameServer(GameConfig(), seed=1))
+        async with server:
+            first, second = await Client.connect(port), await Client.connect(port)
+            assert (await first.ask(b"not json\n"))["message"] == "bad request"
+            assert (await first.ask({"no_op": 1}))["message"] == "bad request"
+            assert (await first.ask({"op": ["join"]}))["message"] == "unknown op ['join']"
+            assert (await first.ask({"op": "fly"}))["message"] == "unknown op 'fly'"
+            assert (await first.ask({"op": "fire", "x": 0, "y": 0}))["message"] == "no active match"
+            assert (await first.ask({"op": "join", "name": "a"}))["event"] == "waiting"
+            assert (await first.ask({"op": "join", "name": "a"}))["message"] == "already joined"
+
+            await second.send({"op": "join", "name": "b"})
+            starts = [await first.receive(), await second.receive()]
+            assert [start["event"] for start in starts] == ["start", "start"]
+            assert [start["you"] for start in starts] == [0, 1]
+            mover, waiter = (first, second) if starts[0]["turn"] == 0 else (second, first)
+            assert (await waiter.ask({"op": "fire", "x": 0, "y": 0}))["message"] == "not your turn"
+            assert (await mover.ask({"op": "fire", "x": "a", "y": 0}))["message"] == \
+                "x and y must be integers"
+            assert (await mover.ask({"op": "fire", "x": 1e400, "y": 0}))["message"] == \
+                "x and y must be integers"
+
+            # Строка длиннее MAX_LINE закрывает подключение, соперник узнаёт об уходе
+            await mover.send(b"x" * (MAX_LINE + 1) + b"\n")
+            assert await asyncio.wait_for(mover.reader.read(), 5) == b""
+            assert (await waiter.receive())["event"] == "opponent_left"
+            for client in (first, second):
+                client.writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_is_dropped_instead_of_buffered():
+    class Writer:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    async def scenario():
+        writer = Writer()
+        session = Session(None, writer)
+        for index in range(OUTBOX_SIZE):
+            session.send({"event": "pong", "n": index})
+        assert not session.closed
+        session.send({"event": "pong"})
+        assert session.closed and writer.closed
+        assert session.outbox.qsize() == OUTBOX_SIZE
+        session.send({"event": "pong"})
+        assert session.outbox.qsize() == OUTBOX_SIZE
+
+    asyncio.run(scenario())
+
+
+def test_load_test_plays_every_match_to_the_end():
+    async def scenario():
+        game_server = GameServer(GameConfig(), seed=2)
+        server, port = await start(game_server)
+        async with server:
+            report = await loadtest.run(20, "127.0.0.1", port, 40, seed=3)
+        return game_server, report
+
+    game_server, report = asyncio.run(scenario())
+    assert report["matches"] == 20
+    assert game_server.stats["matches_started"] == game_server.stats["matches_finished"] == 20
+    assert game_server.active_matches == 0 and game_server.waiting is None
+    assert report["moves"] == game_server.stats["moves"]
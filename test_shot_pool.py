@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from gameseabattle import AIPlayer, ShotPool
+
+
+def assert_matches(pool, expected, size):
+    assert len(pool) == len(expected)
+    cells = list(pool)
+    assert len(cells) == len(set(cells)) and set(cells) == expected
+    for x in range(-1, size + 1):
+        for y in range(-1, size + 1):
+            assert ((x, y) in pool) == ((x, y) in expected)
+
+
+@pytest.mark.parametrize("size", [1, 4, 10])
+def test_pool_matches_a_plain_set(size):
+    rng = random.Random(size)
+    pool = ShotPool(size, random.Random(0))
+    expected = {(x, y) for x in range(size) for y in range(size)}
+    assert_matches(pool, expected, size)
+    saved = None
+    while expected:
+        action = rng.random()
+        if action < 0.4:
+            cell = pool.pop()
+            assert cell in expected
+            expected.remove(cell)
+        elif action < 0.7:
+            cell = rng.choice(sorted(expected))
+            pool.remove(cell)
+            expected.remove(cell)
+            with pytest.raises(ValueError):
+                pool.remove(cell)
+        else:
+            cell = (rng.randint(0, size - 1), rng.randint(0, size - 1))
+            pool.discard(cell)
+            expected.discard(cell)
+        if saved is None and len(expected) <= size * size // 2:
+            saved = pool.snapshot(), set(expected)
+        assert_matches(pool, expected, size)
+    with pytest.raises(IndexError):
+        pool.pop()
+
+    state, cells = saved
+    pool.restore(state)
+    assert_matches(pool, cells, size)
+    pool.reset()
+    assert_matches(pool, {(x, y) for x in range(size) for y in range(size)}, size)
+
+
+def test_ai_pool_holds_exactly_the_unshot_cells():
+    rng = random.Random(4)
+    attacker = AIPlayer("medium", rng, verbose=False)
+    defender = AIPlayer("medium", rng, verbose=False)
+    attacker.place_ships()
+    defender.place_ships()
+    board = defender.board
+    every_cell = {(x, y) for x in range(board.size) for y in range(board.size)}
+    while not board.all_ships_sunk():
+        attacker.make_move(defender)
+        # Клетки вокруг потопленных кораблей пул вычёркивает заранее
+        unshot = every_cell - board.hit_cells - board.miss_cells
+        assert set(attacker.available_shots) <= unshot
+        assert len(set(attacker.available_shots)) == len(attacker.available_shots)
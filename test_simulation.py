@@ -0,0 +1,9 @@
+from simulation import simulate
+
+
+def test_results_do_not_depend_on_worker_count():
+    runs = [simulate(120, "medium", "hard", seed=5, workers=workers, chunk_size=25).to_dict()
+            for workers in (1, 3)]
+    assert runs[0] == runs[1]
+    assert runs[0]["games"] == runs[0]["wins_a"] + runs[0]["wins_b"] == 120
+
@@ -0,0 +1,51 @@
+import random
+
+from gameseabattle import AIPlayer
+
+
+def test_restore_after_play_keeps_pool_consistent():
+    attacker = AIPlayer("medium", random.Random(1), verbose=False)
+    defender = AIPlayer("medium", random.Random(2), verbose=False)
+    attacker.place_ships()
+    defender.place_ships()
+    for _ in range(10):
+        attacker.make_move(defender)
+
+    # Снимок в памяти, затем партия продолжается и меняет пул и last_hits
+    state = attacker.snapshot()
+    shot_before = defender.board.hit_cells | defender.board.miss_cells
+    for _ in range(30):
+        if defender.board.all_ships_sunk():
+            break
+        attacker.make_move(defender)
+
+    attacker.restore(state)
+    cells = list(attacker.available_shots)
+    assert len(cells) == len(set(cells)) == len(attacker.available_shots)
+    assert not shot_before & set(cells)
+    assert attacker.last_hits == list(state[1])
+
+
+def test_restore_without_recording_detaches_recorder_from_players():
+    from events import MultiSink, NullSink
+    from gameseabattle import SHIP_SIZES, Game
+    from replay import ReplayRecorder
+
+    players = []
+    for seed in (1, 2):
+        player = AIPlayer("medium", random.Random(seed), verbose=False)
+        player.place_ships()
+        players.append(("medium", player.snapshot()))
+    state = (10, list(SHIP_SIZES), players, True, 3, None)
+
+    # Game.__init__ сразу открывает меню, поэтому объект собирается вручную
+    game = Game.__new__(Game)
+    sink = NullSink()
+    game.recorder = ReplayRecorder()
+    game.events = MultiSink(sink, game.recorder)
+    game.book = None
+    game.restore(state)
+
+    assert game.recorder is None
+    assert game.events is sink
+    assert game.player1.events is sink and game.player2.events is sink
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import launcher
+
+DEFERRED = ("endgame", "opening_book", "placement", "rendering", "replay", "targeting")
+
+
+def test_menu_path_does_not_import_game_modules():
+    # Отдельный процесс: в этом модули уже загружены другими тестами
+    code = ("import sys, gameseabattle; gameseabattle.GameConfig(); "
+            f"print(' '.join(name for name in {DEFERRED!r} if name in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert loaded.stdout.split() == []
+
+HEAVY = ("argparse", "asyncio", "concurrent.futures", "multiprocessing", "numpy", "sqlite3")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_play_reaches_the_menu_without_heavy_imports(tmp_path):
+    # Пустой рабочий каталог: игра не должна найти сохранение, книгу или статистику
+    code = (f"import sys; sys.path.insert(0, {ROOT!r}); import launcher\n"
+            "try:\n    launcher.main(['play'])\nexcept SystemExit:\n    pass\n"
+            f"print(' '.join(name for name in {HEAVY!r} if name in sys.modules))")
+    # "6" - пункт "Выход" главного меню
+    result = subprocess.run([sys.executable, "-c", code], input="6\n", capture_output=True, text=True,
+                            cwd=str(tmp_path), check=True)
+    assert "До свидания!" in result.stdout
+    assert result.stdout.splitlines()[-1].split() == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_launcher_dispatches_and_rejects_unknown_commands(tmp_path, capsys):
+    assert launcher.main(["--help"]) == 0
+    usage = capsys.readouterr().out
+    assert all(name in usage for name in launcher.COMMANDS)
+    assert launcher.main(["fly"]) == 2
+    assert "Неизвестная подкоманда: fly" in capsys.readouterr().err
+    assert launcher.main(["play", "--fast"]) == 2
+    assert launcher.main(["stats", "--db", str(tmp_path / "stats.db")]) == 0
+    assert '"leaderboard": []' in capsys.readouterr().out
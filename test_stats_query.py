@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from stats_query import aggregate, leaderboard, percentiles, player_summaries
+from stats_store import ACCURACY_BUCKETS_PER_PERCENT, StatsStore
+
+
+def make_record(rng, player, day):
+    shots = rng.randint(20, 100)
+    hits = rng.randint(0, min(20, shots))
+    return {"player": player, "date": f"2026-01-{day:02d} 12:00:00", "shots": shots, "hits": hits,
+            "misses": shots - hits, "accuracy": hits / shots * 100, "ships_sunk": rng.randint(0, 10),
+            "score": rng.randint(0, 300)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = random.Random(0)
+    with StatsStore(str(tmp_path / "stats.db"), legacy_json=None) as store:
+        store.append_many(make_record(rng, rng.choice("abcde"), rng.randint(1, 28)) for _ in range(500))
+        yield store
+
+
+@pytest.mark.parametrize("date_from", [None, "2026-01-10"])
+def test_leaderboard_honours_player_filter(store, date_from):
+    leaders = leaderboard(store, "games", player="c", date_from=date_from)
+    assert [summary.player for summary in leaders] == ["c"]
+    expected = sum(1 for record in store.iter_records(player="c", date_from=date_from))
+    assert leaders[0].games == expected
+
+
+def nearest_rank(values, q):
+    values = sorted(values)
+    return values[max(1, -(-q * len(values) // 100)) - 1]
+
+
+def test_summary_tables_match_a_full_scan(store):
+    stored = {name: summary.to_dict() for name, summary in player_summaries(store).items()}
+    scanned = {name: summary.to_dict() for name, summary in aggregate(store.iter_records()).items()}
+    assert stored == scanned
+
+    records = list(store.iter_records())
+    for player in (None, "a"):
+        chosen = [r for r in records if player is None or r["player"] == player]
+        scores = percentiles(store, "score", (1, 50, 90, 100), player=player)
+        assert scores == {q: nearest_rank([r["score"] for r in chosen], q) for q in (1, 50, 90, 100)}
+        accuracy = percentiles(store, "accuracy", (50, 99), player=player)
+        buckets = [StatsStore.accuracy_bucket(r["accuracy"]) / ACCURACY_BUCKETS_PER_PERCENT for r in chosen]
+        assert accuracy == {q: nearest_rank(buckets, q) for q in (50, 99)}
+
+
+def test_summaries_are_rebuilt_for_an_old_database(store):
+    before = {name: summary.to_dict() for name, summary in player_summaries(store).items()}
+    # База из версии без сводок: таблицы есть, но пустые, и флага нет
+    for table in ("player_summary", "accuracy_hist", "score_hist"):
+        store.conn.execute(f"DELETE FROM {table}")
+    store.conn.execute("DELETE FROM meta WHERE key = 'summaries'")
+    with StatsStore(store.path, legacy_json=None) as reopened:
+        assert {name: summary.to_dict() for name, summary in player_summaries(reopened).items()} == before
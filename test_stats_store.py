@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from stats_store import FIELDS, StatsStore
+
+
+def write_legacy(path, n):
+    records = [{"player": f"p{i % 3}", "date": f"2025-12-{i % 28 + 1:02d} 10:00:00", "shots": 50,
+                "hits": 20, "misses": 30, "accuracy": 40.0, "ships_sunk": 10, "score": 100 + i}
+               for i in range(n)]
+    # Записи без нужных полей старый формат допускал - они пропускаются
+    records.append({"player": "broken"})
+    path.write_text(json.dumps(records))
+
+
+def test_legacy_json_is_migrated_exactly_once(tmp_path):
+    db, legacy = str(tmp_path / "stats.db"), tmp_path / "stats.json"
+    write_legacy(legacy, 25)
+    with StatsStore(db, legacy_json=str(legacy)) as store:
+        assert store.count() == 25
+        assert store.migrate_json(str(legacy)) == 0
+    with StatsStore(db, legacy_json=str(legacy)) as store:
+        assert store.count() == 25
+        assert set(store.recent(1)[0]) == set(FIELDS)
+
+
+def test_migrated_check_takes_no_write_lock(tmp_path):
+    db, legacy = str(tmp_path / "stats.db"), tmp_path / "stats.json"
+    write_legacy(legacy, 5)
+    with StatsStore(db, legacy_json=str(legacy)) as store:
+        statements = []
+        store.conn.set_trace_callback(statements.append)
+        assert store.migrate_json(str(legacy)) == 0
+        assert not any(statement.startswith("BEGIN") for statement in statements)
+
+
+def record(player, date, score):
+    return {"player": player, "date": date, "shots": 40, "hits": 20, "misses": 20,
+            "accuracy": 50.0, "ships_sunk": 10, "score": score}
+
+
+def test_parallel_writers_and_filtered_reads(tmp_path):
+    db = str(tmp_path / "stats.db")
+    with StatsStore(db, legacy_json=None) as first, StatsStore(db, legacy_json=None) as second:
+        for day in range(1, 11):
+            writer = first if day % 2 else second
+            writer.append(record("a" if day % 3 else "b", f"2026-02-{day:02d} 09:00:00", day))
+        assert first.count() == second.count() == 10
+        assert [r["score"] for r in first.recent(3)] == [10, 9, 8]
+        # Дата без времени в date_to включает весь день
+        period = second.iter_records(date_from="2026-02-03", date_to="2026-02-05")
+        assert [r["score"] for r in period] == [3, 4, 5]
+        assert [r["score"] for r in second.iter_records(player="b")] == [3, 6, 9]
+
+
+def test_failed_batch_leaves_no_partial_rows(tmp_path):
+    with StatsStore(str(tmp_path / "stats.db"), legacy_json=None) as store:
+        with pytest.raises(KeyError):
+            store.append_many([record("a", "2026-02-01 09:00:00", 1), {"player": "broken"}])
+        assert store.count() == 0
+        assert store.conn.execute("SELECT COUNT(*) FROM player_summary").fetchone()[0] == 0
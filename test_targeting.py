@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from gameseabattle import SHIP_SIZES, AIPlayer
+from targeting import DensityMap, ship_placements
+
+
+def expected_heat(density):
+    # Пересчёт с нуля: положение живо, если ни одна его клетка не исключена
+    heat = [0] * len(density.heat)
+    for ship_size, weight in density.remaining.items():
+        for cells in ship_placements(density.size, ship_size):
+            if not any(density.blocked[cell] for cell in cells):
+                for cell in cells:
+                    heat[cell] += weight
+    return heat
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_heat_matches_full_recount(seed):
+    rng = random.Random(seed)
+    defender = AIPlayer("easy", rng, verbose=False)
+    defender.place_ships()
+    board = defender.board
+    density = DensityMap(board.size, SHIP_SIZES)
+    cells = [(x, y) for x in range(board.size) for y in range(board.size)]
+    rng.shuffle(cells)
+
+    for step, (x, y) in enumerate(cells):
+        if board.all_ships_sunk():
+            break
+        hit, ship = board.receive_attack(x, y)
+        if not hit:
+            density.record_miss(x, y)
+        else:
+            density.record_hit(x, y)
+            if ship.is_sunk():
+                density.record_sunk(ship.positions)
+                assert not any(density.heat[px * board.size + py] for px, py in ship.positions)
+        assert density.heat == expected_heat(density)
+        assert all(density.heat[mx * board.size + my] == 0 for mx, my in board.miss_cells)
+        assert density.open_hits == {hx * board.size + hy for hx, hy in board.hit_cells
+                                     if not board.get_ship_at_position(hx, hy).is_sunk()}
+        cell = density.best_cell(rng)
+        assert cell is None or not density.shot[cell[0] * board.size + cell[1]]
+
+        if step % 17 == 0:
+            restored = DensityMap(board.size, SHIP_SIZES)
+            restored.restore(density.snapshot())
+            assert restored.heat == density.heat
+    assert sum(density.remaining.values()) == 0 and not any(density.heat)
+
+
+def test_reset_returns_to_a_fresh_map():
+    density = DensityMap(10, SHIP_SIZES)
+    fresh = DensityMap(10, SHIP_SIZES)
+    density.record_miss(4, 4)
+    density.record_hit(0, 0)
+    density.record_sunk([(0, 0), (0, 1)])
+    density.reset()
+    assert (density.heat, density.remaining, density.shot, density.blocked, density.open_hits) == \
+        (fresh.heat, fresh.remaining, fresh.shot, fresh.blocked, fresh.open_hits)
@@ -0,0 +1,88 @@
+import math
+
+import pytest
+
+from tournament import BASE_ELO, Entrant, Tournament, TournamentError, calibrate, elo_ratings
+
+
+def test_calibrate_converges_near_target():
+    games, target = 400, 0.3
+    randomness, rate = calibrate(target, Entrant("medium", "medium"), "medium", games=games,
+                                 chunk_size=100, workers=1)
+    assert 0.0 < randomness < 1.0
+    assert abs(rate - target) <= 2 * math.sqrt(target * (1 - target) / games)
+
+
+def test_calibrate_rejects_level_without_randomness():
+    with pytest.raises(TournamentError):
+        calibrate(0.5, Entrant("medium", "medium"), "expert", games=10, workers=1)
+
+
+def synthetic_records(elos, games):
+    # Ожидаемое число побед по модели Брэдли - Терри для каждой пары
+    names = list(elos)
+    records = []
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            expected = 1 / (1 + 10 ** ((elos[b] - elos[a]) / 400))
+            records.append({"a": a, "b": b, "chunk": 0, "games": games,
+                            "wins_a": round(games * expected)})
+    return records
+
+
+def test_bradley_terry_recovers_synthetic_ratings():
+    elos = {"strong": 1800.0, "mid": 1550.0, "weak": 1400.0, "novice": 1250.0}
+    records = synthetic_records(elos, 200000)
+    ratings = elo_ratings(records, list(elos))
+    assert [rating.name for rating in ratings] == list(elos)
+    assert sum(rating.elo for rating in ratings) / len(ratings) == pytest.approx(BASE_ELO)
+    shift = sum(elos.values()) / len(elos) - BASE_ELO
+    for rating in ratings:
+        assert rating.elo == pytest.approx(elos[rating.name] - shift, abs=1.0)
+        assert rating.games == 3 * 200000
+        assert 0 < rating.interval < 5
+    # Порядок пакетов не влияет на рейтинг
+    reordered = elo_ratings(records[::-1], list(elos))
+    assert [r.to_dict() for r in reordered] == [r.to_dict() for r in ratings]
+
+
+def test_winless_player_gets_a_finite_rating():
+    records = [{"a": "a", "b": "b", "chunk": 0, "games": 50, "wins_a": 50}]
+    loser = elo_ratings(records, ["a", "b"])[1]
+    assert loser.name == "b" and loser.wins == 0 and math.isfinite(loser.elo)
+
+
+def make_tournament(path):
+    entrants = [Entrant("easy", "easy"), Entrant("medium", "medium"), Entrant("hard", "hard")]
+    return Tournament(entrants, str(path), games=30, chunk_size=10, seed=4)
+
+
+def test_resume_after_torn_line_matches_uninterrupted_run(tmp_path):
+    full = make_tournament(tmp_path / "full.jsonl")
+    expected = [rating.to_dict() for rating in full.run(workers=1)]
+
+    path = tmp_path / "resumed.jsonl"
+    make_tournament(path).run(workers=1)
+    lines = path.read_bytes().splitlines(keepends=True)
+    # Прерванный запуск: четыре пакета не записаны, пятый оборван посреди строки
+    path.write_bytes(b"".join(lines[:-5]) + lines[-5][:len(lines[-5]) // 2])
+    resumed = make_tournament(path)
+    assert len(resumed.load()) == len(lines) - 6
+    assert path.read_bytes() == b"".join(lines[:-5])
+    assert [rating.to_dict() for rating in resumed.run(workers=2)] == expected
+    full_lines = (tmp_path / "full.jsonl").read_bytes().splitlines()
+    assert sorted(path.read_bytes().splitlines()) == sorted(full_lines)
+
+
+def test_resume_refuses_damaged_or_foreign_files(tmp_path):
+    path = tmp_path / "t.jsonl"
+    make_tournament(path).run(workers=1)
+    lines = path.read_bytes().splitlines(keepends=True)
+    path.write_bytes(lines[0] + b"{broken\n" + b"".join(lines[2:]))
+    with pytest.raises(TournamentError):
+        make_tournament(path).load()
+    path.write_bytes(b"".join(lines))
+    foreign = Tournament([Entrant("easy", "easy"), Entrant("hard", "hard")], str(path), games=30,
+                         chunk_size=10, seed=4)
+    with pytest.raises(TournamentError):
+        foreign.load()
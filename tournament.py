@@ -0,0 +1,405 @@
+"""Турнир компьютерных игроков и подбор randomness под заданный процент побед.
+
+Круговой турнир: каждая пара участников играет games партий пакетами на пуле
+процессов, первый ход чередуется. Результат каждого пакета сразу дописывается
+строкой JSON в файл турнира, первая строка файла - настройки. Повторный запуск
+с тем же файлом пропускает сыгранные пакеты, поэтому прерванный турнир можно
+продолжить. Сид пакета выводится из сида турнира, имён участников и номера
+пакета и не зависит от того, в каком запуске и процессе пакет сыгран, так что
+продолженный турнир даёт те же партии, что и непрерывный. Решатель эндшпиля
+уровня "hard" по умолчанию выключен ради скорости, --endgame его включает.
+
+    python tournament.py run --output tournament.jsonl --games 2000
+    python tournament.py run --entrant easy2=easy:0.55 --output t.jsonl
+    python tournament.py calibrate --reference expert --target easy=0.05 --target medium=0.2
+
+Рейтинг Эло считается по сумме всех партий моделью Брэдли - Терри (а не
+последовательными поправками, которые зависят от порядка партий) с
+95-процентными доверительными интервалами.
+"""
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from bitboard import BitBoard
+from gameseabattle import AIPlayer, Board, GameConfig
+from opening_book import load_book
+from placement import TABLE_MAX_BOARD_SIZE
+from simulation import play_headless_game
+
+DEFAULT_TOURNAMENT = "battleship_tournament.jsonl"
+DEFAULT_GAMES = 1000
+DEFAULT_CHUNK_SIZE = 200
+# Рейтинг игрока со средней силой
+BASE_ELO = 1500.0
+# Виртуальные пол-победы в каждую сторону для каждой пары: без них у игрока
+# без единой победы рейтинг уходит в минус бесконечность
+PRIOR_WINS = 0.5
+Z_95 = 1.96
+
+
+class TournamentError(ValueError):
+    pass
+
+
+class Entrant:
+    """Участник турнира: уровень сложности и, при необходимости, своя randomness"""
+
+    def __init__(self, name: str, difficulty: str, randomness: Optional[float] = None):
+        if difficulty not in AIPlayer.DIFFICULTY_LEVELS:
+            raise TournamentError(f"Неизвестный уровень сложности: {difficulty}")
+        if randomness is not None and not 0.0 <= randomness <= 1.0:
+            raise TournamentError("randomness должна быть от 0 до 1")
+        self.name = name
+        self.difficulty = difficulty
+        self.randomness = randomness
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Entrant':
+        """Участник из строки "имя=уровень[:randomness]" или просто "уровень\""""
+        name, _, rest = spec.partition("=")
+        if not rest:
+            rest = name
+        difficulty, _, randomness = rest.partition(":")
+        try:
+            return cls(name, difficulty, float(randomness) if randomness else None)
+        except ValueError as e:
+            raise TournamentError(f"Неверное описание участника: {spec}") from e
+
+    def make_player(self, rng: random.Random, board_factory, config: GameConfig, book,
+                    endgame: bool = False) -> AIPlayer:
+        return AIPlayer(self.difficulty, rng=rng, verbose=False, board_factory=board_factory,
+                        config=config, book=book, randomness=self.randomness, endgame=endgame)
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "difficulty": self.difficulty, "randomness": self.randomness}
+
+
+def default_entrants() -> List[Entrant]:
+    return [Entrant(difficulty, difficulty) for difficulty in AIPlayer.DIFFICULTY_LEVELS]
+
+
+# Пакет партий одной пары: участники, номер пакета, число партий, сид, настройки, книга, эндшпиль
+Task = Tuple[Entrant, Entrant, int, int, int, GameConfig, Optional[str], bool]
+
+
+def _task_seed(seed: int, name_a: str, name_b: str, chunk: int) -> int:
+    # Сид из строки детерминирован во всех процессах, в отличие от hash()
+    return random.Random(f"{seed}/{name_a}/{name_b}/{chunk}").getrandbits(64)
+
+
+def _play_task(task: Task) -> Dict:
+    entrant_a, entrant_b, chunk, n_games, seed, config, book_path, endgame = task
+    rng = random.Random(seed)
+    book = load_book(book_path) if book_path else None
+    board_factory = BitBoard if config.board_size <= TABLE_MAX_BOARD_SIZE else Board
+    wins_a = 0
+    player_a = entrant_a.make_player(rng, board_factory, config, book, endgame)
+    player_b = entrant_b.make_player(rng, board_factory, config, book, endgame)
+    for game_index in range(n_games):
+        if game_index:
+            player_a.reset()
+            player_b.reset()
+        winner, _ = play_headless_game(player_a, player_b, a_starts=game_index % 2 == 0)
+        wins_a += winner == "a"
+    return {"a": entrant_a.name, "b": entrant_b.name, "chunk": chunk,
+            "games": n_games, "wins_a": wins_a}
+
+
+def _execute(tasks: Sequence[Task], workers: Optional[int]) -> Iterator[Dict]:
+    """Результаты пакетов по мере готовности, в любом порядке"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _play_task(task)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        for future in as_completed([executor.submit(_play_task, task) for task in tasks]):
+            yield future.result()
+
+
+def _match_tasks(entrant_a: Entrant, entrant_b: Entrant, games: int, chunk_size: int,
+                 seed: int, config: GameConfig, book_path: Optional[str],
+                 endgame: bool = False) -> List[Task]:
+    tasks = []
+    for chunk, first_game in enumerate(range(0, games, chunk_size)):
+        n_games = min(chunk_size, games - first_game)
+        tasks.append((entrant_a, entrant_b, chunk, n_games,
+                      _task_seed(seed, entrant_a.name, entrant_b.name, chunk), config, book_path,
+                      endgame))
+    return tasks
+
+
+class Rating:
+    def __init__(self, name: str, elo: float, interval: float, games: int, wins: int):
+        self.name = name
+        self.elo = elo
+        self.interval = interval
+        self.games = games
+        self.wins = wins
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "elo": round(self.elo, 1), "ci95": round(self.interval, 1),
+                "games": self.games, "wins": self.wins}
+
+
+def elo_ratings(records: Iterable[Dict], names: Sequence[str],
+                iterations: int = 10000, tolerance: float = 1e-10) -> List[Rating]:
+    """Рейтинги Эло по результатам пакетов, по убыванию.
+
+    Силы gamma находятся MM-алгоритмом Хантера для модели Брэдли - Терри
+    (P(i побеждает j) = gamma_i / (gamma_i + gamma_j)) и нормируются так, что
+    среднее Эло равно BASE_ELO. Интервал - 1.96 стандартной ошибки по диагонали
+    информации Фишера, без учёта корреляций между игроками.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    wins = [[0.0] * n for _ in range(n)]
+    for record in records:
+        a, b = index[record["a"]], index[record["b"]]
+        wins[a][b] += record["wins_a"]
+        wins[b][a] += record["games"] - record["wins_a"]
+    played = [[wins[i][j] + wins[j][i] for j in range(n)] for i in range(n)]
+    for i in range(n):
+        for j in range(n):
+            if played[i][j]:
+                wins[i][j] += PRIOR_WINS
+    played = [[wins[i][j] + wins[j][i] for j in range(n)] for i in range(n)]
+    total_wins = [sum(row) for row in wins]
+
+    gamma = [1.0] * n
+    for _ in range(iterations):
+        updated = []
+        for i in range(n):
+            denominator = sum(played[i][j] / (gamma[i] + gamma[j]) for j in range(n) if played[i][j])
+            updated.append(total_wins[i] / denominator if denominator else gamma[i])
+        scale = math.exp(sum(math.log(value) for value in updated) / n) if n else 1.0
+        updated = [value / scale for value in updated]
+        change = max((abs(new - old) for new, old in zip(updated, gamma)), default=0.0)
+        gamma = updated
+        if change < tolerance:
+            break
+
+    to_elo = 400 / math.log(10)
+    ratings = []
+    for i, name in enumerate(names):
+        information = sum(played[i][j] * gamma[i] * gamma[j] / (gamma[i] + gamma[j]) ** 2
+                          for j in range(n) if played[i][j])
+        interval = Z_95 * to_elo / math.sqrt(information) if information else float("inf")
+        games = sum(played[i]) - PRIOR_WINS * 2 * sum(1 for j in range(n) if played[i][j])
+        real_wins = total_wins[i] - PRIOR_WINS * sum(1 for j in range(n) if played[i][j])
+        ratings.append(Rating(name, BASE_ELO + to_elo * math.log(gamma[i]), interval,
+                              round(games), round(real_wins)))
+    ratings.sort(key=lambda rating: -rating.elo)
+    return ratings
+
+
+class Tournament:
+    """Круговой турнир с продолжением из файла результатов"""
+
+    def __init__(self, entrants: Sequence[Entrant], path: str = DEFAULT_TOURNAMENT,
+                 games: int = DEFAULT_GAMES, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 0,
+                 config: Optional[GameConfig] = None, book: Optional[str] = None,
+                 endgame: bool = False):
+        names = [entrant.name for entrant in entrants]
+        if len(set(names)) != len(names):
+            raise TournamentError("Имена участников должны различаться")
+        if len(entrants) < 2:
+            raise TournamentError("Нужно хотя бы два участника")
+        if games < 1 or chunk_size < 1:
+            raise TournamentError("Число партий и размер пакета должны быть положительными")
+        self.entrants = list(entrants)
+        self.path = path
+        self.games = games
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.config = config if config is not None else GameConfig()
+        self.book = book
+        self.endgame = endgame
+        self.records: List[Dict] = []
+
+    def settings(self) -> Dict:
+        # Книга в настройки не входит: её можно пересобрать между запусками
+        return {
+            "entrants": [entrant.to_dict() for entrant in self.entrants],
+            "games": self.games,
+            "chunk_size": self.chunk_size,
+            "seed": self.seed,
+            "board_size": self.config.board_size,
+            "ship_sizes": list(self.config.ship_sizes),
+            "endgame": self.endgame,
+        }
+
+    def tasks(self) -> List[Task]:
+        tasks = []
+        for i, entrant_a in enumerate(self.entrants):
+            for entrant_b in self.entrants[i + 1:]:
+                tasks.extend(_match_tasks(entrant_a, entrant_b, self.games, self.chunk_size,
+                                          self.seed, self.config, self.book, self.endgame))
+        return tasks
+
+    def load(self) -> Set[Tuple[str, str, int]]:
+        """Читает сыгранные пакеты. Оборванную последнюю строку отрезает от файла"""
+        self.records = []
+        if not os.path.exists(self.path):
+            return set()
+        valid = 0
+        with open(self.path, "rb") as f:
+            lines = f.readlines()
+        for number, line in enumerate(lines):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                if number == len(lines) - 1:
+                    break
+                raise TournamentError(f"Повреждённая строка {number + 1} в {self.path}")
+            if not line.endswith(b"\n"):
+                break
+            if number == 0:
+                if data.get("tournament") != self.settings():
+                    raise TournamentError(f"{self.path} - турнир с другими настройками")
+            else:
+                self.records.append(data)
+            valid += len(line)
+        if valid < sum(len(line) for line in lines):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+        return {(record["a"], record["b"], record["chunk"]) for record in self.records}
+
+    def run(self, workers: Optional[int] = None, progress=None) -> List[Rating]:
+        """Доигрывает недостающие пакеты, дописывая каждый в файл сразу по готовности"""
+        done = self.load()
+        pending = [task for task in self.tasks() if (task[0].name, task[1].name, task[2]) not in done]
+        with open(self.path, "a") as f:
+            if f.tell() == 0:
+                f.write(json.dumps({"tournament": self.settings()}, ensure_ascii=False) + "\n")
+                f.flush()
+            for record in _execute(pending, workers):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                self.records.append(record)
+                if progress is not None:
+                    progress(len(self.records), len(done) + len(pending))
+        return self.ratings()
+
+    def ratings(self) -> List[Rating]:
+        return elo_ratings(self.records, [entrant.name for entrant in self.entrants])
+
+
+def match_win_rate(entrant: Entrant, reference: Entrant, games: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   seed: int = 0, config: Optional[GameConfig] = None, book: Optional[str] = None,
+                   workers: Optional[int] = None, endgame: bool = False) -> float:
+    config = config if config is not None else GameConfig()
+    tasks = _match_tasks(entrant, reference, games, chunk_size, seed, config, book, endgame)
+    wins = sum(record["wins_a"] for record in _execute(tasks, workers))
+    return wins / games
+
+
+def calibrate(target: float, reference: Entrant, difficulty: str = "medium", games: int = DEFAULT_GAMES,
+              steps: int = 10, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 0,
+              config: Optional[GameConfig] = None, book: Optional[str] = None,
+              workers: Optional[int] = None, endgame: bool = False) -> Tuple[float, float]:
+    """randomness для уровня difficulty, при которой он выигрывает у reference долю target.
+
+    Процент побед убывает с ростом randomness, поэтому достаточно бисекции. Все
+    шаги играют одни и те же сиды, и разница между шагами не тонет в шуме.
+    Поиск останавливается, когда отклонение меньше стандартной ошибки серии.
+    Уровни, которые не читают randomness, отклоняются: бисекция шла бы по
+    постоянной функции. У "hard" с endgame=True от randomness зависят только ходы
+    до эндшпиля.
+    Возвращает (randomness, достигнутый процент побед).
+    """
+    if not 0.0 < target < 1.0:
+        raise TournamentError("Целевая доля побед должна быть между 0 и 1")
+    config = config if config is not None else GameConfig()
+    if not AIPlayer.uses_randomness(difficulty, config.board_size):
+        raise TournamentError(f"Уровень {difficulty} на поле {config.board_size}x{config.board_size} "
+                              "не использует randomness, подбирать нечего")
+    tolerance = math.sqrt(target * (1 - target) / games)
+    low, high = 0.0, 1.0
+    best = None
+    for _ in range(steps):
+        randomness = (low + high) / 2
+        rate = match_win_rate(Entrant(f"calibrate-{difficulty}", difficulty, randomness), reference,
+                              games, chunk_size, seed, config, book, workers, endgame)
+        if best is None or abs(rate - target) < abs(best[1] - target):
+            best = randomness, rate
+        if abs(rate - target) < tolerance:
+            break
+        if rate > target:
+            low = randomness
+        else:
+            high = randomness
+    return best
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Турнир и подбор уровней сложности компьютерного игрока")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("run", "круговой турнир с рейтингом Эло"),
+                            ("calibrate", "подобрать randomness под долю побед")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--games", type=int, default=DEFAULT_GAMES, help="партий на пару или на шаг")
+        command.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument("--workers", type=int, default=None)
+        command.add_argument("--board-size", type=int, default=10)
+        command.add_argument("--fleet", default=None, help="размеры кораблей через пробел")
+        command.add_argument("--book", default=None, help="дебютная книга для уровней hard и expert")
+        command.add_argument("--endgame", action="store_true", help="решатель эндшпиля для уровня hard")
+    run = commands.choices["run"]
+    run.add_argument("--output", default=DEFAULT_TOURNAMENT, help="файл результатов; продолжается, если есть")
+    run.add_argument("--entrant", action="append", default=None,
+                     help="имя=уровень[:randomness]; по умолчанию все уровни")
+    tune = commands.choices["calibrate"]
+    tune.add_argument("--reference", default="expert", help="эталонный участник, уровень[:randomness]")
+    tune.add_argument("--target", action="append", required=True,
+                      help="уровень=доля побед против эталона, например medium=0.25")
+    tune.add_argument("--steps", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    config = GameConfig(args.board_size, [int(size) for size in args.fleet.split()] if args.fleet else None)
+    try:
+        if args.command == "run":
+            entrants = [Entrant.parse(spec) for spec in args.entrant] if args.entrant else default_entrants()
+            tournament = Tournament(entrants, args.output, args.games, args.chunk_size, args.seed,
+                                    config, args.book, args.endgame)
+
+            def progress(done: int, total: int) -> None:
+                print(f"\rПакетов сыграно: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+            ratings = tournament.run(args.workers, progress)
+            print(file=sys.stderr)
+            print(f"{'Участник':<20} {'Эло':>8} {'±95%':>7} {'Партий':>8} {'Побед, %':>9}")
+            for rating in ratings:
+                share = rating.wins / rating.games * 100 if rating.games else 0.0
+                print(f"{rating.name:<20} {rating.elo:>8.0f} {rating.interval:>7.0f} "
+                      f"{rating.games:>8} {share:>9.1f}")
+            return
+
+        reference = Entrant.parse(args.reference)
+        for spec in args.target:
+            difficulty, _, share = spec.partition("=")
+            try:
+                target = float(share)
+            except ValueError:
+                raise TournamentError(f"Неверная цель: {spec}")
+            if difficulty not in AIPlayer.DIFFICULTY_LEVELS:
+                raise TournamentError(f"Неизвестный уровень сложности: {difficulty}")
+            randomness, rate = calibrate(target, reference, difficulty, args.games, args.steps,
+                                         args.chunk_size, args.seed, config, args.book, args.workers,
+                                         args.endgame)
+            print(f"{difficulty}: randomness {randomness:.3f} -> {rate * 100:.1f}% побед "
+                  f"против {reference.name} (цель {target * 100:.1f}%)")
+    except TournamentError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()